@@ -5,91 +5,79 @@ from typing import List, Dict, Any, Optional
 
 from flask import Blueprint, jsonify, request
 from dotenv import load_dotenv
-import google.generativeai as genai
+import importlib.util
 
 # Go up one directory to import from the main Flask app
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models import db, Session, Event
+from AI import llm_cache, compaction, rolling_summary
+from AI.summary_jobs import enqueue_summary, latest_job, reclaim_orphaned
 
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
 load_dotenv(env_path)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# Send Gemini calls to another host over REST (e.g. the loadtest.py mock server)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# The SDK pulls in grpc/protobuf and is slow to import, so only check that it
+# is installed here and import it on the first Gemini call.
+if importlib.util.find_spec("google.generativeai") is None:
+    raise ImportError("google-generativeai is not installed")
+_genai = None
+
+def _get_genai():
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        elif GEMINI_API_KEY:
+            genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
 
 ai_bp = Blueprint("ai", __name__)
 
-def compact_transcript(events: List[Event], max_chars: int = 25000) -> str:
-    lines = []
-    for e in events:
-        if e.source == 'elevenlabs':
-            text = (e.text or "").strip()
-            if not text:
-                continue
-            lines.append(f"[{e.timestamp_ms}ms] {e.speaker or 'unknown'}: {text}")
-    blob = "\n".join(lines)
-    if len(blob) <= max_chars:
-        return blob
-    return blob[:max_chars]
-
-def get_mood_data(events: List[Event]) -> List[Dict[str, Any]]:
-    # Just extract a clean list of presage events to pass to the prompt
-    moods = []
-    for e in events:
-        if e.source == 'presage' and e.emotion:
-            moods.append({
-                "t_ms": e.timestamp_ms,
-                "emotion": e.emotion,
-                "valence": e.valence
-            })
-    return moods
-
-def generate_summary(session_id: int) -> Dict[str, Any]:
-    session = Session.query.get_or_404(session_id)
-    events = session.events
-    
-    transcript_text = compact_transcript(events)
-    moods = get_mood_data(events)
-    
-    if not GEMINI_API_KEY:
-        return {"error": "Missing GEMINI_API_KEY"}
+# Prompt budget for the transcript section (≈4 chars/token).
+TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", "6000"))
 
-    model = genai.GenerativeModel(MODEL_NAME)
+def compact_transcript(events: List[Event], token_budget: int = TRANSCRIPT_TOKEN_BUDGET) -> str:
+    # Keeps the highest-signal lines (valence swings, speaker turns, opening/close)
+    return compaction.compact_transcript(events, token_budget=token_budget)
 
-    prompt = f"""
-You are SenseLense AI, an expert sales analyst.
-Return STRICT VALID JSON ONLY.
+def get_mood_data(events: List[Event]) -> List[Dict[str, Any]]:
+    # Presage samples collapsed into change-points instead of every raw sample
+    return compaction.mood_changepoints(events)
 
-Schema:
-{{
+SUMMARY_SCHEMA = """{
   "overall_summary": "string",
   "emotion_analysis": "string",
   "key_moments": [
-    {{
+    {
       "t_ms": number,
       "description": "string",
       "emotion_context": "string"
-    }}
+    }
   ],
   "risks": ["string"],
   "opportunities": ["string"],
   "next_steps": ["string"],
   "confidence": number
-}}
-
-Transcript:
-{transcript_text}
-
-Emotion Data (ms, emotion, valence -1 to 1):
-{json.dumps(moods)}
-"""
-
-    response = model.generate_content(prompt)
-    raw = response.text.strip()
+}"""
+
+def generate_json(prompt: str, bypass_cache: bool = False) -> Dict[str, Any]:
+    """Send `prompt` to Gemini (through the LLM cache) and parse the JSON reply."""
+    model = _get_genai().GenerativeModel(MODEL_NAME)
+    raw = llm_cache.cached_generate(
+        MODEL_NAME,
+        prompt,
+        lambda: model.generate_content(prompt).text,
+        bypass=bypass_cache,
+    ).strip()
     
     if raw.startswith("```json"):
         raw = raw[7:]
@@ -112,40 +100,116 @@ Emotion Data (ms, emotion, valence -1 to 1):
 
     return parsed
 
+def generate_summary(session_id: int, bypass_cache: bool = False) -> Dict[str, Any]:
+    session = Session.query.get_or_404(session_id)
+
+    if not GEMINI_API_KEY:
+        return {"error": "Missing GEMINI_API_KEY"}
+
+    # Live mode already summarized most of the call — just merge the partials
+    if rolling_summary.has_windows(session_id):
+        return rolling_summary.merge_windows(session, bypass_cache=bypass_cache)
+
+    events = session.all_events()
+    
+    transcript_text = compact_transcript(events)
+    moods = get_mood_data(events)
+
+    prompt = f"""
+You are SenseLense AI, an expert sales analyst.
+Return STRICT VALID JSON ONLY.
+
+Schema:
+{SUMMARY_SCHEMA}
+
+Transcript:
+{transcript_text}
+
+Emotion Data (change-points: segment start/end ms, emotion, mean valence -1 to 1, sample count):
+{json.dumps(moods, separators=(",", ":"))}
+"""
+
+    return generate_json(prompt, bypass_cache=bypass_cache)
+
+NOTES_HEADER = "**User Notes**\n"
+NOTES_DIVIDER = "\n\n---\n\n"
+ANALYSIS_HEADER = "**Overall Analysis**\n"
+
+
+def user_notes(summary: str) -> str:
+    """The user's own notes in session.summary, without any earlier AI render."""
+    summary = (summary or "").strip()
+    if summary == "Session completed.":
+        return ""
+    render_start = NOTES_DIVIDER + ANALYSIS_HEADER
+    if summary.startswith(NOTES_HEADER) and render_start in summary:
+        return summary[len(NOTES_HEADER):summary.rindex(render_start)].strip()
+    if summary.startswith(ANALYSIS_HEADER):
+        return ""   # a previous render with no notes
+    return summary
+
+
+def apply_summary(session: Session, summary_data: Dict[str, Any]) -> str:
+    """Render Gemini output as markdown onto session.summary and commit."""
+    # Build an attractive markdown summary to display on the frontend
+    summary_md = ""
+    notes = user_notes(session.summary)
+    if notes:
+        summary_md += f"{NOTES_HEADER}{notes}{NOTES_DIVIDER}"
+
+    summary_md += f"{ANALYSIS_HEADER}{summary_data.get('overall_summary', '')}\n\n"
+    summary_md += f"**Emotional Context**\n{summary_data.get('emotion_analysis', '')}\n\n"
+
+    risks = summary_data.get('risks', [])
+    if risks:
+        summary_md += "**Risks**\n" + "\n".join(f"- {r}" for r in risks) + "\n\n"
+
+    opps = summary_data.get('opportunities', [])
+    if opps:
+        summary_md += "**Opportunities**\n" + "\n".join(f"- {o}" for o in opps) + "\n\n"
+
+    steps = summary_data.get('next_steps', [])
+    if steps:
+        summary_md += "**Next Steps**\n" + "\n".join(f"- {s}" for s in steps) + "\n"
+
+    session.summary = summary_md.strip()
+    db.session.commit()
+    return session.summary
+
 @ai_bp.post("/sessions/<int:session_id>/summary/generate")
 def generate_endpoint(session_id: int):
-    try:
-        summary_data = generate_summary(session_id)
-        if "error" in summary_data:
-            return jsonify({"ok": False, "error": summary_data["error"]}), 500
-            
-        session = Session.query.get(session_id)
-        if session:
-            # Build an attractive markdown summary to display on the frontend
-            summary_md = ""
-            if session.summary and session.summary != "Session completed.":
-                summary_md += f"**User Notes**\n{session.summary}\n\n---\n\n"
-            
-            summary_md += f"**Overall Analysis**\n{summary_data.get('overall_summary', '')}\n\n"
-            summary_md += f"**Emotional Context**\n{summary_data.get('emotion_analysis', '')}\n\n"
-            
-            risks = summary_data.get('risks', [])
-            if risks:
-                summary_md += "**Risks**\n" + "\n".join(f"- {r}" for r in risks) + "\n\n"
-                
-            opps = summary_data.get('opportunities', [])
-            if opps:
-                summary_md += "**Opportunities**\n" + "\n".join(f"- {o}" for o in opps) + "\n\n"
-                
-            steps = summary_data.get('next_steps', [])
-            if steps:
-                summary_md += "**Next Steps**\n" + "\n".join(f"- {s}" for s in steps) + "\n"
-                
-            session.summary = summary_md.strip()
-            db.session.commit()
-            
-        return jsonify({"ok": True, "summary_md": session.summary, "raw_data": summary_data})
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"ok": False, "error": str(e)}), 500
+    """Queue a background summary job. Poll /summary/status for the result."""
+    Session.query.get_or_404(session_id)
+    # ?refresh=true forces a fresh Gemini call instead of the cached response
+    refresh = request.args.get("refresh", "false").lower() == "true"
+    job = enqueue_summary(session_id, refresh=refresh)
+    return jsonify({"ok": True, "job": job}), 202
+
+@ai_bp.get("/sessions/<int:session_id>/summary/status")
+def summary_status(session_id: int):
+    session = Session.query.get_or_404(session_id)
+    reclaim_orphaned(session_id)   # a restarted server picks its dead jobs back up here
+    job = latest_job(session_id)
+    return jsonify({
+        "session_id": session_id,
+        "status": job.status if job else "none",
+        "job": job.to_dict() if job else None,
+        "summary_md": session.summary if job and job.status == "done" else None,
+    })
+
+
+@ai_bp.get("/sessions/<int:session_id>/summary/windows")
+def summary_windows(session_id: int):
+    """Per-window partial summaries produced in live mode (oldest first)."""
+    Session.query.get_or_404(session_id)
+    return jsonify({
+        "session_id": session_id,
+        "live_mode": rolling_summary.LIVE_SUMMARY,
+        "window_ms": rolling_summary.WINDOW_MS,
+        "windows": [w.to_dict() for w in rolling_summary.list_windows(session_id)],
+    })
+
+
+@ai_bp.get("/llm-cache/stats")
+def llm_cache_stats():
+    return jsonify(llm_cache.stats())
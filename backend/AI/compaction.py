@@ -0,0 +1,167 @@
+"""
+compaction.py — Shrinks session events into a prompt-sized form for Gemini.
+
+Transcript: when the full transcript fits the token budget it is passed
+through untouched. Otherwise every line is scored by how much the client's
+valence moved around it, whether it starts a speaker turn, and whether it
+sits in the opening/closing stretch of the call. The last lines of the call
+always get a reserved slice of the budget, the highest-signal lines fill
+the rest (with a little context), and everything else collapses to
+"[… N lines omitted …]" markers.
+
+Mood: the presage series is run-length encoded into change-points — a new
+segment starts only when the emotion label changes or valence drifts more
+than `min_delta` from the segment's start.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Sequence
+
+# Rough chars-per-token for English prose; good enough for budgeting.
+CHARS_PER_TOKEN = 4
+
+SWING_WINDOW_MS = 15_000     # look this far either side of a line for valence movement
+EDGE_FRACTION = 0.1          # first/last 10% of the call counts as opening/closing
+CONTEXT_LINES = 1            # neighbours kept around each selected line
+CLOSING_BUDGET_FRACTION = 0.2  # share of the budget reserved for the final lines
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _transcript_lines(events: Sequence[Any]) -> List[Dict[str, Any]]:
+    lines = []
+    for e in events:
+        if e.source != "elevenlabs":
+            continue
+        text = (e.text or "").strip()
+        if not text:
+            continue
+        speaker = e.speaker or "unknown"
+        lines.append({
+            "t_ms": e.timestamp_ms,
+            "speaker": speaker,
+            "line": f"[{e.timestamp_ms}ms] {speaker}: {text}",
+        })
+    return lines
+
+
+def _valence_series(events: Sequence[Any]):
+    samples = sorted(
+        (e.timestamp_ms, e.valence)
+        for e in events
+        if e.source == "presage" and e.valence is not None
+    )
+    return [t for t, _ in samples], [v for _, v in samples]
+
+
+def _score_lines(lines: List[Dict[str, Any]], times: List[int], valences: List[float]) -> List[float]:
+    if not lines:
+        return []
+    start, end = lines[0]["t_ms"], lines[-1]["t_ms"]
+    edge = max(1, int((end - start) * EDGE_FRACTION))
+
+    scores = []
+    prev_speaker = None
+    for ln in lines:
+        t = ln["t_ms"]
+        score = 0.0
+
+        lo = bisect_left(times, t - SWING_WINDOW_MS)
+        hi = bisect_right(times, t + SWING_WINDOW_MS)
+        if hi - lo >= 2:
+            window = valences[lo:hi]
+            score += 2.0 * (max(window) - min(window))   # swing spans 0..2 → 0..4
+
+        if ln["speaker"] != prev_speaker:
+            score += 0.5
+        prev_speaker = ln["speaker"]
+
+        if t - start <= edge or end - t <= edge:
+            score += 1.0
+        scores.append(score)
+    return scores
+
+
+def compact_transcript(events: Sequence[Any], token_budget: int = 6000) -> str:
+    """Return the transcript, keeping the highest-signal lines within `token_budget`."""
+    lines = _transcript_lines(events)
+    full = "\n".join(ln["line"] for ln in lines)
+    if estimate_tokens(full) <= token_budget:
+        return full
+
+    times, valences = _valence_series(events)
+    scores = _score_lines(lines, times, valences)
+    ranked = sorted(range(len(lines)), key=lambda i: (-scores[i], lines[i]["t_ms"]))
+
+    keep = set()
+    used = 0
+    # Reserve the tail: the close of the call is where commitments happen.
+    for i in range(len(lines) - 1, -1, -1):
+        cost = estimate_tokens(lines[i]["line"]) + 1
+        if used + cost > token_budget * CLOSING_BUDGET_FRACTION:
+            break
+        keep.add(i)
+        used += cost
+
+    for i in ranked:
+        group = [
+            j for j in range(i - CONTEXT_LINES, i + CONTEXT_LINES + 1)
+            if 0 <= j < len(lines) and j not in keep
+        ]
+        cost = sum(estimate_tokens(lines[j]["line"]) + 1 for j in group)
+        if used + cost > token_budget:
+            # Context didn't fit — try the line on its own.
+            if i in keep:
+                continue
+            group = [i]
+            cost = estimate_tokens(lines[i]["line"]) + 1
+            if used + cost > token_budget:
+                continue
+        keep.update(group)
+        used += cost
+
+    out = []
+    skipped = 0
+    for i, ln in enumerate(lines):
+        if i in keep:
+            if skipped:
+                out.append(f"[… {skipped} lines omitted …]")
+                skipped = 0
+            out.append(ln["line"])
+        else:
+            skipped += 1
+    if skipped:
+        out.append(f"[… {skipped} lines omitted …]")
+    return "\n".join(out)
+
+
+def mood_changepoints(events: Sequence[Any], min_delta: float = 0.15) -> List[Dict[str, Any]]:
+    """
+    Run-length encode presage samples into segments:
+    {"t_ms", "end_ms", "emotion", "valence" (segment mean), "n"}.
+    """
+    segments: List[Dict[str, Any]] = []
+    cur = None
+    for e in events:
+        if e.source != "presage" or not e.emotion:
+            continue
+        v = e.valence if e.valence is not None else 0.0
+        if (
+            cur is not None
+            and e.emotion == cur["emotion"]
+            and abs(v - cur["_v0"]) <= min_delta
+        ):
+            cur["end_ms"] = e.timestamp_ms
+            cur["_sum"] += v
+            cur["n"] += 1
+            continue
+        cur = {"t_ms": e.timestamp_ms, "end_ms": e.timestamp_ms, "emotion": e.emotion,
+               "_v0": v, "_sum": v, "n": 1}
+        segments.append(cur)
+
+    for seg in segments:
+        seg["valence"] = round(seg.pop("_sum") / seg["n"], 2)
+        del seg["_v0"]
+    return segments
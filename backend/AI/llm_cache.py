@@ -0,0 +1,205 @@
+"""
+llm_cache.py — Persistent cache for Gemini responses.
+
+Responses are keyed by a SHA-256 of (model name, generation config, prompt),
+so an unchanged session re-sent to the same model never pays Gemini twice.
+Entries live in a small SQLite file shared by every AI entry point
+(AI/ai.py and insights_engine/gemini_analysis.py).
+
+Eviction:
+  - age:  entries older than LLM_CACHE_TTL_S are dropped
+  - size: at most LLM_CACHE_MAX_ENTRIES rows are kept (least recently used go first)
+
+Usage:
+    from AI.llm_cache import cached_generate
+    text = cached_generate(MODEL_NAME, prompt, lambda: model.generate_content(prompt).text)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+CACHE_DB_PATH = os.getenv(
+    "LLM_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "instance", "llm_cache.db"),
+)
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "500"))
+CACHE_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))   # 7 days
+CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "evicted": 0}
+_schema_ready = False
+
+
+def _connect() -> sqlite3.Connection:
+    global _schema_ready
+    os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    if not _schema_ready:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              cache_key     TEXT PRIMARY KEY,
+              model         TEXT NOT NULL,
+              response_text TEXT NOT NULL,
+              created_at    REAL NOT NULL,
+              last_hit_at   REAL NOT NULL,
+              hit_count     INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit_at)")
+        conn.commit()
+        _schema_ready = True
+    return conn
+
+
+def _bump(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def cache_key(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+    """Stable hash of everything that determines the model's output."""
+    payload = json.dumps(
+        {"model": model_name, "config": generation_config or {}, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for `key`, or None if missing/expired."""
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT response_text, created_at FROM llm_cache WHERE cache_key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        text, created_at = row
+        if now - created_at > CACHE_TTL_S:
+            conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+            _bump("evicted")
+            return None
+        conn.execute(
+            "UPDATE llm_cache SET last_hit_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+            (now, key),
+        )
+        conn.commit()
+        return text
+    finally:
+        conn.close()
+
+
+def put(key: str, model_name: str, response_text: str):
+    """Store a response and apply age/size eviction."""
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache(cache_key, model, response_text, created_at, last_hit_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+                """,
+                (key, model_name, response_text, now, now),
+            )
+            expired = conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - CACHE_TTL_S,)
+            ).rowcount
+            overflow = conn.execute(
+                """
+                DELETE FROM llm_cache WHERE cache_key IN (
+                  SELECT cache_key FROM llm_cache ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (CACHE_MAX_ENTRIES,),
+            ).rowcount
+        if expired or overflow:
+            _bump("evicted", expired + overflow)
+    finally:
+        conn.close()
+
+
+def cached_generate(
+    model_name: str,
+    prompt: str,
+    generate: Callable[[], str],
+    generation_config: Optional[Dict[str, Any]] = None,
+    bypass: bool = False,
+) -> str:
+    """
+    Return the cached response for this (model, config, prompt), calling
+    `generate()` and storing its result on a miss. `bypass=True` skips the
+    lookup but still refreshes the stored entry.
+    """
+    if CACHE_DISABLED:
+        _bump("bypassed")
+        return generate()
+
+    key = cache_key(model_name, prompt, generation_config)
+    if bypass:
+        _bump("bypassed")
+    else:
+        try:
+            hit = get(key)
+        except sqlite3.Error as e:
+            print(f"[llm_cache] Lookup failed (non-fatal): {e}")
+            hit = None
+        if hit is not None:
+            _bump("hits")
+            return hit
+        _bump("misses")
+
+    text = generate()
+    try:
+        put(key, model_name, text)
+    except sqlite3.Error as e:
+        print(f"[llm_cache] Store failed (non-fatal): {e}")
+    return text
+
+
+def stats() -> Dict[str, Any]:
+    """Process-lifetime hit/miss counters plus current table size."""
+    with _stats_lock:
+        out = dict(_stats)
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+    out["enabled"] = not CACHE_DISABLED
+    out["max_entries"] = CACHE_MAX_ENTRIES
+    out["ttl_s"] = CACHE_TTL_S
+    try:
+        conn = _connect()
+        try:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(response_text)), 0) FROM llm_cache"
+            ).fetchone()
+        finally:
+            conn.close()
+        out["entries"] = entries
+        out["bytes"] = size
+    except sqlite3.Error as e:
+        out["error"] = str(e)
+    return out
+
+
+def clear() -> int:
+    """Drop every cached response. Returns the number of rows removed."""
+    conn = _connect()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM llm_cache").rowcount
+    finally:
+        conn.close()
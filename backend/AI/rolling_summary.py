@@ -0,0 +1,234 @@
+"""
+rolling_summary.py — Live-mode, window-by-window AI summaries.
+
+With LIVE_SUMMARY=true, every completed LIVE_SUMMARY_WINDOW_MIN-minute
+window of a recording (elevenlabs + presage events) is summarized in the
+background while the call is still going, and stored as a SummaryWindow
+row. When the session ends, generate_summary only has to summarize the
+short tail since the last window and merge the stored partials, which is a
+much smaller prompt than the whole transcript.
+
+A window counts as complete once events arrive more than GRACE_MS past its
+end, so late transcript chunks (ElevenLabs returns ~10 s behind) still land
+inside it.
+
+At session end the last window is usually still being summarized: merge
+waits up to LIVE_SUMMARY_MERGE_WAIT_S for in-flight windows, cancels ones
+that haven't started, and summarizes whatever isn't done inline.
+"""
+
+import os
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Session, Event, EmotionChunk, SummaryWindow
+from AI import compaction
+
+LIVE_SUMMARY = os.getenv("LIVE_SUMMARY", "").lower() in ("1", "true", "yes")
+WINDOW_MS = int(float(os.getenv("LIVE_SUMMARY_WINDOW_MIN", "3")) * 60_000)
+GRACE_MS = 15_000
+MERGE_WAIT_S = float(os.getenv("LIVE_SUMMARY_MERGE_WAIT_S", "60"))
+WINDOW_TOKEN_BUDGET = 2000
+
+_window_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-summary")
+_lock = threading.Lock()
+_next_window: Dict[int, int] = {}   # session_id -> first window index not yet scheduled
+_inflight: Dict[Tuple[int, int], Future] = {}   # (session_id, window_index) -> queued/running task
+
+WINDOW_SCHEMA = """{
+  "summary": "string",
+  "key_moments": [
+    {
+      "t_ms": number,
+      "description": "string",
+      "emotion_context": "string"
+    }
+  ],
+  "risks": ["string"],
+  "opportunities": ["string"],
+  "client_mood": "string"
+}"""
+
+
+def on_events(app: Flask, session_id: int, latest_ms: int):
+    """Called whenever events land; schedules any newly completed windows."""
+    if not LIVE_SUMMARY:
+        return
+    completed = max(0, (int(latest_ms) - GRACE_MS) // WINDOW_MS)
+    with _lock:
+        first = _next_window.get(session_id, 0)
+        if completed <= first:
+            return
+        _next_window[session_id] = completed
+    for index in range(first, completed):
+        key = (session_id, index)
+        future = _window_executor.submit(_run_window, app, session_id, index)
+        with _lock:
+            _inflight[key] = future
+        future.add_done_callback(lambda _f, key=key: _forget(key))
+
+
+def _forget(key: Tuple[int, int]):
+    with _lock:
+        _inflight.pop(key, None)
+
+
+def _settle_inflight(session_id: int) -> List[int]:
+    """
+    Cancel this session's queued windows and wait (bounded) for running ones.
+    Returns the indices of every window that was scheduled.
+    """
+    with _lock:
+        futures = {index: f for (sid, index), f in _inflight.items() if sid == session_id}
+    running = [f for f in futures.values() if not f.cancel()]
+    if not running:
+        return list(futures)
+    _, late = wait(running, timeout=MERGE_WAIT_S)
+    if late:
+        print(f"[live-summary] Session {session_id}: {len(late)} window(s) still running "
+              f"after {MERGE_WAIT_S:g}s — summarizing them inline")
+    return list(futures)
+
+
+def has_windows(session_id: int) -> bool:
+    return SummaryWindow.query.filter_by(session_id=session_id).first() is not None
+
+
+def list_windows(session_id: int) -> List[SummaryWindow]:
+    return (
+        SummaryWindow.query.filter_by(session_id=session_id)
+        .order_by(SummaryWindow.window_index)
+        .all()
+    )
+
+
+def _run_window(app: Flask, session_id: int, index: int):
+    with app.app_context():
+        if SummaryWindow.query.filter_by(session_id=session_id, window_index=index).first():
+            return   # already summarized (e.g. scheduled again after a restart)
+        window = SummaryWindow(
+            session_id=session_id,
+            window_index=index,
+            start_ms=index * WINDOW_MS,
+            end_ms=(index + 1) * WINDOW_MS,
+            status="running",
+        )
+        db.session.add(window)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return   # another run inserted the same window first
+
+        try:
+            result = summarize_range(session_id, window.start_ms, window.end_ms)
+            window.result_json = json.dumps(result) if result else None
+            window.status = "done"
+            print(f"[live-summary] Session {session_id} window {index} done")
+        except Exception as e:
+            window.status = "error"
+            window.error = str(e)
+            print(f"[live-summary] Session {session_id} window {index} failed: {e}")
+        db.session.commit()
+
+
+def summarize_range(
+    session_id: int,
+    start_ms: int,
+    end_ms: Optional[int] = None,
+    bypass_cache: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """Summarize events in [start_ms, end_ms). Returns None if the range is empty."""
+    from AI.ai import generate_json
+    from sample_store import merged_events
+
+    session = Session.query.get(session_id)
+    if session is not None and session.archive:
+        events = [
+            e for e in session.all_events()
+            if e.timestamp_ms >= start_ms and (end_ms is None or e.timestamp_ms < end_ms)
+        ]
+    else:
+        events = merged_events(session_id, start_ms, end_ms)
+
+    transcript_text = compaction.compact_transcript(events, token_budget=WINDOW_TOKEN_BUDGET)
+    moods = compaction.mood_changepoints(events)
+    if not transcript_text and not moods:
+        return None
+
+    span = f"{start_ms // 1000}s–{end_ms // 1000}s" if end_ms is not None else f"{start_ms // 1000}s–end"
+    prompt = f"""
+You are SenseLense AI, an expert sales analyst.
+This is ONE WINDOW ({span}) of a longer sales call; summarize only this window.
+Return STRICT VALID JSON ONLY.
+
+Schema:
+{WINDOW_SCHEMA}
+
+Transcript:
+{transcript_text}
+
+Emotion Data (change-points: segment start/end ms, emotion, mean valence -1 to 1, sample count):
+{json.dumps(moods, separators=(",", ":"))}
+"""
+    return generate_json(prompt, bypass_cache=bypass_cache)
+
+
+def merge_windows(session: Session, bypass_cache: bool = False) -> Dict[str, Any]:
+    """
+    Build the final session summary from stored window partials. Windows
+    still being summarized in the background are waited for (up to
+    MERGE_WAIT_S); windows that are missing, failed or still not done, plus
+    the tail after the last window, are summarized inline.
+    """
+    from AI.ai import generate_json, SUMMARY_SCHEMA
+
+    with _lock:
+        _next_window.pop(session.id, None)
+    scheduled = _settle_inflight(session.id)
+    db.session.expire_all()   # pick up windows finished by the worker meanwhile
+
+    windows = list_windows(session.id)
+    done = {w.window_index: w for w in windows if w.status == "done"}
+    last_ms = max(
+        db.session.query(db.func.max(Event.timestamp_ms)).filter(Event.session_id == session.id).scalar() or 0,
+        db.session.query(db.func.max(EmotionChunk.end_ms)).filter(EmotionChunk.session_id == session.id).scalar() or 0,
+    )
+    if session.archive:
+        last_ms = max([last_ms] + [e.timestamp_ms for e in session.all_events()[-1:]])
+    known = [w.window_index for w in windows] + scheduled
+    n_windows = max([i + 1 for i in known] + [last_ms // WINDOW_MS])
+
+    partials = []
+    for index in range(n_windows):
+        start_ms, end_ms = index * WINDOW_MS, (index + 1) * WINDOW_MS
+        if index in done:
+            result = json.loads(done[index].result_json) if done[index].result_json else None
+        else:
+            result = summarize_range(session.id, start_ms, end_ms, bypass_cache=bypass_cache)
+        if result:
+            partials.append({"start_ms": start_ms, "end_ms": end_ms, **result})
+
+    tail_start = n_windows * WINDOW_MS
+    tail = summarize_range(session.id, tail_start, bypass_cache=bypass_cache)
+    if tail:
+        partials.append({"start_ms": tail_start, "end_ms": last_ms, **tail})
+
+    prompt = f"""
+You are SenseLense AI, an expert sales analyst.
+Below are summaries of consecutive windows of ONE sales call, in order.
+Merge them into a single summary of the whole call.
+Return STRICT VALID JSON ONLY.
+
+Schema:
+{SUMMARY_SCHEMA}
+
+Window summaries:
+{json.dumps(partials, separators=(",", ":"))}
+"""
+    return generate_json(prompt, bypass_cache=bypass_cache)
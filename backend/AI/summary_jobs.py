@@ -0,0 +1,227 @@
+"""
+summary_jobs.py — Background runner for Gemini session summaries.
+
+Summaries take tens of seconds, so they never run on the request thread.
+`enqueue_summary` records a SummaryJob row and hands it to a small thread
+pool; the worker claims the row, calls AI.ai.generate_summary, writes the
+markdown onto the Session and marks the job done/error. Job state lives in
+the DB, so GET /sessions/<id>/summary/status survives restarts.
+
+Every queued/running job records the process that owns it ("host:pid:boot")
+and a heartbeat that process refreshes every HEARTBEAT_S. A job is orphaned
+as soon as its owner is known to be gone (same host, and the pid is dead or
+now belongs to a new boot of this server, as after a container restart), or
+once its heartbeat is older than 3 × HEARTBEAT_S. Orphans are re-queued by
+`resume_pending_jobs` on the first request, and whenever the session's
+summary is requested or polled (`reclaim_orphaned`). Rows from before the
+heartbeat existed fall back to STALE_JOB_S.
+"""
+
+import os
+import time
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, current_app
+
+from models import db, Session, SummaryJob
+
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "2"))
+ACTIVE_STATUSES = ("queued", "running")
+# A job with no owner/heartbeat queued or running this long is assumed orphaned
+STALE_JOB_S = int(os.getenv("SUMMARY_STALE_JOB_S", "600"))
+HEARTBEAT_S = 15
+
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+_HOST = socket.gethostname()
+_boot = {"pid": None, "token": None}
+_heartbeat_lock = threading.Lock()
+_heartbeat_started = set()   # pids that already run a heartbeat thread
+
+
+# ── Ownership ────────────────────────────────────────────────────────────────
+
+def worker_id() -> str:
+    """This process's owner tag; regenerated after a fork (gunicorn preload)."""
+    pid = os.getpid()
+    if _boot["pid"] != pid:
+        _boot.update(pid=pid, token=uuid.uuid4().hex[:8])
+    return f"{_HOST}:{pid}:{_boot['token']}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        return True   # can't probe safely; the heartbeat decides instead
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_orphaned(job: SummaryJob, now: Optional[datetime] = None) -> bool:
+    """True if a queued/running job's owner is gone and nobody will finish it."""
+    if job.status not in ACTIVE_STATUSES:
+        return False
+    now = now or datetime.utcnow()
+    if not job.worker:   # row from before owners were recorded
+        last = job.started_at or job.created_at
+        return last is None or now - last > timedelta(seconds=STALE_JOB_S)
+    if job.worker == worker_id():
+        return False
+    host, _, rest = job.worker.partition(":")
+    pid = rest.partition(":")[0]
+    if host == _HOST and pid.isdigit():
+        if int(pid) == os.getpid() or not _pid_alive(int(pid)):
+            return True   # our pid under an older boot token, or a dead process
+    beat = job.heartbeat_at or job.started_at or job.created_at
+    return beat is None or now - beat > timedelta(seconds=3 * HEARTBEAT_S)
+
+
+def _heartbeat_loop(app: Flask):
+    me = worker_id()
+    while True:
+        try:
+            with app.app_context():
+                SummaryJob.query.filter(
+                    SummaryJob.worker == me, SummaryJob.status.in_(ACTIVE_STATUSES)
+                ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                db.session.commit()
+        except Exception as e:
+            print(f"[summary] Heartbeat failed: {e}")
+        time.sleep(HEARTBEAT_S)
+
+
+def _ensure_heartbeat(app: Flask):
+    with _heartbeat_lock:
+        if os.getpid() in _heartbeat_started:
+            return
+        _heartbeat_started.add(os.getpid())
+    threading.Thread(target=_heartbeat_loop, args=(app,), daemon=True, name="summary-heartbeat").start()
+
+
+def _reclaim(app: Flask, jobs: List[SummaryJob]) -> List[int]:
+    """Take over orphaned jobs (compare-and-set on the old owner) and run them here."""
+    me, now, taken = worker_id(), datetime.utcnow(), []
+    for job in jobs:
+        owner = SummaryJob.worker.is_(None) if job.worker is None else SummaryJob.worker == job.worker
+        if SummaryJob.query.filter(
+            SummaryJob.id == job.id, SummaryJob.status.in_(ACTIVE_STATUSES), owner
+        ).update({"status": "queued", "worker": me, "heartbeat_at": now}, synchronize_session=False):
+            taken.append(job.id)
+    db.session.commit()
+    if taken:
+        _ensure_heartbeat(app)
+    for job_id in taken:
+        _summary_executor.submit(_run_job, app, job_id)
+    return taken
+
+
+def reclaim_orphaned(session_id: int) -> int:
+    """Re-queue the session's orphaned jobs. Must be called inside an app context."""
+    jobs = SummaryJob.query.filter(
+        SummaryJob.session_id == session_id, SummaryJob.status.in_(ACTIVE_STATUSES)
+    ).all()
+    orphans = [j for j in jobs if is_orphaned(j)]
+    if not orphans:
+        return 0
+    taken = _reclaim(current_app._get_current_object(), orphans)
+    if taken:
+        print(f"[summary] Reclaimed orphaned job(s) {taken} for session {session_id}")
+    return len(taken)
+
+
+def latest_job(session_id: int) -> Optional[SummaryJob]:
+    return (
+        SummaryJob.query.filter_by(session_id=session_id)
+        .order_by(SummaryJob.id.desc())
+        .first()
+    )
+
+
+def enqueue_summary(session_id: int, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Queue a summary for `session_id` and return the job dict. If a job for
+    the session is already queued or running, that job is returned instead.
+    Must be called inside an app context.
+    """
+    reclaim_orphaned(session_id)
+    active = (
+        SummaryJob.query.filter(
+            SummaryJob.session_id == session_id,
+            SummaryJob.status.in_(ACTIVE_STATUSES),
+        )
+        .order_by(SummaryJob.id.desc())
+        .first()
+    )
+    if active:
+        return active.to_dict()
+
+    app = current_app._get_current_object()
+    job = SummaryJob(session_id=session_id, refresh=refresh,
+                     worker=worker_id(), heartbeat_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    _ensure_heartbeat(app)
+    _summary_executor.submit(_run_job, app, job.id)
+    print(f"[summary] Queued job {job.id} for session {session_id}")
+    return job.to_dict()
+
+
+def resume_pending_jobs(app: Flask) -> int:
+    """Re-queue every orphaned job (see is_orphaned); jobs with a live owner are left alone."""
+    with app.app_context():
+        orphans = [
+            j for j in SummaryJob.query.filter(SummaryJob.status.in_(ACTIVE_STATUSES))
+            if is_orphaned(j)
+        ]
+        job_ids = _reclaim(app, orphans) if orphans else []
+    if job_ids:
+        print(f"[summary] Resumed {len(job_ids)} pending job(s)")
+    return len(job_ids)
+
+
+def _run_job(app: Flask, job_id: int):
+    with app.app_context():
+        # Claim atomically so a job is only ever run by one worker.
+        now = datetime.utcnow()
+        claimed = SummaryJob.query.filter_by(id=job_id, status="queued").update(
+            {"status": "running", "started_at": now, "worker": worker_id(), "heartbeat_at": now}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(SummaryJob, job_id)
+        if job is None:   # session deleted between claim and run
+            return
+        session_id = job.session_id
+        try:
+            from AI.ai import generate_summary, apply_summary
+
+            summary_data = generate_summary(session_id, bypass_cache=bool(job.refresh))
+            if "error" in summary_data:
+                raise RuntimeError(summary_data["error"])
+            session = db.session.get(Session, session_id)
+            if session:
+                apply_summary(session, summary_data)
+            status, error = "done", None
+            print(f"[summary] Job {job_id} done for session {session_id}")
+        except Exception as e:
+            db.session.rollback()
+            status, error = "error", str(e)
+            print(f"[summary] Job {job_id} failed: {e}")
+
+        # The session (and with it the job) may have been deleted meanwhile
+        finished = SummaryJob.query.filter_by(id=job_id).update(
+            {"status": status, "error": error, "finished_at": datetime.utcnow()}
+        )
+        db.session.commit()
+        if not finished:
+            print(f"[summary] Job {job_id} vanished (session {session_id} deleted)")
@@ -1,23 +1,101 @@
-import os, json, time, sys
+import os, json, time, sys, shutil, threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from elevenlabs.client import ElevenLabs
-from recordings.audio import record_wav
 
 # NEW: DB helpers (create transcription/db_writer.py from earlier message)
-# Add repo root to Python path so "sync_engine" imports work
+# Add repo root to Python path so "recordings" / "database" imports work
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, REPO_ROOT)
+from recordings.audio import record_chunks
+from recordings.encode import encode_for_stt
+from Transcriptions.stitch import ChunkStitcher
 from database.db_manager import (
     insert_session,
     insert_transcript_segments,
-    upsert_speaker_map,
-    apply_speaker_map_to_segments, compute_and_write_mood_timeseries, insert_gemini_output
+    compute_and_write_mood_timeseries, insert_gemini_output
 )
 
+# Chunks are transcribed while the rest of the call is still being recorded
+CHUNK_SECONDS = int(os.getenv("CHUNK_SECONDS", "30"))
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+# Each chunk re-records this much of the previous one so speakers can be matched across the cut
+OVERLAP_SECONDS = float(os.getenv("CHUNK_OVERLAP_SECONDS", "3"))
+
 def to_ms(seconds: float) -> int:
     return int(round(float(seconds) * 1000))
 
 
+def segment_rows(result, session_id: str, offset_ms: int):
+    """ElevenLabs result → segment dicts, with chunk-relative times shifted by offset_ms."""
+    segments = getattr(result, "segments", None) or (result.get("segments") if isinstance(result, dict) else None)
+    rows = []
+    if segments:
+        for seg in segments:
+            speaker_label = getattr(seg, "speaker", None) or (seg.get("speaker") if isinstance(seg, dict) else "unknown")
+            text = getattr(seg, "text", None) or (seg.get("text") if isinstance(seg, dict) else "")
+            start_s = getattr(seg, "start", None) or (seg.get("start") if isinstance(seg, dict) else 0.0)
+            end_s = getattr(seg, "end", None) or (seg.get("end") if isinstance(seg, dict) else start_s)
+
+            row = {
+                "session_id": session_id,
+                "speaker_label": speaker_label,
+                "text": (text or "").strip(),
+                "start_ms": offset_ms + to_ms(start_s),
+                "end_ms": offset_ms + to_ms(end_s),
+            }
+            # skip empty text rows
+            if row["text"]:
+                rows.append(row)
+    else:
+        # fallback: whole chunk transcript as one segment
+        text = getattr(result, "text", None) or (result.get("text") if isinstance(result, dict) else "")
+        if str(text or "").strip():
+            rows = [{
+                "session_id": session_id,
+                "speaker_label": "unknown",
+                "text": str(text).strip(),
+                "start_ms": offset_ms,
+                "end_ms": offset_ms,
+            }]
+    return rows
+
+
+def write_ready(db_path, rows, segments_out):
+    """Insert stitched rows (call with db_lock held)."""
+    if rows:
+        insert_transcript_segments(db_path, rows)
+    segments_out.extend(rows)
+
+
+def transcribe_chunk(client, path, offset_ms, index, session_id, db_path, db_lock, stitcher, segments_out, failed):
+    """Runs on the STT pool: encode + send one chunk, stitch and write its segments, delete the WAV."""
+    try:
+        t0 = time.time()
+        upload_path = encode_for_stt(path)   # WAV → Opus/FLAC, ~10x / ~2x smaller
+        try:
+            with open(upload_path, "rb") as f:
+                result = client.speech_to_text.convert(
+                    file=f,
+                    model_id="scribe_v2",
+                    diarize=True,
+                )
+        finally:
+            if upload_path != path:
+                os.unlink(upload_path)
+        rows = segment_rows(result, session_id, offset_ms)
+        with db_lock:
+            # rows are released in chunk order, once the previous chunk's roles are known
+            write_ready(db_path, stitcher.add(index, rows), segments_out)
+        os.unlink(path)
+        print(f"[stt] chunk {index} @ {offset_ms / 1000:.0f}s → {len(rows)} segments ({time.time() - t0:.1f}s)")
+    except Exception as e:
+        failed.append(os.path.basename(path))
+        print(f"[stt] chunk {index} failed: {e}")
+        with db_lock:
+            write_ready(db_path, stitcher.add(index, None), segments_out)
+
+
 def main():
     load_dotenv()
 
@@ -44,58 +122,43 @@ def main():
     conn.close()
     insert_session(db_path, session_id, started_at_epoch_ms)
 
-    # 2) Record audio (WAV)
-    wav_path = "call.wav"
-    record_wav(wav_path, seconds=record_seconds, sample_rate=16000, channels=1)
-
-    # 3) STT (Batch) with diarization
+    # 2) Record in fixed-length chunks; 3) each closed chunk goes to STT + DB right away
     client = ElevenLabs(api_key=api_key)
-    print("[stt] Sending audio to ElevenLabs (scribe_v2, diarize=True)...")
-    with open(wav_path, "rb") as f:
-        result = client.speech_to_text.convert(
-            file=f,
-            model_id="scribe_v2",
-            diarize=True,
-        )
+    chunk_dir = os.path.abspath(f"chunks_{session_id}")
+    stt_pool = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+    db_lock = threading.Lock()   # one chunk insert at a time
+    stitcher = ChunkStitcher(CHUNK_SECONDS * 1000, int(OVERLAP_SECONDS * 1000))
+    segments_out, futures, failed = [], [], []
+
+    def on_chunk(path, offset_ms, index):
+        futures.append(stt_pool.submit(
+            transcribe_chunk, client, path, offset_ms, index, session_id, db_path, db_lock, stitcher,
+            segments_out, failed
+        ))
+
+    n_chunks = record_chunks(chunk_dir, on_chunk, seconds=record_seconds, chunk_seconds=CHUNK_SECONDS,
+                             sample_rate=16000, channels=1, overlap_seconds=OVERLAP_SECONDS)
+    waiting_since = time.time()
+    for fut in futures:
+        fut.result()
+    stt_pool.shutdown()
+    with db_lock:
+        write_ready(db_path, stitcher.finish(), segments_out)
+    print(f"[stt] {n_chunks} chunks transcribed, last one {time.time() - waiting_since:.1f}s after recording ended")
+    if failed:
+        print(f"[stt] {len(failed)} chunk(s) failed and were kept in {chunk_dir}: {failed}")
+    else:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
 
-    segments = getattr(result, "segments", None) or (result.get("segments") if isinstance(result, dict) else None)
+    segments_out.sort(key=lambda r: r["start_ms"])
 
-    # 4) Build rows
-    segments_out = []
-    if segments:
-        for seg in segments:
-            speaker_label = getattr(seg, "speaker", None) or (seg.get("speaker") if isinstance(seg, dict) else "unknown")
-            text = getattr(seg, "text", None) or (seg.get("text") if isinstance(seg, dict) else "")
-            start_s = getattr(seg, "start", None) or (seg.get("start") if isinstance(seg, dict) else 0.0)
-            end_s = getattr(seg, "end", None) or (seg.get("end") if isinstance(seg, dict) else start_s)
-
-            row = {
-                "session_id": session_id,
-                "speaker_label": speaker_label,
-                "text": (text or "").strip(),
-                "start_ms": to_ms(start_s),
-                "end_ms": to_ms(end_s),
-            }
-            # skip empty text rows
-            if row["text"]:
-                segments_out.append(row)
-    else:
-        # fallback: whole transcript as one segment
-        text = getattr(result, "text", None) or (result.get("text") if isinstance(result, dict) else "")
-        segments_out = [{
-            "session_id": session_id,
-            "speaker_label": "unknown",
-            "text": str(text).strip(),
-            "start_ms": 0,
-            "end_ms": 0,
-        }]
-
-    # 5) Write jsonl file (handy for debugging / demo)
+    # 4) Write jsonl file (handy for debugging / demo)
     with open(out_file, "w", encoding="utf-8") as w:
         for row in segments_out:
             w.write(json.dumps({
                 "session_id": row["session_id"],
-                "speaker": row["speaker_label"],
+                "speaker": row["speaker"],
+                "speaker_label": row["speaker_label"],
                 "text": row["text"],
                 "start_ms": row["start_ms"],
                 "end_ms": row["end_ms"],
@@ -103,34 +166,11 @@ def main():
 
     print(f"[file] Wrote {len(segments_out)} segments to {out_file}")
 
-    print("[debug] using db_path:", db_path)
-    # 6) Insert into DB
-    insert_transcript_segments(db_path, segments_out)
-    print(f"[db] Inserted {len(segments_out)} rows into transcript_segments")
-
-    # 7) Map diarized labels to seller/client (hackathon heuristic)
-    # First seen label = seller, second = client
-    seen = []
-    for r in segments_out:
-        lab = r["speaker_label"]
-        if lab != "unknown" and lab not in seen:
-            seen.append(lab)
-        if len(seen) >= 2:
-            break
-
-    if len(seen) >= 2:
-        seller_label, client_label = seen[0], seen[1]
-        upsert_speaker_map(db_path, session_id, seller_label=seller_label, client_label=client_label)
-        print(f"[map] seller={seller_label} client={client_label} (speaker_map + transcript_segments updated)")
-    else:
-        print("[map] Not enough distinct speakers found to map seller/client (ok for now)")
-    if len(seen) >= 2:
-        seller_label, client_label = seen[0], seen[1]
-        upsert_speaker_map(db_path, session_id, seller_label=seller_label, client_label=client_label)
-        apply_speaker_map_to_segments(db_path, session_id)
-        print(f"[map] seller={seller_label} client={client_label} (speaker_map + transcript_segments.speaker updated)")
-    else:
-        print("[map] Not enough distinct speakers found to map seller/customer (ok for now)")
+    # 5) Roles were assigned while stitching: chunk 0 by first voice heard
+    # (= seller), later chunks by matching speakers in the overlapped audio
+    if stitcher.fallbacks:
+        print(f"[map] {stitcher.fallbacks} chunk(s) had no speech in the overlap; "
+              "their roles fell back to first voice = seller")
     print("[done] transcription -> db complete")
 
 
@@ -0,0 +1,113 @@
+"""
+stitch.py — Join chunked STT results into one transcript with stable roles.
+
+Diarization labels ("speaker_0", ...) only mean something inside one STT
+request, and main.py sends the recording in CHUNK_SECONDS pieces. Each
+chunk after the first is recorded OVERLAP_SECONDS into the previous one
+(recordings.audio.record_chunks(overlap_seconds=...)), and ChunkStitcher
+uses that shared audio to:
+  - carry roles across the cut: a label in chunk N gets the role of the
+    chunk N-1 speaker it overlaps longest inside the shared audio; when
+    only one role was matched, a single unmatched label gets the other
+  - drop duplicate text: segments starting before the middle of the
+    overlap come from the earlier chunk, the rest from the later one,
+    except that a later-chunk segment running past the earlier chunk's end
+    replaces the earlier chunk's (cut-off) copy
+Chunk 0 uses the /api/transcribe rule (first voice heard = seller). So does
+a chunk whose predecessor failed, or whose overlap had no speech to match.
+
+Chunks finish on the STT pool in any order; add() buffers them and hands
+back rows strictly in chunk order, each with a "speaker" role.
+"""
+
+from typing import Dict, List, Optional
+
+from database.event_store import RoleMapper
+
+ROLES = ("seller", "client")
+
+
+def _overlap_ms(a: dict, b: dict, lo: int, hi: int) -> int:
+    start = max(a["start_ms"], b["start_ms"], lo)
+    end = min(a["end_ms"], b["end_ms"], hi)
+    return max(0, end - start)
+
+
+class ChunkStitcher:
+    def __init__(self, chunk_ms: int, overlap_ms: int):
+        self.chunk_ms = chunk_ms
+        self.overlap_ms = overlap_ms
+        self._pending: Dict[int, Optional[List[dict]]] = {}
+        self._next = 0
+        self._prev: Optional[List[dict]] = None   # previous chunk's rows, with roles
+        self._held: List[dict] = []               # its rows inside the next overlap, not yet released
+        self.fallbacks = 0                         # chunks > 0 that could not be linked
+
+    def add(self, index: int, rows: Optional[List[dict]]) -> List[dict]:
+        """Register chunk `index` (rows=None if it failed); returns rows now ready, in order."""
+        self._pending[index] = rows
+        ready: List[dict] = []
+        while self._next in self._pending:
+            ready.extend(self._release(self._next, self._pending.pop(self._next)))
+            self._next += 1
+        return ready
+
+    def finish(self) -> List[dict]:
+        """Rows still held back at the end of the recording."""
+        ready, self._held = self._held, []
+        return ready
+
+    def _release(self, index: int, rows: Optional[List[dict]]) -> List[dict]:
+        start = index * self.chunk_ms   # where this chunk's own audio begins
+        if rows is None:
+            ready, self._held, self._prev = self._held, [], None
+            return ready
+
+        rows = sorted(rows, key=lambda r: r["start_ms"])
+        linked = self._prev is not None and self.overlap_ms > 0
+        roles = self._link(rows, start) if linked else {}
+        if linked and not roles:
+            self.fallbacks += 1
+        first_voice = RoleMapper()
+        for r in rows:
+            label = r.get("speaker_label") or "unknown"
+            r["speaker"] = roles.get(label) or first_voice(label)
+        self._prev = rows
+
+        if linked:
+            cut = start - self.overlap_ms // 2
+            spill = [r for r in rows if r["start_ms"] < cut and r["end_ms"] > start]
+            ready = [
+                p for p in self._held
+                if p["start_ms"] < cut and not any(_overlap_ms(p, r, start - self.overlap_ms, start) for r in spill)
+            ]
+            rows = [r for r in rows if r["start_ms"] >= cut or r in spill]
+        else:
+            ready = list(self._held)
+        next_overlap = start + self.chunk_ms - self.overlap_ms
+        ready += [r for r in rows if r["start_ms"] < next_overlap]
+        self._held = [r for r in rows if r["start_ms"] >= next_overlap]
+        return ready
+
+    def _link(self, rows: List[dict], start: int) -> Dict[str, str]:
+        """Label → role for this chunk, from who was speaking in the shared audio."""
+        lo, hi = start - self.overlap_ms, start
+        votes: Dict[str, Dict[str, int]] = {}
+        for r in rows:
+            label = r.get("speaker_label") or "unknown"
+            for p in self._prev:
+                ms = _overlap_ms(r, p, lo, hi)
+                if ms:
+                    tally = votes.setdefault(label, {})
+                    tally[p["speaker"]] = tally.get(p["speaker"], 0) + ms
+        roles = {label: max(tally, key=tally.get) for label, tally in votes.items()}
+
+        unmatched = []
+        for r in rows:
+            label = r.get("speaker_label") or "unknown"
+            if label not in roles and label not in unmatched:
+                unmatched.append(label)
+        used = set(roles.values())
+        if len(used) == 1 and len(unmatched) == 1:
+            roles[unmatched[0]] = next(role for role in ROLES if role not in used)
+        return roles
@@ -10,6 +10,24 @@ from config import Config
 from models import db
 
 
+def start_transcription(session_id, record_seconds: str):
+    """Run the ElevenLabs recorder (Transcriptions/main.py) for a session in a background subprocess."""
+    def run_transcription():
+        script_path = os.path.join(os.path.dirname(__file__), "Transcriptions", "main.py")
+        env = os.environ.copy()
+        env["SESSION_ID"] = str(session_id)
+        env["RECORD_SECONDS"] = record_seconds
+        env["ADPitch_DB"] = os.path.join(os.path.dirname(__file__), "instance", "senselense.db")
+        print(f"[record] Starting ElevenLabs transcription for session {session_id}")
+        subprocess.run(
+            ["python3", script_path],
+            cwd=os.path.join(os.path.dirname(__file__), "Transcriptions"),
+            env=env,
+        )
+
+    threading.Thread(target=run_transcription, daemon=True).start()
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
     app.config.from_object(Config)
@@ -17,6 +35,9 @@ def create_app() -> Flask:
     CORS(app)
     db.init_app(app)
 
+    import metrics
+    metrics.init_app(app)
+
     from blueprints.api import api_bp
     app.register_blueprint(api_bp, url_prefix="/api")
 
@@ -37,13 +58,10 @@ def create_app() -> Flask:
 
     # Import presage helpers (gracefully handles missing deepface/cv2)
     try:
-        from presage_capture import start_presage_for_session, stop_presage_for_session
-        _presage_available = True
+        import presage_capture
     except Exception as e:
         print(f"[presage] Not available: {e}")
-        _presage_available = False
-        def start_presage_for_session(*a, **kw): return False
-        def stop_presage_for_session(*a, **kw): return False
+        presage_capture = None
 
     # ── /api/record — Start transcription + Presage when Record is clicked ──
     @app.route('/api/record', methods=['POST'])
@@ -54,30 +72,27 @@ def create_app() -> Flask:
         flask_url = request.host_url.rstrip("/")  # e.g. http://localhost:5050
 
         # 1) Start ElevenLabs transcription in a subprocess
-        def run_transcription():
-            script_path = os.path.join(os.path.dirname(__file__), "Transcriptions", "main.py")
-            env = os.environ.copy()
-            env["SESSION_ID"] = str(session_id)
-            env["RECORD_SECONDS"] = record_seconds
-            env["ADPitch_DB"] = os.path.join(os.path.dirname(__file__), "instance", "senselense.db")
-            print(f"[record] Starting ElevenLabs transcription for session {session_id}")
-            subprocess.run(
-                ["python3", script_path],
-                cwd=os.path.join(os.path.dirname(__file__), "Transcriptions"),
-                env=env,
+        start_transcription(session_id, record_seconds)
+
+        # 2) Start Presage facial emotion capture — unless the browser is already
+        #    posting webcam frames to /analyze-frame; two capture paths would
+        #    write duplicate presage events for the same session.
+        frames_from_browser = bool(data.get("frames_from_browser"))
+        started = False
+        if presage_capture is not None and session_id and not frames_from_browser:
+            started = presage_capture.start_presage_for_session(
+                int(session_id),
+                flask_url=flask_url,
+                app=app if app.config["PRESAGE_DIRECT_DB"] else None,
             )
-
-        threading.Thread(target=run_transcription, daemon=True).start()
-
-        # 2) Start Presage facial emotion capture
-        if _presage_available and session_id:
-            started = start_presage_for_session(int(session_id), flask_url=flask_url)
             print(f"[presage] Capture started for session {session_id}: {started}")
+        elif frames_from_browser:
+            print(f"[presage] Browser sends frames for session {session_id}; server capture not started")
 
         return jsonify({
             "status": "recording triggered",
             "session_id": session_id,
-            "presage": _presage_available,
+            "presage": bool(started),
         }), 200
 
     # ── Patch end session to also stop Presage ────────────────────────────────
@@ -93,13 +108,51 @@ def create_app() -> Flask:
                 seg = request.path.strip("/").split("/")
                 # path: api/sessions/<id>/end
                 sid = int(seg[seg.index("sessions") + 1])
-                stop_presage_for_session(sid)
+                if presage_capture is not None:
+                    presage_capture.stop_presage_for_session(sid)
             except Exception:
                 pass
         return response
 
     with app.app_context():
         db.create_all()
+        # create_all skips tables that already exist, so add any nullable
+        # columns and indexes declared since an older DB was created.
+        inspector = db.inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    col_type = column.type.compile(dialect=db.engine.dialect)
+                    with db.engine.begin() as conn:
+                        conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}')
+                    print(f"[db] Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(bind=db.engine, checkfirst=True)
+        from search_index import ensure_index
+        ensure_index()
+        from timeline_cache import ensure_db_id
+        ensure_db_id()
+
+    if app.config["DEEPFACE_WARMUP"] == "startup":
+        from blueprints.api import start_deepface_warmup
+        start_deepface_warmup()
+
+    if "ai" in app.blueprints:
+        # Only a process that actually serves requests picks up leftover jobs;
+        # scripts that import `app` (seed.py, benchmark.py, ...) never do.
+        from AI.summary_jobs import resume_pending_jobs
+        _resume_lock = threading.Lock()
+        _resumed = []
+
+        @app.before_request
+        def resume_summary_jobs_once():
+            if _resumed:
+                return
+            with _resume_lock:
+                if not _resumed:
+                    _resumed.append(True)
+                    resume_pending_jobs(app)
 
     return app
 
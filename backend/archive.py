@@ -0,0 +1,208 @@
+"""
+archive.py — Cold archive of ended sessions to compressed columnar files.
+
+Moves every event of an old, ended session (row events and packed emotion
+chunks) out of SQLite into one `.npz` file per session under
+Config.ARCHIVE_DIR, then deletes them from the DB and leaves a
+SessionArchive stub. Session.all_events() reads archived events back
+transparently, so GET /api/sessions/<id>?events=true keeps working.
+
+File layout (numpy savez_compressed, no pickled objects):
+    ids, timestamp_ms        int64
+    valence                  float64 (NaN = NULL)
+    source, emotion, speaker int16 codes into vocab (-1 = NULL)
+    text_offsets             int64, len n+1 — text i is text_bytes[off[i]:off[i+1]]
+    text_bytes               uint8 (UTF-8)
+    text_null                bool
+    vocab, meta              uint8 (UTF-8 JSON)
+
+Usage:
+    python3 archive.py --older-than-days 30          # archive all eligible sessions
+    python3 archive.py --older-than-days 30 --dry-run
+    python3 archive.py --session-id 12
+"""
+
+import os
+import io
+import json
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from models import db, Event, EmotionChunk, Session, SessionArchive
+
+ARCHIVE_FORMAT_VERSION = 1
+
+
+def _archive_dir() -> str:
+    path = current_app.config["ARCHIVE_DIR"]
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _encode(values: List[Optional[str]], vocab: List[str]):
+    import numpy as np
+    index = {v: i for i, v in enumerate(vocab)}
+    codes = []
+    for v in values:
+        if v is None:
+            codes.append(-1)
+            continue
+        if v not in index:
+            index[v] = len(vocab)
+            vocab.append(v)
+        codes.append(index[v])
+    return np.asarray(codes, dtype=np.int16)
+
+
+def _json_bytes(obj) -> Any:
+    import numpy as np
+    return np.frombuffer(json.dumps(obj).encode("utf-8"), dtype=np.uint8)
+
+
+def write_archive(session_id: int, events: List[Any]) -> bytes:
+    """Serialize events into the .npz layout above and return the file bytes."""
+    import numpy as np
+
+    texts = [e.text for e in events]
+    encoded = [(t or "").encode("utf-8") for t in texts]
+    offsets = np.zeros(len(events) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    vocab: Dict[str, List[str]] = {"source": [], "emotion": [], "speaker": []}
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        ids=np.asarray([e.id for e in events], dtype=np.int64),
+        timestamp_ms=np.asarray([e.timestamp_ms for e in events], dtype=np.int64),
+        valence=np.asarray([np.nan if e.valence is None else e.valence for e in events], dtype=np.float64),
+        source=_encode([e.source for e in events], vocab["source"]),
+        emotion=_encode([e.emotion for e in events], vocab["emotion"]),
+        speaker=_encode([e.speaker for e in events], vocab["speaker"]),
+        text_offsets=offsets,
+        text_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        text_null=np.asarray([t is None for t in texts], dtype=bool),
+        vocab=_json_bytes(vocab),
+        meta=_json_bytes({"version": ARCHIVE_FORMAT_VERSION, "session_id": session_id, "count": len(events)}),
+    )
+    return buf.getvalue()
+
+
+def read_archive(path: str, session_id: int) -> List[Any]:
+    """Load an archive file back into Event-like objects."""
+    import numpy as np
+    from sample_store import PackedEvent
+
+    with np.load(path, allow_pickle=False) as z:
+        vocab = json.loads(z["vocab"].tobytes().decode("utf-8"))
+        ids = z["ids"].tolist()
+        ts = z["timestamp_ms"].tolist()
+        valence = z["valence"].tolist()
+        source = z["source"].tolist()
+        emotion = z["emotion"].tolist()
+        speaker = z["speaker"].tolist()
+        offsets = z["text_offsets"].tolist()
+        text_blob = z["text_bytes"].tobytes()
+        text_null = z["text_null"].tolist()
+
+    def decode(codes, values, i):
+        return None if codes[i] < 0 else values[codes[i]]
+
+    events = []
+    for i in range(len(ids)):
+        v = valence[i]
+        events.append(PackedEvent(
+            ids[i], session_id, ts[i],
+            decode(source, vocab["source"], i),
+            decode(emotion, vocab["emotion"], i),
+            None if v != v else v,   # NaN → NULL
+            None if text_null[i] else text_blob[offsets[i]:offsets[i + 1]].decode("utf-8"),
+            speaker=decode(speaker, vocab["speaker"], i),
+        ))
+    return events
+
+
+def archived_events(stub: SessionArchive) -> List[Any]:
+    return read_archive(os.path.join(_archive_dir(), stub.path), stub.session_id)
+
+
+def archive_session(session_id: int) -> Optional[SessionArchive]:
+    """
+    Move one session's events into its archive file and leave a stub.
+    The file is written and verified before anything is deleted from SQLite.
+    Must run inside an app context.
+    """
+    from sample_store import merged_events, sample_aggregates
+
+    session = Session.query.get(session_id)
+    if session is None or session.ended_at is None or session.archive is not None:
+        return None
+
+    events = merged_events(session_id)
+    rel_path = f"session_{session_id}.npz"
+    path = os.path.join(_archive_dir(), rel_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(write_archive(session_id, events))
+    if len(read_archive(tmp_path, session_id)) != len(events):
+        os.unlink(tmp_path)
+        raise RuntimeError(f"Archive verification failed for session {session_id}")
+    os.replace(tmp_path, path)
+
+    Event.query.filter_by(session_id=session_id).delete(synchronize_session=False)
+    EmotionChunk.query.filter_by(session_id=session_id).delete(synchronize_session=False)
+    agg = sample_aggregates(events)
+    stub = SessionArchive(
+        session_id=session_id,
+        path=rel_path,
+        event_count=len(events),
+        size_bytes=os.path.getsize(path),
+        valence_sum=agg["valence_sum"],
+        valence_n=agg["valence_n"],
+        emotion_counts=json.dumps(agg["emotions"]),
+        max_ms=agg["max_ms"],
+        transcript_n=agg["transcript_n"],
+    )
+    db.session.add(stub)
+    db.session.commit()
+    print(f"[archive] Session {session_id}: {len(events)} events → {rel_path} ({stub.size_bytes} bytes)")
+    return stub
+
+
+def eligible_sessions(older_than_days: int) -> List[int]:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    rows = (
+        db.session.query(Session.id)
+        .outerjoin(SessionArchive, SessionArchive.session_id == Session.id)
+        .filter(Session.ended_at.isnot(None), Session.ended_at < cutoff, SessionArchive.session_id.is_(None))
+        .order_by(Session.ended_at)
+        .all()
+    )
+    return [r[0] for r in rows]
+
+
+# ── Standalone CLI ────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive ended sessions to compressed columnar files")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--older-than-days", type=int, help="Archive sessions ended more than N days ago")
+    group.add_argument("--session-id", type=int, help="Archive a single ended session")
+    parser.add_argument("--dry-run", action="store_true", help="List sessions without archiving")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the DB afterwards to return space to the OS")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DEEPFACE_WARMUP", "off")
+    from app import app
+
+    with app.app_context():
+        ids = [args.session_id] if args.session_id else eligible_sessions(args.older_than_days)
+        if args.dry_run:
+            print(f"[archive] {len(ids)} session(s) eligible: {ids}")
+        else:
+            done = [sid for sid in ids if archive_session(sid)]
+            print(f"[archive] Archived {len(done)} of {len(ids)} session(s)")
+            if args.vacuum and done:
+                db.session.execute(db.text("VACUUM"))
@@ -0,0 +1,245 @@
+"""
+benchmark.py — Scaling benchmark for the hot API endpoints.
+
+Seeds one synthetic session per size (same shapes as seed.py: presage
+samples every 2.4 s plus a diarized transcript line every 12–18 s) into a
+throwaway SQLite DB, then times each endpoint through the Flask test
+client. Results go to a JSON report that can be diffed between commits.
+
+Usage:
+    python3 benchmark.py                                  # 1k,10k,100k events
+    python3 benchmark.py --sizes 1k,10k,100k,1m --repeat 5
+    python3 benchmark.py --out bench_new.json --compare bench_old.json --threshold 1.25
+
+With --compare, exits 1 if any endpoint's median got slower than
+`threshold` × the baseline at the same size.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = "1k,10k,100k"
+RNG_SEED = 1234
+INGEST_BATCH = 1000        # events per POST in the ingest benchmark
+TRANSCRIPT_EVERY = 6       # ~one transcript line per 6 presage samples (15 s / 2.4 s)
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+
+def synthetic_events(session_id: int, n: int, rng: random.Random):
+    """Yield n event dicts shaped like seed.py's presage + elevenlabs rows."""
+    from seed import EMOTIONS, SCRIPT_PARTS, SAMPLE_INTERVAL_MS
+
+    t = 0
+    line = 0
+    for i in range(n):
+        if i % (TRANSCRIPT_EVERY + 1) == TRANSCRIPT_EVERY:
+            speaker, text = SCRIPT_PARTS[line % len(SCRIPT_PARTS)]
+            line += 1
+            yield {"session_id": session_id, "timestamp_ms": t + rng.randint(0, 2000),
+                   "source": "elevenlabs", "emotion": None, "valence": None,
+                   "speaker": speaker, "text": text}
+            continue
+        emo = rng.choice(EMOTIONS)
+        valence = 0.5 if emo in ("happy", "engaged") else (-0.5 if emo == "negative" else 0.0)
+        valence = max(-1.0, min(1.0, valence + rng.uniform(-0.2, 0.2)))
+        yield {"session_id": session_id, "timestamp_ms": t, "source": "presage",
+               "emotion": emo, "valence": valence, "speaker": None, "text": None}
+        t += SAMPLE_INTERVAL_MS
+
+
+def seed_session(client_id: int, n: int, rng: random.Random) -> int:
+    from models import db, Session, Event
+
+    started = datetime.utcnow() - timedelta(days=1)
+    session = Session(
+        client_id=client_id,
+        title=f"Benchmark {n} events",
+        started_at=started,
+        ended_at=started + timedelta(milliseconds=n * 2400),
+    )
+    db.session.add(session)
+    db.session.commit()
+
+    batch = []
+    for row in synthetic_events(session.id, n, rng):
+        batch.append(row)
+        if len(batch) >= 5000:
+            Event.bulk_insert(batch)
+            batch = []
+    Event.bulk_insert(batch)
+    db.session.commit()
+    return session.id
+
+
+def timed(fn, repeat: int):
+    runs, size = [], 0
+    for _ in range(repeat):
+        t = time.perf_counter()
+        size = fn()
+        runs.append((time.perf_counter() - t) * 1000)
+    return {
+        "runs_ms": [round(r, 2) for r in runs],
+        "min_ms": round(min(runs), 2),
+        "median_ms": round(statistics.median(runs), 2),
+        "max_ms": round(max(runs), 2),
+        "bytes": size,
+    }
+
+
+def run_benchmarks(app, sizes, repeat: int):
+    from models import db, Client
+    from sample_store import merged_events
+    from AI import compaction
+
+    rng = random.Random(RNG_SEED)
+    client = app.test_client()
+    results = []
+
+    with app.app_context():
+        owner = Client(name="Benchmark Client", company="Bench Co")
+        db.session.add(owner)
+        db.session.commit()
+        owner_id = owner.id
+
+    for n in sizes:
+        with app.app_context():
+            t = time.perf_counter()
+            sid = seed_session(owner_id, n, rng)
+            seed_ms = (time.perf_counter() - t) * 1000
+        print(f"[bench] Seeded {n:,} events in {seed_ms:.0f} ms (session {sid})")
+
+        def get(url):
+            def call():
+                resp = client.get(url)
+                assert resp.status_code == 200, f"{url} → {resp.status_code}"
+                return len(resp.get_data())
+            return call
+
+        ingest_rows = [
+            {k: v for k, v in row.items() if k != "session_id"}
+            for row in synthetic_events(sid, min(n, INGEST_BATCH), rng)
+        ]
+
+        def ingest():
+            resp = client.post(f"/api/sessions/{sid}/events", json=ingest_rows)
+            assert resp.status_code == 201, f"ingest → {resp.status_code}"
+            return len(resp.get_data())
+
+        def timeline():
+            with app.app_context():
+                events = merged_events(sid)
+                text = compaction.compact_transcript(events)
+                moods = compaction.mood_changepoints(events)
+                return len(text) + len(json.dumps(moods))
+
+        cases = [
+            ("get_session_events", get(f"/api/sessions/{sid}?events=true")),
+            ("get_insights", get(f"/api/sessions/{sid}/insights")),
+            ("list_sessions", get("/api/sessions")),
+            ("list_clients", get("/api/clients")),
+            ("timeline_build", timeline),
+            ("export_ndjson", get(f"/api/sessions/{sid}/export?format=ndjson")),
+            ("client_trends", get(f"/api/clients/{owner_id}/trends")),
+            # Last: it grows the session by INGEST_BATCH rows per run.
+            (f"ingest_events_{len(ingest_rows)}", ingest),
+        ]
+        for name, fn in cases:
+            r = timed(fn, repeat)
+            r.update({"size": n, "endpoint": name})
+            results.append(r)
+            print(f"[bench] {n:>9,}  {name:<24} median {r['median_ms']:>10.1f} ms")
+    return results
+
+
+def compare(results, baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = {(r["size"], r["endpoint"]): r for r in json.load(f)["results"]}
+    ok = True
+    print(f"\n{'size':>9}  {'endpoint':<24} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for r in results:
+        base = baseline.get((r["size"], r["endpoint"]))
+        if not base or not base["median_ms"]:
+            continue
+        ratio = r["median_ms"] / base["median_ms"]
+        flag = "  ← regression" if ratio > threshold else ""
+        ok = ok and ratio <= threshold
+        print(f"{r['size']:>9,}  {r['endpoint']:<24} {base['median_ms']:>10.1f} {r['median_ms']:>10.1f} {ratio:>6.2f}x{flag}")
+    return ok
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time hot API endpoints against synthetic sessions")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated event counts, e.g. 1k,10k,1m")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per endpoint")
+    parser.add_argument("--out", default="bench_report.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Baseline report to compare medians against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Max allowed new/base median ratio")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the seeded DB and print its path")
+    args = parser.parse_args()
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    # Point the app at a throwaway DB before it is imported (Config reads env at import).
+    workdir = tempfile.mkdtemp(prefix="senselense-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["DEEPFACE_WARMUP"] = "off"
+    os.environ["LIVE_SUMMARY"] = "false"
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+
+    try:
+        results = run_benchmarks(app, sizes, args.repeat)
+    finally:
+        if args.keep_db:
+            print(f"[bench] DB kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "rng_seed": RNG_SEED,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[bench] Report written to {args.out}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,34 @@
 # FILE: api.py - The logic center. This is where you plug in Presage and ElevenLabs data.
 import os
+import json
 import base64
+import time
 import tempfile
 import threading
-import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-from flask import Blueprint, jsonify, request
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from models import db, Client, Session, Event
 from datetime import datetime
+import metrics
+import timeline_cache
 
 api_bp = Blueprint("api", __name__)
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "sk_abeee70f4b3aea3e51d9f4e375fb196c0ceaf31ae812410d")
+# Point speech-to-text at another host (e.g. the loadtest.py mock server)
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL") or None
 
 # ── DeepFace async executor ───────────────────────────────────────────────────
 # All DeepFace work runs in this pool so Flask threads are never blocked.
-_df_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="deepface")
+DF_WORKERS = 2
+_df_executor = ThreadPoolExecutor(max_workers=DF_WORKERS, thread_name_prefix="deepface")
+# Frames wait in a per-session slot (newest wins) rather than the executor's
+# unbounded queue; at most DF_MAX_QUEUED sessions can be waiting at once.
+DF_MAX_QUEUED = int(os.getenv("DEEPFACE_MAX_QUEUED", "32"))
+DF_FRAME_INTERVAL_MS = 2400        # browser's normal cadence
+DF_MAX_FRAME_INTERVAL_MS = 15000   # slowest rate we'll ask a client to back off to
 _df_ready = False
+_df_warmup_started = False
 _df_lock = threading.Lock()
 
 EMOTION_MAP = {
@@ -31,58 +43,306 @@ VALENCE_MAP = {
 
 def _warmup_deepface():
     """Pre-load model weights so first real frame is instant."""
-    global _df_ready
     try:
-        import cv2
+        import numpy as np
         from deepface import DeepFace
         # Tiny 1x1 black image — just enough to trigger model load
         blank = np.zeros((48, 48, 3), dtype=np.uint8)
         DeepFace.analyze(img_path=blank, actions=['emotion'],
                          enforce_detection=False, silent=True,
                          detector_backend='opencv')
-        with _df_lock:
-            _df_ready = True
+        _df_mark_ready()
         print("[presage] DeepFace model warmed up ✓")
     except Exception as e:
         print(f"[presage] Warmup failed (non-fatal): {e}")
 
 
-# Kick off warmup in background immediately on import
-threading.Thread(target=_warmup_deepface, daemon=True).start()
+def _df_mark_ready():
+    """The model is loaded once any analyze call (warmup or a real frame) returns."""
+    global _df_ready
+    if not _df_ready:
+        with _df_lock:
+            _df_ready = True
 
 
-def _run_deepface(frame_bytes: bytes):
-    """Run DeepFace in the thread pool. Returns (emotion, valence, raw)."""
-    import cv2
+def start_deepface_warmup():
+    """Start the background warmup once. Mode is Config.DEEPFACE_WARMUP."""
+    global _df_warmup_started
+    with _df_lock:
+        if _df_warmup_started:
+            return
+        _df_warmup_started = True
+    threading.Thread(target=_warmup_deepface, daemon=True).start()
+
+
+def _warmup_on_first_request():
+    if current_app.config.get("DEEPFACE_WARMUP") == "first-request":
+        start_deepface_warmup()
+
+
+# ── DeepFace instrumentation ─────────────────────────────────────────────────
+# Per-stage timers and pool counters, so "model slow" (detect/classify grow)
+# can be told apart from "pool saturated" (queue_wait and queue depth grow,
+# timeouts happen while still queued). Surfaced in /health and /metrics.
+DF_STAGES = ("b64_decode", "queue_wait", "imdecode", "detect", "classify")
+_df_stats = {
+    "submitted": 0, "started": 0, "completed": 0, "superseded": 0, "rejected": 0,
+    "timeouts_queued": 0, "timeouts_running": 0, "errors": 0, "cold_frames": 0,
+}
+_df_stage_hist = {stage: metrics.Histogram(metrics.LATENCY_BUCKETS) for stage in DF_STAGES}
+
+
+def _df_count(key: str, n: int = 1):
+    with _df_lock:
+        _df_stats[key] += n
+
+
+def _df_stage(stage: str, since: float, timings: dict) -> float:
+    """Record time since `since` for a stage; returns now for chaining."""
+    now = time.perf_counter()
+    with _df_lock:
+        _df_stage_hist[stage].observe(now - since)
+    timings[stage] = round((now - since) * 1000, 1)
+    return now
+
+
+def deepface_stats() -> dict:
+    with _df_lock:
+        stats = dict(_df_stats)
+        stage_ms = {
+            stage: {"count": h.count, "avg_ms": round(h.sum / h.count * 1000, 1) if h.count else None}
+            for stage, h in _df_stage_hist.items()
+        }
+    return {
+        "ready": _df_ready,
+        "warmup_started": _df_warmup_started,
+        "workers": DF_WORKERS,
+        "queue_depth": len(_df_slots),
+        "max_queued": DF_MAX_QUEUED,
+        "running": stats["started"] - stats["completed"],
+        "service_ms": round(_df_service_ms, 1) if _df_service_ms else None,
+        "next_frame_ms": recommended_frame_interval_ms(),
+        **stats,
+        "stage_ms": stage_ms,
+    }
+
+
+def _deepface_metric_lines():
+    s = deepface_stats()
+    p = metrics.PREFIX
+    lines = [
+        f"# HELP {p}_deepface_stage_seconds Time per analyze-frame stage.",
+        f"# TYPE {p}_deepface_stage_seconds histogram",
+    ]
+    with _df_lock:
+        for stage, h in _df_stage_hist.items():
+            lines += h.lines(f"{p}_deepface_stage_seconds", f'stage="{stage}"')
+    lines += [
+        f"# HELP {p}_deepface_queue_depth Frames waiting for a DeepFace worker.",
+        f"# TYPE {p}_deepface_queue_depth gauge",
+        f"{p}_deepface_queue_depth {s['queue_depth']}",
+        f"# HELP {p}_deepface_running Frames currently being analyzed.",
+        f"# TYPE {p}_deepface_running gauge",
+        f"{p}_deepface_running {s['running']}",
+        f"# HELP {p}_deepface_workers DeepFace pool size.",
+        f"# TYPE {p}_deepface_workers gauge",
+        f"{p}_deepface_workers {s['workers']}",
+        f"# HELP {p}_deepface_model_ready 1 once the model is warm.",
+        f"# TYPE {p}_deepface_model_ready gauge",
+        f"{p}_deepface_model_ready {int(s['ready'])}",
+        f"# HELP {p}_deepface_frames_total Frames submitted to the pool.",
+        f"# TYPE {p}_deepface_frames_total counter",
+        f"{p}_deepface_frames_total {s['submitted']}",
+        f"# HELP {p}_deepface_superseded_total Queued frames replaced by a newer frame from the same session.",
+        f"# TYPE {p}_deepface_superseded_total counter",
+        f"{p}_deepface_superseded_total {s['superseded']}",
+        f"# HELP {p}_deepface_rejected_total Frames turned away because the queue was full.",
+        f"# TYPE {p}_deepface_rejected_total counter",
+        f"{p}_deepface_rejected_total {s['rejected']}",
+        f"# HELP {p}_deepface_next_frame_ms Frame interval currently recommended to clients.",
+        f"# TYPE {p}_deepface_next_frame_ms gauge",
+        f"{p}_deepface_next_frame_ms {s['next_frame_ms']}",
+        f"# HELP {p}_deepface_cold_frames_total Frames analyzed before the model was warm.",
+        f"# TYPE {p}_deepface_cold_frames_total counter",
+        f"{p}_deepface_cold_frames_total {s['cold_frames']}",
+        f"# HELP {p}_deepface_timeouts_total Frames that missed the response deadline, by where they were.",
+        f"# TYPE {p}_deepface_timeouts_total counter",
+        f'{p}_deepface_timeouts_total{{stage="queued"}} {s["timeouts_queued"]}',
+        f'{p}_deepface_timeouts_total{{stage="running"}} {s["timeouts_running"]}',
+        f"# HELP {p}_deepface_errors_total Frames where DeepFace raised.",
+        f"# TYPE {p}_deepface_errors_total counter",
+        f"{p}_deepface_errors_total {s['errors']}",
+    ]
+    return lines
+
+
+metrics.register_collector(_deepface_metric_lines)
+
+
+def deepface_split_analyze(frame, timings: dict = None, since: float = None):
+    """
+    DeepFace.analyze(img_path=frame, detector_backend='opencv') as two calls,
+    so detection and classification are timed as separate stages. extract_faces
+    runs the same detector with analyze's defaults (align=True, no expansion);
+    color_face='bgr' / normalize_face=False give back the BGR 0-255 crop that
+    analyze would classify, and detector_backend='skip' then only resizes and
+    classifies it. With no face found both paths use the whole frame.
+    deepface_check.py compares the two on sample frames.
+    """
+    import numpy as np
     from deepface import DeepFace
-    img_array = np.frombuffer(frame_bytes, dtype=np.uint8)
-    frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-    if frame is None:
-        return None, None, None
+
+    timings = timings if timings is not None else {}
+    t = since if since is not None else time.perf_counter()
+    faces = DeepFace.extract_faces(
+        img_path=frame,
+        detector_backend='opencv',   # <-- MUCH faster than default mtcnn
+        enforce_detection=False,
+        align=True,
+        color_face='bgr',
+        normalize_face=False,
+    )
+    t = _df_stage("detect", t, timings)
+    face = faces[0]["face"].astype(np.uint8) if faces else frame
+    result = DeepFace.analyze(
+        img_path=face,
+        actions=['emotion'],
+        enforce_detection=False,
+        silent=True,
+        detector_backend='skip',
+    )
+    _df_stage("classify", t, timings)
+    return result
+
+
+def _run_deepface(frame_bytes: bytes, submitted_at: float = None, timings: dict = None):
+    """Run DeepFace in the thread pool. Returns (emotion, valence, raw)."""
+    timings = timings if timings is not None else {}
+    t = time.perf_counter()
+    if submitted_at is not None:
+        _df_stage("queue_wait", submitted_at, timings)
+    with _df_lock:
+        _df_stats["started"] += 1
+        if not _df_ready:
+            _df_stats["cold_frames"] += 1
     try:
-        result = DeepFace.analyze(
-            img_path=frame,
-            actions=['emotion'],
-            enforce_detection=False,
-            silent=True,
-            detector_backend='opencv',   # <-- MUCH faster than default mtcnn
-        )
-        if isinstance(result, list):
-            result = result[0]
-        dominant = result.get('dominant_emotion', 'neutral').lower()
-        mapped = EMOTION_MAP.get(dominant, 'neutral')
-        valence = VALENCE_MAP.get(dominant, 0.0)
-        return mapped, valence, dominant
+        import cv2
+        import numpy as np
+        img_array = np.frombuffer(frame_bytes, dtype=np.uint8)
+        frame = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+        t = _df_stage("imdecode", t, timings)
+        if frame is None:
+            return None, None, None
+        try:
+            result = deepface_split_analyze(frame, timings, t)
+            _df_mark_ready()
+            if isinstance(result, list):
+                result = result[0]
+            dominant = result.get('dominant_emotion', 'neutral').lower()
+            mapped = EMOTION_MAP.get(dominant, 'neutral')
+            valence = VALENCE_MAP.get(dominant, 0.0)
+            return mapped, valence, dominant
+        except Exception as e:
+            _df_count("errors")
+            print(f"[presage] DeepFace error: {e}")
+            return 'neutral', 0.0, 'neutral'
+    finally:
+        _df_count("completed")
+
+
+# ── Newest-frame-per-session queue ───────────────────────────────────────────
+# A session only ever has one frame waiting. When a newer frame arrives, the
+# waiting one is superseded (its request returns at once, nothing is stored),
+# so a backed-up pool works on fresh frames instead of a pile of stale ones.
+DF_SUPERSEDED = ("neutral", 0.0, "superseded")
+DF_ACTIVE_WINDOW_S = 10.0   # a session counts as active if it sent a frame this recently
+
+_df_slots = {}              # session_id -> (frame_bytes, submitted_at, timings, Future); insertion = FIFO
+_df_last_seen = {}          # session_id -> monotonic time of last frame
+_df_service_ms = 0.0        # EWMA of imdecode + detect + classify on a warm model
+
+
+def _submit_frame(session_id: int, frame_bytes: bytes, submitted_at: float, timings: dict):
+    """Queue the newest frame for a session. Returns its Future, or None if the queue is full."""
+    future = Future()
+    with _df_lock:
+        now = time.monotonic()
+        _df_last_seen[session_id] = now
+        for sid, seen in list(_df_last_seen.items()):
+            if now - seen > DF_ACTIVE_WINDOW_S * 6:
+                del _df_last_seen[sid]
+
+        old = _df_slots.get(session_id)
+        if old is None and len(_df_slots) >= DF_MAX_QUEUED:
+            _df_stats["rejected"] += 1
+            return None
+        _df_slots[session_id] = (frame_bytes, submitted_at, timings, future)   # keeps its place in line
+        _df_stats["submitted"] += 1
+        if old is not None:
+            _df_stats["superseded"] += 1
+    if old is not None:
+        old[3].set_result(DF_SUPERSEDED)
+    else:
+        # One drain task per waiting session; a superseding frame reuses it.
+        _df_executor.submit(_drain_one_frame)
+    return future
+
+
+def _drain_one_frame():
+    global _df_service_ms
+    with _df_lock:
+        if not _df_slots:
+            return
+        session_id = next(iter(_df_slots))
+        frame_bytes, submitted_at, timings, future = _df_slots.pop(session_id)
+        warm = _df_ready
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = _run_deepface(frame_bytes, submitted_at, timings)
     except Exception as e:
-        print(f"[presage] DeepFace error: {e}")
-        return 'neutral', 0.0, 'neutral'
+        future.set_exception(e)
+        return
+    if warm and "classify" in timings:
+        service = timings.get("imdecode", 0) + timings.get("detect", 0) + timings["classify"]
+        with _df_lock:
+            _df_service_ms = service if not _df_service_ms else 0.8 * _df_service_ms + 0.2 * service
+    future.set_result(result)
+
+
+def recommended_frame_interval_ms() -> int:
+    """
+    How long a client should wait before its next frame: the normal cadence,
+    stretched so all active sessions fit the pool's measured throughput, and
+    further while a backlog is waiting.
+    """
+    with _df_lock:
+        now = time.monotonic()
+        active = sum(1 for seen in _df_last_seen.values() if now - seen <= DF_ACTIVE_WINDOW_S)
+        backlog = len(_df_slots)
+        service_ms = _df_service_ms
+    interval = float(DF_FRAME_INTERVAL_MS)
+    if service_ms:
+        interval = max(interval, active * service_ms / DF_WORKERS * 1.25)   # 25% headroom
+    if backlog > DF_WORKERS:
+        interval *= backlog / DF_WORKERS
+    return int(min(DF_MAX_FRAME_INTERVAL_MS, interval))
+
+
+def _notify_live_summary(session_id: int, latest_ms: int):
+    """Let live-mode summarization schedule any window that just completed."""
+    if "ai" not in current_app.blueprints:
+        return
+    from AI.rolling_summary import on_events
+    on_events(current_app._get_current_object(), session_id, latest_ms)
 
 
 # ── Health ────────────────────────────────────────────────────────────────────
 
 @api_bp.get("/health")
 def health():
-    return jsonify({"status": "ok", "deepface_ready": _df_ready})
+    _warmup_on_first_request()
+    return jsonify({"status": "ok", "deepface_ready": _df_ready, "deepface": deepface_stats()})
 
 
 # ── Transcribe audio blob from browser ───────────────────────────────────────
@@ -113,15 +373,23 @@ def transcribe_chunk(session_id):
 
     try:
         from elevenlabs.client import ElevenLabs
-        client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+        client = ElevenLabs(api_key=ELEVENLABS_API_KEY, base_url=ELEVENLABS_BASE_URL) if ELEVENLABS_BASE_URL \
+            else ElevenLabs(api_key=ELEVENLABS_API_KEY)
 
         # Write to temp file — ElevenLabs SDK needs a seekable file
         with tempfile.NamedTemporaryFile(suffix=f'.{ext}', delete=False) as tmp:
             tmp.write(audio_bytes)
             tmp_path = tmp.name
 
+        upload_path = tmp_path
         try:
-            with open(tmp_path, 'rb') as f:
+            # Normalize to the same compact codec the CLI recorder uploads (recordings/encode.py)
+            from recordings.encode import encode_for_stt
+            upload_path = encode_for_stt(tmp_path)
+            if upload_path != tmp_path:
+                print(f"[elevenlabs] Encoded {len(audio_bytes)} → {os.path.getsize(upload_path)} bytes")
+
+            with open(upload_path, 'rb') as f:
                 result = client.speech_to_text.convert(
                     file=f,
                     model_id="scribe_v2",
@@ -129,6 +397,8 @@ def transcribe_chunk(session_id):
                 )
         finally:
             os.unlink(tmp_path)
+            if upload_path != tmp_path:
+                os.unlink(upload_path)
 
         # Log raw result for debugging
         print(f"[elevenlabs] Raw result type: {type(result)}")
@@ -172,6 +442,7 @@ def transcribe_chunk(session_id):
 
         db.session.commit()
         print(f"[elevenlabs] Stored {len(events_out)} segments for session {session_id}")
+        _notify_live_summary(session_id, max([e['start_ms'] for e in events_out], default=offset_base))
         return jsonify({"ok": True, "segments": events_out}), 201
 
     except Exception as e:
@@ -194,6 +465,7 @@ def analyze_frame(session_id):
     Falls back to 'neutral' on timeout so UI never stalls.
     """
     Session.query.get_or_404(session_id)
+    _warmup_on_first_request()
 
     data = request.get_json(force=True) or {}
     frame_b64 = data.get('frame', '')
@@ -205,21 +477,41 @@ def analyze_frame(session_id):
     if ',' in frame_b64:
         frame_b64 = frame_b64.split(',', 1)[1]
 
+    timings = {}
+    t0 = time.perf_counter()
     try:
         frame_bytes = base64.b64decode(frame_b64)
     except Exception:
         return jsonify({"error": "bad base64"}), 400
-
-    # Submit to thread pool, wait up to 2s then fall back to neutral
-    future = _df_executor.submit(_run_deepface, frame_bytes)
+    submitted_at = _df_stage("b64_decode", t0, timings)
+
+    # Queue for the pool, wait up to 2s then fall back to neutral
+    future = _submit_frame(session_id, frame_bytes, submitted_at, timings)
+    if future is None:
+        # Queue full: skip this frame and ask the client to slow down
+        return jsonify({
+            "emotion": "neutral", "valence": 0.0, "raw": "overloaded",
+            "next_frame_ms": DF_MAX_FRAME_INTERVAL_MS,
+        }), 200
+    timeout_stage = None
     try:
         mapped, valence, dominant = future.result(timeout=2.0)
+    except FutureTimeout:
+        # Still queued → pool saturated; already running → model slow
+        timeout_stage = "running" if "queue_wait" in timings else "queued"
+        _df_count(f"timeouts_{timeout_stage}")
+        mapped, valence, dominant = 'neutral', 0.0, 'timeout'
     except Exception:
-        # Timeout or error — return neutral immediately, don't block UI
+        # Error — return neutral immediately, don't block UI
         mapped, valence, dominant = 'neutral', 0.0, 'timeout'
 
     if mapped is None:
         return jsonify({"error": "invalid image"}), 400
+    if dominant == "superseded":
+        return jsonify({
+            "emotion": mapped, "valence": valence, "raw": dominant,
+            "next_frame_ms": recommended_frame_interval_ms(),
+        }), 200
 
     # Store in DB (non-blocking — use a background thread)
     def _store():
@@ -236,16 +528,27 @@ def analyze_frame(session_id):
             db.session.commit()
 
     threading.Thread(target=_store, daemon=True).start()
+    _notify_live_summary(session_id, timestamp_ms)
 
-    return jsonify({"emotion": mapped, "valence": valence, "raw": dominant}), 200
+    timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
+    body = {
+        "emotion": mapped, "valence": valence, "raw": dominant,
+        "timings_ms": dict(timings), "next_frame_ms": recommended_frame_interval_ms(),
+    }
+    if timeout_stage:
+        body["timeout_stage"] = timeout_stage
+    return jsonify(body), 200
 
 
 # ── Clients ───────────────────────────────────────────────────────────────────
 
 @api_bp.get("/clients")
 def list_clients():
+    from cleanup import pending_client_ids
+
+    hidden = pending_client_ids()
     clients = Client.query.order_by(Client.created_at.desc()).all()
-    return jsonify([c.to_dict() for c in clients])
+    return jsonify([c.to_dict() for c in clients if c.id not in hidden])
 
 
 @api_bp.post("/clients")
@@ -264,18 +567,47 @@ def create_client():
 
 @api_bp.get("/clients/<int:client_id>")
 def get_client(client_id):
+    from cleanup import pending_ids, pending_client_ids
+
+    if client_id in pending_client_ids():
+        return jsonify({"error": "not found"}), 404
     client = Client.query.get_or_404(client_id)
     data = client.to_dict()
-    data["sessions"] = [s.to_dict() for s in client.sessions]
+    hidden = pending_ids()
+    data["sessions"] = [s.to_dict() for s in client.sessions if s.id not in hidden]
     return jsonify(data)
 
 
+@api_bp.delete("/clients/<int:client_id>")
+def delete_client(client_id):
+    from cleanup import delete_or_schedule
+
+    client = Client.query.get_or_404(client_id)
+    session_ids = [sid for (sid,) in db.session.query(Session.id).filter_by(client_id=client.id)]
+    if delete_or_schedule(current_app._get_current_object(), session_ids, [client_id]):
+        return jsonify({"ok": True, "pending": True}), 202
+    return jsonify({"ok": True})
+
+
+@api_bp.get("/clients/<int:client_id>/trends")
+def get_client_trends(client_id):
+    """Per-session valence / engagement / emotion-mix trends (see trends.py)."""
+    from trends import client_trends
+
+    Client.query.get_or_404(client_id)
+    limit = request.args.get("limit", 0, type=int)
+    return jsonify(client_trends(client_id, limit=limit))
+
+
 # ── Sessions ──────────────────────────────────────────────────────────────────
 
 @api_bp.get("/sessions")
 def list_sessions():
+    from cleanup import pending_ids
+
+    hidden = pending_ids()
     sessions = Session.query.order_by(Session.started_at.desc()).all()
-    return jsonify([s.to_dict() for s in sessions])
+    return jsonify([s.to_dict() for s in sessions if s.id not in hidden])
 
 
 @api_bp.post("/sessions")
@@ -292,9 +624,86 @@ def create_session():
 
 @api_bp.get("/sessions/<int:session_id>")
 def get_session(session_id):
+    from cleanup import is_pending
+
+    if is_pending(session_id):
+        return jsonify({"error": "not found"}), 404
     session = Session.query.get_or_404(session_id)
     include_events = request.args.get("events", "false").lower() == "true"
-    return jsonify(session.to_dict(include_events=include_events))
+    if not include_events:
+        return jsonify(session.to_dict())
+    # Finished sessions' timelines come from timeline_cache; the row fields are always fresh
+    dumps = current_app.json.dumps
+    events_json = timeline_cache.cached_json(
+        session, "events", lambda: [e.to_dict() for e in session.all_events()], dumps
+    )
+    body = dumps(session.to_dict())[:-1] + ',"events":' + events_json + "}"
+    return Response(body, mimetype="application/json")
+
+
+EXPORT_COLUMNS = ("id", "session_id", "timestamp_ms", "source", "emotion", "valence", "speaker", "text")
+EXPORT_BATCH = 500   # rows per yielded chunk of the response body
+
+
+@api_bp.get("/sessions/<int:session_id>/export")
+def export_session(session_id):
+    """
+    Stream every event of a session as NDJSON (default) or CSV.
+    Rows come from a server-side cursor and are written out in small
+    batches, so memory stays flat however long the session is.
+    """
+    import csv
+    import io
+    import heapq
+    from sample_store import iter_merged_events
+
+    fmt = request.args.get("format", "ndjson").lower()
+    if fmt not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    session = Session.query.get_or_404(session_id)
+    archived = session.archive
+
+    def rows():
+        events = iter_merged_events(session_id)
+        if archived:
+            from archive import archived_events
+            events = heapq.merge(archived_events(archived), events, key=lambda e: (e.timestamp_ms, e.id))
+        for e in events:
+            yield [getattr(e, col) for col in EXPORT_COLUMNS]
+
+    def generate_ndjson():
+        batch = []
+        for values in rows():
+            batch.append(json.dumps(dict(zip(EXPORT_COLUMNS, values)), separators=(",", ":")))
+            if len(batch) >= EXPORT_BATCH:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    def generate_csv():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_COLUMNS)
+        n = 0
+        for values in rows():
+            writer.writerow(values)
+            n += 1
+            if n % EXPORT_BATCH == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    if fmt == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="session_{session_id}.{fmt}"'},
+    )
 
 
 @api_bp.patch("/sessions/<int:session_id>/end")
@@ -306,42 +715,127 @@ def end_session(session_id):
     session.overall_sentiment = data.get("overall_sentiment", session.overall_sentiment)
     session.engagement_score = data.get("engagement_score", session.engagement_score)
     db.session.commit()
+
+    if current_app.config.get("PACK_EMOTION_SAMPLES"):
+        app = current_app._get_current_object()
+
+        def _pack():
+            from sample_store import pack_session
+            with app.app_context():
+                pack_session(session_id)
+
+        threading.Thread(target=_pack, daemon=True).start()
+
+    # Kick off the AI summary in the background if the Gemini blueprint is loaded
+    if "ai" in current_app.blueprints:
+        try:
+            from AI.summary_jobs import enqueue_summary
+            enqueue_summary(session_id)
+        except Exception as e:
+            print(f"[summary] Could not queue summary for session {session_id}: {e}")
+
     return jsonify(session.to_dict())
 
 
 @api_bp.delete("/sessions/<int:session_id>")
 def delete_session(session_id):
-    session = Session.query.get_or_404(session_id)
-    db.session.delete(session)
-    db.session.commit()
+    from cleanup import delete_or_schedule, is_pending
+
+    Session.query.get_or_404(session_id)
+    if is_pending(session_id):
+        return jsonify({"ok": True, "pending": True}), 202
+    # Big sessions are removed in batches on a background worker
+    if delete_or_schedule(current_app._get_current_object(), [session_id]):
+        return jsonify({"ok": True, "pending": True}), 202
     return jsonify({"ok": True})
 
 
 # ── Events (Timeline Ingestion) ───────────────────────────────────────────────
 
+NDJSON_BATCH = 5000   # rows per executemany when streaming NDJSON
+
+
+def _event_row(session_id: int, item: dict) -> dict:
+    return {
+        "session_id": session_id,
+        "timestamp_ms": item.get("timestamp_ms", 0),
+        "source": item.get("source", "unknown"),
+        "emotion": item.get("emotion"),
+        "valence": item.get("valence"),
+        "speaker": item.get("speaker"),
+        "text": item.get("text"),
+    }
+
+
 @api_bp.post("/sessions/<int:session_id>/events")
 def ingest_events(session_id):
+    """
+    Bulk-insert timeline events in one transaction.
+    Body: a JSON object or array, or `application/x-ndjson` (one event per
+    line) which is read from the request stream in batches, so backfills of
+    hundreds of thousands of events never sit in memory at once.
+    Returns the assigned id range; `?return=events` also returns the rows.
+    """
     Session.query.get_or_404(session_id)
-    items = request.get_json(force=True)
-    if not isinstance(items, list):
-        items = [items]
-
-    created = []
-    for item in items:
-        event = Event(
-            session_id=session_id,
-            timestamp_ms=item.get("timestamp_ms", 0),
-            source=item.get("source", "unknown"),
-            emotion=item.get("emotion"),
-            valence=item.get("valence"),
-            speaker=item.get("speaker"),
-            text=item.get("text"),
-        )
-        db.session.add(event)
-        created.append(event)
+
+    first_id = last_id = None
+    count = 0
+    latest_ms = None
+
+    def flush(rows):
+        nonlocal first_id, last_id, count, latest_ms
+        lo, hi = Event.bulk_insert(rows)
+        if lo is None:
+            return
+        first_id = lo if first_id is None else first_id
+        last_id = hi
+        count += len(rows)
+        batch_latest = max(r["timestamp_ms"] or 0 for r in rows)
+        latest_ms = batch_latest if latest_ms is None else max(latest_ms, batch_latest)
+
+    if request.mimetype == "application/x-ndjson":
+        batch = []
+        for lineno, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                db.session.rollback()
+                return jsonify({"error": f"invalid JSON on line {lineno}"}), 400
+            if not isinstance(item, dict):
+                db.session.rollback()
+                return jsonify({"error": f"line {lineno} is not a JSON object"}), 400
+            batch.append(_event_row(session_id, item))
+            if len(batch) >= NDJSON_BATCH:
+                flush(batch)
+                batch = []
+        flush(batch)
+    else:
+        items = request.get_json(force=True)
+        if not isinstance(items, list):
+            items = [items]
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                return jsonify({"error": f"item {i} is not a JSON object"}), 400
+        flush([_event_row(session_id, item) for item in items])
 
     db.session.commit()
-    return jsonify([e.to_dict() for e in created]), 201
+    if count:
+        timeline_cache.invalidate(session_id)
+    if latest_ms is not None:
+        _notify_live_summary(session_id, latest_ms)
+
+    body = {"count": count, "first_id": first_id, "last_id": last_id}
+    if request.args.get("return") == "events" and count:
+        events = (
+            Event.query.filter(Event.id.between(first_id, last_id))
+            .order_by(Event.id)
+            .all()
+        )
+        body["events"] = [e.to_dict() for e in events]
+    return jsonify(body), 201
 
 
 # ── Insights ──────────────────────────────────────────────────────────────────
@@ -349,27 +843,60 @@ def ingest_events(session_id):
 @api_bp.get("/sessions/<int:session_id>/insights")
 def get_insights(session_id):
     session = Session.query.get_or_404(session_id)
-    events = session.events
-    presage_events = [e for e in events if e.source == "presage" and e.valence is not None]
-    elevenlabs_events = [e for e in events if e.source == "elevenlabs"]
 
-    avg_valence = (
-        sum(e.valence for e in presage_events) / len(presage_events)
-        if presage_events else 0.0
-    )
+    def build():
+        events = session.all_events()
+        presage_events = [e for e in events if e.source == "presage" and e.valence is not None]
+        elevenlabs_events = [e for e in events if e.source == "elevenlabs"]
+
+        avg_valence = (
+            sum(e.valence for e in presage_events) / len(presage_events)
+            if presage_events else 0.0
+        )
+
+        emotion_counts = {}
+        for e in presage_events:
+            if e.emotion:
+                emotion_counts[e.emotion] = emotion_counts.get(e.emotion, 0) + 1
 
-    emotion_counts = {}
-    for e in presage_events:
-        if e.emotion:
-            emotion_counts[e.emotion] = emotion_counts.get(e.emotion, 0) + 1
+        return {
+            "avg_valence": round(avg_valence, 3),
+            "emotion_breakdown": emotion_counts,
+            "transcript_chunks": len(elevenlabs_events),
+            "presage_samples": len(presage_events),
+        }
 
+    stats = json.loads(timeline_cache.cached_json(session, "insights", build, current_app.json.dumps))
     return jsonify({
         "session_id": session_id,
         "summary": session.summary,
         "overall_sentiment": session.overall_sentiment,
         "engagement_score": session.engagement_score,
-        "avg_valence": round(avg_valence, 3),
-        "emotion_breakdown": emotion_counts,
-        "transcript_chunks": len(elevenlabs_events),
-        "presage_samples": len(presage_events),
+        **stats,
     })
+
+
+@api_bp.get("/timeline-cache/stats")
+def timeline_cache_stats():
+    return jsonify(timeline_cache.cache_stats())
+
+
+# ── Search ────────────────────────────────────────────────────────────────────
+
+@api_bp.get("/search")
+def search_transcripts():
+    from search_index import search, DEFAULT_LIMIT
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    client_id = request.args.get("client_id", type=int)
+    speaker = request.args.get("speaker") or None
+    limit = request.args.get("limit", DEFAULT_LIMIT, type=int)
+    offset = request.args.get("offset", 0, type=int)
+
+    try:
+        results = search(q, client_id=client_id, speaker=speaker, limit=limit, offset=offset)
+    except Exception as e:
+        return jsonify({"error": f"Invalid search query: {e}"}), 400
+    return jsonify({"query": q, "count": len(results), "results": results})
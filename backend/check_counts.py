@@ -1,3 +1,7 @@
+import os
+
+# DB-only script: don't pre-load DeepFace
+os.environ.setdefault("DEEPFACE_WARMUP", "off")
 from app import app
 from models import db, Client, Session, Event
 
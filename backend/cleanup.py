@@ -0,0 +1,155 @@
+"""
+cleanup.py — Set-based deletes for sessions and clients.
+
+Deleting through the ORM cascade loads every Event of a session and deletes
+them one by one. Here every child table is cleared with
+`DELETE ... WHERE session_id IN (...)` instead, and events go in
+DELETE_BATCH-row slices, each its own short transaction, so a huge session
+never holds SQLite's write lock for long.
+
+New databases also get ON DELETE CASCADE foreign keys (PRAGMA foreign_keys
+is switched on in models.py), but tables created before that keep their old
+constraints, so the explicit child deletes here are what older installs rely
+on.
+
+Sessions with more than INLINE_DELETE_MAX events are deleted by a background
+worker; until it finishes they are hidden from the API (is_pending()).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Set
+
+from flask import Flask
+
+from models import db, Client, Session, Event, EmotionChunk, SummaryJob, SummaryWindow, SessionArchive
+import timeline_cache
+
+DELETE_BATCH = 20_000        # events per delete transaction
+INLINE_DELETE_MAX = 50_000   # above this many events, delete in the background
+ID_CHUNK = 900               # stay under SQLite's bound-parameter limit
+
+_cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+_lock = threading.Lock()
+_pending: Set[int] = set()   # session ids being deleted in the background
+_pending_clients: Set[int] = set()
+
+CHILD_MODELS = (EmotionChunk, SummaryWindow, SummaryJob, SessionArchive)
+
+
+def is_pending(session_id: int) -> bool:
+    with _lock:
+        return session_id in _pending
+
+
+def pending_ids() -> Set[int]:
+    with _lock:
+        return set(_pending)
+
+
+def pending_client_ids() -> Set[int]:
+    with _lock:
+        return set(_pending_clients)
+
+
+def _chunks(ids: List[int]):
+    for i in range(0, len(ids), ID_CHUNK):
+        yield ids[i:i + ID_CHUNK]
+
+
+def event_count(session_ids: Iterable[int]) -> int:
+    ids = list(session_ids)
+    return sum(
+        Event.query.filter(Event.session_id.in_(chunk)).count()
+        for chunk in _chunks(ids)
+    )
+
+
+def _archive_paths(ids: List[int]) -> List[str]:
+    from flask import current_app
+    archive_dir = current_app.config["ARCHIVE_DIR"]
+    return [
+        os.path.join(archive_dir, path)
+        for chunk in _chunks(ids)
+        for (path,) in db.session.query(SessionArchive.path).filter(SessionArchive.session_id.in_(chunk))
+    ]
+
+
+def _remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def delete_sessions(session_ids: Iterable[int], client_ids: Iterable[int] = ()) -> int:
+    """
+    Delete sessions (and optionally their clients) with set-based statements.
+    Must run inside an app context. Returns the number of events removed.
+    """
+    ids = sorted(set(session_ids))
+    removed = 0
+    for chunk in _chunks(ids):
+        while True:   # events in short transactions
+            n = db.session.execute(
+                Event.__table__.delete().where(
+                    Event.id.in_(
+                        db.select(Event.id).where(Event.session_id.in_(chunk)).limit(DELETE_BATCH)
+                    )
+                )
+            ).rowcount
+            db.session.commit()
+            removed += n
+            if n < DELETE_BATCH:
+                break
+
+    # Archive files go only once their stubs are gone: if the final commit
+    # fails, the sessions are still there and still readable.
+    archive_paths = _archive_paths(ids)
+    for chunk in _chunks(ids):
+        for model in CHILD_MODELS:
+            db.session.execute(model.__table__.delete().where(model.session_id.in_(chunk)))
+        db.session.execute(Session.__table__.delete().where(Session.id.in_(chunk)))
+    client_ids = list(client_ids)
+    for chunk in _chunks(client_ids):
+        db.session.execute(Client.__table__.delete().where(Client.id.in_(chunk)))
+    db.session.commit()
+    _remove_files(archive_paths)
+    for sid in ids:
+        timeline_cache.invalidate(sid)
+    return removed
+
+
+def _run_delete(app: Flask, session_ids: List[int], client_ids: List[int]):
+    with app.app_context():
+        try:
+            n = delete_sessions(session_ids, client_ids)
+            print(f"[cleanup] Deleted {len(session_ids)} session(s), {n} events")
+        except Exception as e:
+            db.session.rollback()
+            print(f"[cleanup] Delete of sessions {session_ids} failed: {e}")
+        finally:
+            with _lock:
+                _pending.difference_update(session_ids)
+                _pending_clients.difference_update(client_ids)
+
+
+def schedule_delete(app: Flask, session_ids: Iterable[int], client_ids: Iterable[int] = ()):
+    """Hide the sessions now and delete them on the cleanup worker."""
+    ids, cids = list(session_ids), list(client_ids)
+    with _lock:
+        _pending.update(ids)
+        _pending_clients.update(cids)
+    _cleanup_executor.submit(_run_delete, app, ids, cids)
+
+
+def delete_or_schedule(app: Flask, session_ids: Iterable[int], client_ids: Iterable[int] = ()) -> bool:
+    """Delete inline when small; returns True if the delete was handed to the background worker."""
+    ids = list(session_ids)
+    if event_count(ids) > INLINE_DELETE_MAX:
+        schedule_delete(app, ids, client_ids)
+        return True
+    delete_sessions(ids, client_ids)
+    return False
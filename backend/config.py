@@ -9,3 +9,13 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JSON_SORT_KEYS = False
+    # When to pre-load DeepFace weights: 'startup' | 'first-request' | 'off'
+    DEEPFACE_WARMUP = os.environ.get("DEEPFACE_WARMUP", "startup")
+    # In-process Presage capture writes events straight to SQLite instead of POSTing to /events
+    PRESAGE_DIRECT_DB = os.environ.get("PRESAGE_DIRECT_DB", "").lower() in ("1", "true", "yes")
+    # Move emotion samples into packed columnar chunks when a session ends (see sample_store.py)
+    PACK_EMOTION_SAMPLES = os.environ.get("PACK_EMOTION_SAMPLES", "").lower() in ("1", "true", "yes")
+    # Where archive.py writes per-session columnar files for cold sessions
+    ARCHIVE_DIR = os.environ.get(
+        "ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "archive")
+    )
@@ -3,29 +3,32 @@ import sqlite3
 from pathlib import Path
 import json
 
+from database import event_store
 
-def upsert_speaker_map(db_path: str, session_id: str, seller_label: str, client_label: str):
-    """
-    Store diarization label -> role mapping in speaker_map.
-    seller_label/client_label are diarization labels like 'spk_0', 'spk_1'.
-    """
+# When db_path is the SenseLense app database (sessions.id + events), every
+# writer below hands off to database/event_store.py, so CLI output lands in
+# the same events table the web app reads instead of a parallel schema.
+
+
+def insert_session(db_path: str, session_id: str, started_at_epoch_ms: int):
+    """Create the session row the other writers hang off (no-op if it exists)."""
     db_path = _normalize_db_path(db_path)
+    if event_store.is_event_store(db_path):
+        return event_store.insert_session(db_path, session_id, started_at_epoch_ms)
     conn = sqlite3.connect(db_path)
     try:
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA busy_timeout=5000;")
-
         conn.execute(
-            "INSERT OR REPLACE INTO speaker_map(session_id, diar_label, role) VALUES (?, ?, 'seller')",
-            (session_id, seller_label),
-        )
-        conn.execute(
-            "INSERT OR REPLACE INTO speaker_map(session_id, diar_label, role) VALUES (?, ?, 'customer')",
-            (session_id, client_label),
+            "INSERT OR IGNORE INTO sessions(session_id, start_time_ms) VALUES (?, ?)",
+            (session_id, started_at_epoch_ms),
         )
         conn.commit()
     finally:
         conn.close()
+    return session_id
+
+
 
 def apply_speaker_map_to_segments(db_path: str, session_id: str):
     """
@@ -33,6 +36,8 @@ def apply_speaker_map_to_segments(db_path: str, session_id: str):
     We expect raw_json to contain {"speaker_label": "..."}.
     """
     db_path = _normalize_db_path(db_path)
+    if event_store.is_event_store(db_path):
+        return   # roles are assigned when the events are inserted
     conn = sqlite3.connect(db_path)
     try:
         conn.execute("PRAGMA journal_mode=WAL;")
@@ -97,44 +102,8 @@ def _normalize_db_path(db_path: str) -> str:
     p.parent.mkdir(parents=True, exist_ok=True)
     return str(p)
 
-def insert_transcript_segments(db_path: str, segments):
-    db_path = _normalize_db_path(db_path)
-
-    conn = sqlite3.connect(db_path)
-    try:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA busy_timeout=5000;")
+LEGACY_ROLES = {"seller": "seller", "client": "customer"}
 
-        rows = []
-        for s in segments:
-            raw = {
-                "speaker_label": s.get("speaker_label"),
-                "start_ms": s.get("start_ms"),
-                "end_ms": s.get("end_ms"),
-            }
-            rows.append((
-                s["session_id"],
-                int(s["start_ms"]),
-                int(s["end_ms"]),
-                "unknown",
-                s["text"],
-                None,
-                json.dumps(raw, ensure_ascii=False),
-            ))
-
-        conn.executemany(
-            """
-            INSERT INTO transcript_segments(
-              session_id, timestamp_start_ms, timestamp_end_ms,
-              speaker, text, confidence, raw_json
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            rows,
-        )
-        conn.commit()
-    finally:
-        conn.close()
 
 def insert_transcript_segments(db_path: str, segments):
     """
@@ -146,10 +115,13 @@ def insert_transcript_segments(db_path: str, segments):
       text
       confidence
       raw_json
-    Your transcription segments currently contain speaker_label; we'll store speaker='unknown'
-    and keep the diarization label inside raw_json so you don't lose info.
+    Segments carry speaker_label and, from Transcriptions/stitch.py, a 'seller'/'client'
+    role in "speaker"; the role is stored (client → customer) and the diarization
+    label kept inside raw_json so you don't lose info.
     """
     db_path = _normalize_db_path(db_path)
+    if event_store.is_event_store(db_path):
+        return event_store.insert_transcript_segments(db_path, segments)
     conn = sqlite3.connect(db_path)
     try:
         conn.execute("PRAGMA journal_mode=WAL;")
@@ -166,7 +138,7 @@ def insert_transcript_segments(db_path: str, segments):
                 s["session_id"],
                 int(s["start_ms"]),
                 int(s["end_ms"]),
-                "unknown",           # schema speaker is seller/customer/unknown
+                LEGACY_ROLES.get(s.get("speaker"), "unknown"),   # schema speaker is seller/customer/unknown
                 s["text"],
                 None,                # confidence (optional)
                 str(raw),            # raw_json (cheap debugging, can be json.dumps if you want)
@@ -223,6 +195,8 @@ def compute_and_write_mood_timeseries(
       - is_talking (BOOLEAN-ish)
     """
     db_path = _normalize_db_path(db_path)
+    if event_store.is_event_store(db_path):
+        return event_store.mood_window_count(db_path, session_id, window_ms)
 
     conn = sqlite3.connect(db_path)
     try:
@@ -340,6 +314,10 @@ def insert_gemini_output(
     raw_json should be the full Gemini response dict.
     """
     db_path = _normalize_db_path(db_path)
+    if event_store.is_event_store(db_path):
+        event_store.write_summary(db_path, session_id, target_role, summary_md,
+                                  sentiment_score=sentiment_score, engagement_score=engagement_score)
+        return
 
     conn = sqlite3.connect(db_path)
     try:
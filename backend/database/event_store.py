@@ -0,0 +1,320 @@
+"""
+event_store.py — Write the CLI pipeline's output straight into the Flask events store.
+
+Transcriptions/main.py and db_manager were built against schema.sql
+(transcript_segments, mood_timeseries, gemini_outputs), while the web app
+reads models.Event. When db_manager is pointed at the app's database
+(/api/record passes instance/senselense.db as ADPitch_DB) it hands off to the
+functions here instead, so a CLI recording lands in the same `events` table
+the API, search index, trends and insights already read — no second store,
+no reconciliation.
+
+Plain sqlite3 on purpose: the CLI runs as a subprocess without Flask, the
+same way db_manager does. Inserts are executemany batches in one transaction
+per call; the FTS triggers from search_index.py index transcript rows as they
+land.
+
+How schema.sql concepts map onto the events store:
+  transcript_segments → events (source='elevenlabs', speaker 'seller'/'client')
+  speaker_map         → roles come with the segments (Transcriptions/stitch.py
+                        carries them across chunks); unlabeled batches fall
+                        back to first diarized label = seller
+  mood_timeseries     → derived on read from presage events; nothing stored
+  gemini_outputs      → sessions.summary / overall_sentiment / engagement_score
+                        ('overall' outputs only)
+
+Session ids: a numeric id is taken as sessions.id. Any other id (e.g. the
+CLI's default "demo-session") gets a session titled IMPORT_TITLE_PREFIX + id
+under the IMPORT_CLIENT client, reused on later runs.
+
+One-time migration of an existing schema.sql / init_db.py database:
+    python3 database/event_store.py migrate --source database/adpitch.db \\
+        --target instance/senselense.db [--dry-run]
+Legacy sessions that already have transcript events in the target are
+skipped, so re-running is safe.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+INSERT_BATCH = 5000
+IMPORT_CLIENT = "CLI Imports"
+IMPORT_TITLE_PREFIX = "CLI session "
+EPOCH_MS_FLOOR = 100_000_000_000   # timestamps above this are UTC epoch ms, not offsets
+
+EVENT_INSERT_SQL = (
+    "INSERT INTO events (session_id, timestamp_ms, source, emotion, valence, speaker, text) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+ROLE_ALIASES = {"seller": "seller", "rep": "seller", "customer": "client", "client": "client"}
+
+_detected: Dict[str, bool] = {}
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    return conn
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def is_event_store(db_path: str) -> bool:
+    """True if db_path holds the Flask app's schema (sessions.id + events)."""
+    if db_path not in _detected:
+        if not os.path.exists(db_path):
+            return False
+        conn = sqlite3.connect(db_path)
+        try:
+            _detected[db_path] = (
+                "id" in _columns(conn, "sessions") and "source" in _columns(conn, "events")
+            )
+        finally:
+            conn.close()
+    return _detected[db_path]
+
+
+# ── Sessions ─────────────────────────────────────────────────────────────────
+
+def _import_client_id(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT id FROM clients WHERE name = ? ORDER BY id LIMIT 1", (IMPORT_CLIENT,)).fetchone()
+    if row:
+        return row[0]
+    return conn.execute(
+        "INSERT INTO clients (name, company, notes, created_at) VALUES (?, ?, ?, ?)",
+        (IMPORT_CLIENT, None, "Sessions recorded or migrated through the CLI pipeline", datetime.utcnow()),
+    ).lastrowid
+
+
+def resolve_session(conn: sqlite3.Connection, session_id, started_at_ms: Optional[int] = None,
+                    create: bool = True) -> Optional[int]:
+    """Map a CLI session id onto sessions.id, creating an import session if needed."""
+    text = str(session_id).strip()
+    if text.isdigit():
+        row = conn.execute("SELECT id FROM sessions WHERE id = ?", (int(text),)).fetchone()
+        if row:
+            return row[0]
+    title = IMPORT_TITLE_PREFIX + text
+    row = conn.execute("SELECT id FROM sessions WHERE title = ? ORDER BY id LIMIT 1", (title,)).fetchone()
+    if row or not create:
+        return row[0] if row else None
+    started = datetime.utcfromtimestamp(started_at_ms / 1000) if started_at_ms else datetime.utcnow()
+    return conn.execute(
+        "INSERT INTO sessions (client_id, title, started_at, summary, overall_sentiment, engagement_score) "
+        "VALUES (?, ?, ?, '', 0.0, 0.0)",
+        (_import_client_id(conn), title, started),
+    ).lastrowid
+
+
+def insert_session(db_path: str, session_id, started_at_epoch_ms: Optional[int] = None) -> int:
+    conn = connect(db_path)
+    try:
+        sid = resolve_session(conn, session_id, started_at_epoch_ms)
+        conn.commit()
+        return sid
+    finally:
+        conn.close()
+
+
+# ── Transcript segments ──────────────────────────────────────────────────────
+
+class RoleMapper:
+    """Diarization label → 'seller'/'client', same rule as /api/transcribe: first label heard is the seller."""
+
+    def __init__(self):
+        self.seen: List[str] = []
+
+    def __call__(self, label: Optional[str]) -> str:
+        label = (label or "unknown").strip()
+        if label.lower() in ROLE_ALIASES:
+            return ROLE_ALIASES[label.lower()]
+        if label not in self.seen:
+            self.seen.append(label)
+        return "seller" if self.seen.index(label) == 0 else "client"
+
+
+def _bulk_insert(conn: sqlite3.Connection, rows: Iterable[tuple]) -> int:
+    total, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH:
+            conn.executemany(EVENT_INSERT_SQL, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(EVENT_INSERT_SQL, batch)
+        total += len(batch)
+    return total
+
+
+def insert_transcript_segments(db_path: str, segments: List[dict], offset_ms: int = 0) -> int:
+    """
+    Insert CLI segments ({session_id, speaker_label, text, start_ms, end_ms})
+    as elevenlabs events. Returns the number of rows written.
+
+    A segment's "speaker" role ('seller'/'client', as set by
+    Transcriptions/stitch.py across chunks) is used as given. Segments with
+    only a diarization label are mapped per call with the /api/transcribe
+    rule (first label heard = seller).
+    """
+    conn = connect(db_path)
+    try:
+        resolved: Dict[str, int] = {}
+        mappers: Dict[int, RoleMapper] = {}
+
+        def rows():
+            for s in segments:
+                text = (s.get("text") or "").strip()
+                if not text:
+                    continue
+                key = str(s["session_id"])
+                if key not in resolved:
+                    resolved[key] = resolve_session(conn, key)
+                sid = resolved[key]
+                role = mappers.setdefault(sid, RoleMapper())(s.get("speaker") or s.get("speaker_label"))
+                yield (sid, offset_ms + int(s.get("start_ms") or 0), "elevenlabs", None, None, role, text)
+
+        n = _bulk_insert(conn, rows())
+        conn.commit()
+        return n
+    finally:
+        conn.close()
+
+
+# ── Mood + Gemini outputs ────────────────────────────────────────────────────
+
+def mood_window_count(db_path: str, session_id, window_ms: int = 10_000) -> int:
+    """Number of mood windows the session's presage events cover (aggregates are computed on read)."""
+    conn = connect(db_path)
+    try:
+        sid = resolve_session(conn, session_id, create=False)
+        if sid is None:
+            return 0
+        return conn.execute(
+            "SELECT COUNT(DISTINCT timestamp_ms / ?) FROM events WHERE session_id = ? AND source = 'presage'",
+            (window_ms, sid),
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def write_summary(db_path: str, session_id, target_role: str, summary_md: str,
+                  sentiment_score: Optional[float] = None,
+                  engagement_score: Optional[float] = None) -> bool:
+    """
+    Store an 'overall' Gemini output on the session row. Per-role outputs have
+    no column in the app schema and are skipped. Returns True if written.
+    """
+    if target_role != "overall" or not (summary_md or "").strip():
+        return False
+    conn = connect(db_path)
+    try:
+        sid = resolve_session(conn, session_id)
+        conn.execute("UPDATE sessions SET summary = ? WHERE id = ?", (summary_md.strip(), sid))
+        if sentiment_score is not None:
+            conn.execute("UPDATE sessions SET overall_sentiment = ? WHERE id = ?", (sentiment_score, sid))
+        if engagement_score is not None:   # gemini_outputs is 0..1, the app uses 0..100
+            conn.execute("UPDATE sessions SET engagement_score = ? WHERE id = ?", (engagement_score * 100, sid))
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+# ── One-time migration from transcript_segments ──────────────────────────────
+
+def _legacy_segments(src: sqlite3.Connection):
+    """Yield (legacy_session_id, start_ms, label_or_role, text) in session/time order for either legacy schema."""
+    cols = _columns(src, "transcript_segments")
+    if "timestamp_start_ms" in cols:   # schema.sql
+        sql = ("SELECT session_id, timestamp_start_ms, speaker, raw_json, text FROM transcript_segments "
+               "ORDER BY session_id, timestamp_start_ms, id")
+        for session_id, start, speaker, raw_json, text in src.execute(sql):
+            label = speaker
+            if speaker == "unknown" and raw_json:
+                try:
+                    label = json.loads(raw_json).get("speaker_label") or speaker
+                except (ValueError, AttributeError):
+                    pass   # older rows stored str(dict), not JSON
+            yield session_id, start, label, text
+    else:                              # init_db.py
+        sql = ("SELECT session_id, start_ms, COALESCE(speaker_role, speaker_label), text FROM transcript_segments "
+               "ORDER BY session_id, start_ms, id")
+        yield from src.execute(sql)
+
+
+def _legacy_start_ms(src: sqlite3.Connection) -> Dict[str, int]:
+    cols = _columns(src, "sessions")
+    for col in ("start_time_ms", "started_at_epoch_ms"):
+        if col in cols:
+            return {sid: ms for sid, ms in src.execute(f"SELECT session_id, {col} FROM sessions") if ms}
+    return {}
+
+
+def migrate(source_path: str, target_path: str, dry_run: bool = False) -> Dict[str, int]:
+    """Copy every legacy transcript_segments row into the events store."""
+    if not is_event_store(target_path):
+        raise SystemExit(f"{target_path} is not a SenseLense database (start the app once to create it)")
+    src = sqlite3.connect(source_path)
+    dst = connect(target_path)
+    stats = {"sessions": 0, "skipped_sessions": 0, "events": 0}
+    try:
+        if not _columns(src, "transcript_segments"):
+            raise SystemExit(f"{source_path} has no transcript_segments table")
+        starts = _legacy_start_ms(src)
+        current, sid, base, mapper, skip = None, None, 0, None, False
+
+        def rows():
+            nonlocal current, sid, base, mapper, skip
+            for legacy_id, start, label, text in _legacy_segments(src):
+                if legacy_id != current:
+                    current, mapper = legacy_id, RoleMapper()
+                    started = starts.get(legacy_id)
+                    sid = resolve_session(dst, legacy_id, started)
+                    skip = dst.execute(
+                        "SELECT 1 FROM events WHERE session_id = ? AND source = 'elevenlabs' LIMIT 1", (sid,)
+                    ).fetchone() is not None
+                    stats["skipped_sessions" if skip else "sessions"] += 1
+                    # schema.sql stores UTC epoch ms; the app wants ms since session start
+                    base = (started or start) if start > EPOCH_MS_FLOOR else 0
+                if skip or not (text or "").strip():
+                    continue
+                yield (sid, max(0, int(start) - base), "elevenlabs", None, None, mapper(label), text.strip())
+
+        stats["events"] = _bulk_insert(dst, rows())
+        if dry_run:
+            dst.rollback()
+        else:
+            dst.commit()
+        return stats
+    finally:
+        src.close()
+        dst.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI pipeline ↔ SenseLense events store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="Copy legacy transcript_segments into the events table")
+    m.add_argument("--source", required=True, help="Legacy schema.sql / init_db.py database")
+    m.add_argument("--target", required=True, help="SenseLense database (e.g. instance/senselense.db)")
+    m.add_argument("--dry-run", action="store_true", help="Count what would be migrated, then roll back")
+    args = parser.parse_args()
+
+    stats = migrate(os.path.abspath(args.source), os.path.abspath(args.target), dry_run=args.dry_run)
+    verb = "Would migrate" if args.dry_run else "Migrated"
+    print(f"[migrate] {verb} {stats['events']} segments across {stats['sessions']} session(s); "
+          f"{stats['skipped_sessions']} already present")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+deepface_check.py — Check that the split detect/classify path matches DeepFace.analyze.
+
+/api/analyze-frame runs face detection and emotion classification as two
+separately timed calls (blueprints/api.py deepface_split_analyze) instead of
+one DeepFace.analyze(detector_backend='opencv'). This runs both on sample
+frames and compares the dominant emotion and the emotion scores.
+
+Usage:
+    python3 deepface_check.py frames/*.jpg
+    python3 deepface_check.py frames/*.jpg --tolerance 0.5
+
+Exits 1 if any frame's dominant emotion differs or a score differs by more
+than --tolerance percentage points.
+"""
+
+import os
+import sys
+import argparse
+from typing import Any, Dict
+
+os.environ.setdefault("DEEPFACE_WARMUP", "off")
+
+
+def single_call(frame) -> Dict[str, Any]:
+    from deepface import DeepFace
+
+    result = DeepFace.analyze(img_path=frame, actions=['emotion'], enforce_detection=False,
+                              silent=True, detector_backend='opencv')
+    return result[0] if isinstance(result, list) else result
+
+
+def split_call(frame) -> Dict[str, Any]:
+    from blueprints.api import deepface_split_analyze
+
+    result = deepface_split_analyze(frame)
+    return result[0] if isinstance(result, list) else result
+
+
+def compare(frame, tolerance: float) -> Dict[str, Any]:
+    a, b = single_call(frame), split_call(frame)
+    diff = max(abs(float(a["emotion"][k]) - float(b["emotion"].get(k, 0.0))) for k in a["emotion"])
+    return {
+        "single": a["dominant_emotion"],
+        "split": b["dominant_emotion"],
+        "max_score_diff": round(diff, 4),
+        "ok": a["dominant_emotion"] == b["dominant_emotion"] and diff <= tolerance,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare split vs single-call DeepFace emotion analysis")
+    parser.add_argument("frames", nargs="+", help="Image files (any format cv2 reads)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Max score difference, percentage points")
+    args = parser.parse_args()
+
+    import cv2
+
+    failed = 0
+    for path in args.frames:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"[check] {path}: unreadable, skipped")
+            continue
+        r = compare(frame, args.tolerance)
+        failed += not r["ok"]
+        print(f"[check] {'ok  ' if r['ok'] else 'DIFF'} {path}: single={r['single']} split={r['split']} "
+              f"max_score_diff={r['max_score_diff']}")
+    print(f"[check] {len(args.frames) - failed}/{len(args.frames)} frame(s) match")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
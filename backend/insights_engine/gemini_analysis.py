@@ -1,10 +1,15 @@
 import os
 import sqlite3
 import json
+import time
 import logging
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from AI import llm_cache
 
 # ─────────────────────────────────────────────────────────────
 # Setup
@@ -16,13 +21,36 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise RuntimeError("GEMINI_API_KEY not set in environment.")
 
-genai.configure(api_key=GEMINI_API_KEY)
-
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-model = genai.GenerativeModel(MODEL_NAME)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")   # e.g. the loadtest.py mock server
+_model = None
+
+
+def _get_model():
+    """Import the Gemini SDK and build the model on first use."""
+    global _model
+    if _model is None:
+        import google.generativeai as genai
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
+        _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "adpitch.db")
 
+# Per-call deadline (seconds). The three analyses run concurrently, so the
+# whole run is bounded by roughly this value rather than 3x it. The deadline
+# is also handed to the HTTP request and the SDK's retry loop, because a
+# timed-out future can't be cancelled once it is running; without that a
+# hung call would hold one of the pool's workers for the SDK's default 600 s.
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "60"))
+
+# One worker per analysis (overall / seller / customer).
+_gemini_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="gemini")
+
 logging.basicConfig(level=logging.INFO)
 
 
@@ -116,17 +144,42 @@ Conversation:
 # Gemini Call
 # ─────────────────────────────────────────────────────────────
 
-def _call_gemini(prompt: str) -> str:
+GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "top_p": 0.9,
+    "max_output_tokens": 2048,
+}
+
+
+def _request_options(timeout_s: float) -> Dict[str, Any]:
+    """HTTP timeout plus the SDK's retry-on-503, both capped at `timeout_s`."""
+    from google.api_core import exceptions, retry
+
+    return {
+        "timeout": timeout_s,
+        "retry": retry.Retry(
+            predicate=retry.if_exception_type(exceptions.ServiceUnavailable),
+            initial=1.0,
+            maximum=10.0,
+            multiplier=1.3,
+            deadline=timeout_s,
+        ),
+    }
+
+
+def _call_gemini(prompt: str, bypass_cache: bool = False, timeout_s: float = GEMINI_TIMEOUT_S) -> str:
     try:
-        response = model.generate_content(
+        return llm_cache.cached_generate(
+            MODEL_NAME,
             prompt,
-            generation_config={
-                "temperature": 0.4,
-                "top_p": 0.9,
-                "max_output_tokens": 2048,
-            }
-        )
-        return response.text.strip()
+            lambda: _get_model().generate_content(
+                prompt,
+                generation_config=GENERATION_CONFIG,
+                request_options=_request_options(timeout_s),
+            ).text,
+            generation_config=GENERATION_CONFIG,
+            bypass=bypass_cache,
+        ).strip()
     except Exception as e:
         logging.exception("Gemini API call failed")
         raise RuntimeError(f"Gemini API error: {e}")
@@ -157,41 +210,46 @@ def _safe_parse_json(text: str) -> Dict[str, Any]:
 # DB Storage
 # ─────────────────────────────────────────────────────────────
 
-def _save_gemini_output(
+def _save_gemini_outputs(
     session_id: str,
-    ai_data: Dict[str, Any],
-    target_role: str,
-    raw_text: str,
+    outputs: List[Tuple[str, Dict[str, Any], str]],
 ):
+    """Insert (target_role, ai_data, raw_text) rows in a single transaction."""
+    if not outputs:
+        return
+
     conn = sqlite3.connect(DB_PATH)
     try:
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA busy_timeout=5000;")
 
-        conn.execute(
-            """
-            INSERT INTO gemini_outputs(
-              session_id, target_role, summary_md, key_points,
-              action_items, sentiment_score, engagement_score,
-              risk_score, raw_json, model, model_version
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO gemini_outputs(
+                  session_id, target_role, summary_md, key_points,
+                  action_items, sentiment_score, engagement_score,
+                  risk_score, raw_json, model, model_version
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        session_id,
+                        target_role,
+                        ai_data.get("summary_md"),
+                        ai_data.get("key_points"),
+                        ai_data.get("action_items"),
+                        ai_data.get("sentiment_score"),
+                        ai_data.get("engagement_score"),
+                        ai_data.get("risk_score"),
+                        json.dumps({"parsed": ai_data, "raw_text": raw_text}),
+                        "gemini",
+                        MODEL_NAME,
+                    )
+                    for target_role, ai_data, raw_text in outputs
+                ],
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                session_id,
-                target_role,
-                ai_data.get("summary_md"),
-                ai_data.get("key_points"),
-                ai_data.get("action_items"),
-                ai_data.get("sentiment_score"),
-                ai_data.get("engagement_score"),
-                ai_data.get("risk_score"),
-                json.dumps({"parsed": ai_data, "raw_text": raw_text}),
-                "gemini",
-                MODEL_NAME,
-            ),
-        )
-        conn.commit()
     finally:
         conn.close()
 
@@ -200,33 +258,62 @@ def _save_gemini_output(
 # Public Entry Point
 # ─────────────────────────────────────────────────────────────
 
+def _analyze(prompt: str, bypass_cache: bool = False, deadline: Optional[float] = None) -> Tuple[Dict[str, Any], str]:
+    timeout_s = GEMINI_TIMEOUT_S
+    if deadline is not None:
+        timeout_s = deadline - time.monotonic()
+        if timeout_s <= 0:   # waited in the queue past the caller's deadline
+            raise FutureTimeout()
+    raw = _call_gemini(prompt, bypass_cache=bypass_cache, timeout_s=timeout_s)
+    return _safe_parse_json(raw), raw
+
+
 def run_ai_analysis(
     session_id: str,
     conversation: str,
     physiology_summary: Optional[str] = None,
+    timeout_s: Optional[float] = None,
+    bypass_cache: bool = False,
 ) -> Dict[str, Any]:
-
-    results = {}
-
-    # 1️⃣ Overall
-    overall_prompt = _build_overall_prompt(conversation, physiology_summary)
-    overall_raw = _call_gemini(overall_prompt)
-    overall_data = _safe_parse_json(overall_raw)
-    _save_gemini_output(session_id, overall_data, "overall", overall_raw)
-    results["overall"] = overall_data
-
-    # 2️⃣ Seller Coaching
-    seller_prompt = _build_seller_coaching_prompt(conversation)
-    seller_raw = _call_gemini(seller_prompt)
-    seller_data = _safe_parse_json(seller_raw)
-    _save_gemini_output(session_id, seller_data, "seller", seller_raw)
-    results["seller"] = seller_data
-
-    # 3️⃣ Customer Risk
-    customer_prompt = _build_customer_risk_prompt(conversation, physiology_summary)
-    customer_raw = _call_gemini(customer_prompt)
-    customer_data = _safe_parse_json(customer_raw)
-    _save_gemini_output(session_id, customer_data, "customer", customer_raw)
-    results["customer"] = customer_data
-
+    """
+    Run the overall, seller-coaching and customer-risk analyses concurrently.
+
+    Each call gets `timeout_s` (default GEMINI_TIMEOUT_S) measured from
+    submission. Roles that fail or time out come back as {"error": ...};
+    the successful ones are saved together in one transaction. Raises
+    RuntimeError only if every analysis failed. Responses are served from
+    the LLM cache unless `bypass_cache` is set.
+    """
+    timeout_s = GEMINI_TIMEOUT_S if timeout_s is None else timeout_s
+
+    prompts = {
+        "overall": _build_overall_prompt(conversation, physiology_summary),
+        "seller": _build_seller_coaching_prompt(conversation),
+        "customer": _build_customer_risk_prompt(conversation, physiology_summary),
+    }
+
+    deadline = time.monotonic() + timeout_s
+    futures = {
+        role: _gemini_executor.submit(_analyze, prompt, bypass_cache, deadline)
+        for role, prompt in prompts.items()
+    }
+
+    results: Dict[str, Any] = {}
+    outputs: List[Tuple[str, Dict[str, Any], str]] = []
+    for role, future in futures.items():
+        try:
+            data, raw = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception as e:
+            future.cancel()
+            kind = "timed out" if isinstance(e, FutureTimeout) else f"failed: {e}"
+            logging.warning("Gemini %s analysis for session %s %s", role, session_id, kind)
+            results[role] = {"error": f"{role} analysis {kind}"}
+            continue
+        results[role] = data
+        outputs.append((role, data, raw))
+
+    if not outputs:
+        raise RuntimeError(f"All Gemini analyses failed for session {session_id}")
+
+    _save_gemini_outputs(session_id, outputs)
     return results
@@ -0,0 +1,457 @@
+"""
+loadtest.py — Concurrent live-call load generator with mock ElevenLabs / Gemini.
+
+Two subcommands:
+
+  mocks — a local stand-in for the ElevenLabs speech-to-text and Gemini
+          generateContent APIs with configurable latency and error rate.
+          Start the backend pointed at it:
+
+              python3 loadtest.py mocks --port 8090 --stt-latency-ms 900 --llm-latency-ms 4000
+              ELEVENLABS_BASE_URL=http://127.0.0.1:8090 ELEVENLABS_API_KEY=mock \\
+              GEMINI_API_ENDPOINT=http://127.0.0.1:8090 GEMINI_API_KEY=mock \\
+              LLM_CACHE_DISABLED=true flask run
+
+  run   — simulates N concurrent recordings against a running backend, on
+          the same cadence as record.html: one webcam frame in flight at a
+          time, the next sent after the reply's next_frame_ms (2.4 s when
+          the server isn't backed up, at most 15 s, doubling on errors), an
+          audio chunk every 10 s, a MorphCast snapshot every 20 s, plus the
+          page's polling loops (emotions 2.4 s, transcript 4 s, live summary
+          30 s).
+          Calls ramp up over --ramp-s, run for --duration-s, then end their
+          session. Prints throughput, p50/p95/p99 latency and error rate per
+          route, optionally as JSON.
+
+              python3 loadtest.py run --calls 20 --duration-s 120 --out load_20.json
+
+Raise --calls until the server starts stretching the frame interval
+(/analyze-frame's mean interval rises above 2.4 s) or errors appear; that
+is the per-box ceiling.
+"""
+
+import io
+import re
+import json
+import math
+import time
+import wave
+import base64
+import random
+import argparse
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+BASE_FRAME_INTERVAL_S = 2.4    # record.html BASE_FRAME_MS
+MAX_FRAME_INTERVAL_S = 15.0    # record.html MAX_FRAME_MS
+AUDIO_INTERVAL_S = 10.0
+MORPHCAST_INTERVAL_S = 20.0
+EMOTION_POLL_S = 2.4
+TRANSCRIPT_POLL_S = 4.0
+LIVE_SUMMARY_POLL_S = 30.0
+
+# 1×1 baseline JPEG; used when --frame isn't given and Pillow isn't installed.
+TINY_JPEG_B64 = (
+    "/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAP//////////////////////////////////////////////"
+    "////////////////////////////////////////////wgALCAABAAEBAREA/8QAFBABAAAAAAAAAAAAAAAA"
+    "AAAAAP/aAAgBAQABPxA="
+)
+
+MOCK_LINES = [
+    "Thanks for making the time today.",
+    "Can you walk me through the pricing tiers?",
+    "We'd need this rolled out before the end of the quarter.",
+    "How does the integration with our payroll system work?",
+    "That sounds reasonable, let me check with my team.",
+]
+
+MOCK_SUMMARY = {
+    "overall_summary": "Mock summary generated by loadtest.py.",
+    "emotion_analysis": "Client stayed mostly neutral with brief positive spikes.",
+    "key_moments": [{"t_ms": 0, "description": "Call opened", "emotion_context": "neutral"}],
+    "risks": ["Budget approval pending"],
+    "opportunities": ["Interest in payroll integration"],
+    "next_steps": ["Send pricing sheet"],
+    "client_mood": "neutral",
+    "confidence": 0.5,
+}
+
+
+# ── Mock vendor server ───────────────────────────────────────────────────────
+
+class MockVendorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stt_latency_s = 0.8
+    llm_latency_s = 3.0
+    jitter = 0.25        # ± fraction of latency
+    error_rate = 0.0
+    counts: Dict[str, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    def log_message(self, fmt, *args):   # keep the console quiet under load
+        pass
+
+    def _sleep(self, base_s: float):
+        time.sleep(max(0.0, base_s * (1 + random.uniform(-self.jitter, self.jitter))))
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+
+        if self.path.startswith("/v1/speech-to-text"):
+            kind = "stt"
+        elif re.search(r"/models/[^/:]+:generateContent", self.path):
+            kind = "llm"
+        else:
+            self._reply(404, {"error": f"mock has no route for {self.path}"})
+            return
+        with self.lock:
+            self.counts[kind] += 1
+
+        self._sleep(self.stt_latency_s if kind == "stt" else self.llm_latency_s)
+        if random.random() < self.error_rate:
+            self._reply(503, {"error": {"code": 503, "message": "mock overload", "status": "UNAVAILABLE"}})
+            return
+
+        if kind == "stt":
+            text = random.choice(MOCK_LINES)
+            words, t = [], random.uniform(0.0, 4.0)
+            speaker = random.choice(["speaker_0", "speaker_1"])
+            for w in text.split():
+                words.append({"text": w, "type": "word", "start": round(t, 2),
+                              "end": round(t + 0.3, 2), "speaker_id": speaker})
+                t += 0.35
+            self._reply(200, {"language_code": "en", "language_probability": 1.0,
+                              "text": text, "words": words})
+        else:
+            self._reply(200, {
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": json.dumps(MOCK_SUMMARY)}]},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {"promptTokenCount": length // 4, "candidatesTokenCount": 120,
+                                  "totalTokenCount": length // 4 + 120},
+            })
+
+
+def run_mocks(args):
+    MockVendorHandler.stt_latency_s = args.stt_latency_ms / 1000
+    MockVendorHandler.llm_latency_s = args.llm_latency_ms / 1000
+    MockVendorHandler.jitter = args.jitter
+    MockVendorHandler.error_rate = args.error_rate
+    server = ThreadingHTTPServer((args.host, args.port), MockVendorHandler)
+    server.daemon_threads = True
+    print(f"[mocks] ElevenLabs + Gemini stand-in on http://{args.host}:{args.port} "
+          f"(stt {args.stt_latency_ms} ms, llm {args.llm_latency_ms} ms, errors {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[mocks] Served {dict(MockVendorHandler.counts)}")
+
+
+# ── Load generator ───────────────────────────────────────────────────────────
+
+class Recorder:
+    """Thread-safe per-route latency / status collector."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.late_ticks: Dict[str, int] = defaultdict(int)
+        self.intervals: Dict[str, List[float]] = defaultdict(list)
+
+    def add(self, route: str, ms: float, status: Optional[int]):
+        with self._lock:
+            self.latencies[route].append(ms)
+            self.statuses[route][str(status) if status else "exception"] += 1
+            if not status or status >= 400:
+                self.errors[route] += 1
+
+    def late(self, route: str):
+        with self._lock:
+            self.late_ticks[route] += 1
+
+    def interval(self, route: str, seconds: float):
+        with self._lock:
+            self.intervals[route].append(seconds)
+
+
+def _percentile(sorted_ms: List[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, math.ceil(p / 100 * len(sorted_ms)) - 1))
+    return sorted_ms[k]
+
+
+def _make_frame_b64(path: Optional[str]) -> str:
+    if path:
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    try:
+        from PIL import Image   # realistic 480×360 frame, like record.html's canvas
+        buf = io.BytesIO()
+        Image.effect_noise((480, 360), 40).convert("RGB").save(buf, "JPEG", quality=70)
+        return base64.b64encode(buf.getvalue()).decode()
+    except ImportError:
+        return TINY_JPEG_B64
+
+
+def _make_audio(path: Optional[str], seconds: float = AUDIO_INTERVAL_S):
+    if path:
+        with open(path, "rb") as f:
+            return f.read(), path.rsplit("/", 1)[-1]
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:    # silent 16 kHz mono chunk
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\x00\x00" * int(16000 * seconds))
+    return buf.getvalue(), "chunk.wav"
+
+
+class SimulatedCall:
+    def __init__(self, index: int, base: str, client_id: int, rec: Recorder, stop: threading.Event,
+                 frame_b64: str, audio: tuple, timeout_s: float):
+        self.index = index
+        self.base = base
+        self.client_id = client_id
+        self.rec = rec
+        self.stop = stop
+        self.frame = "data:image/jpeg;base64," + frame_b64
+        self.audio = audio
+        self.timeout_s = timeout_s
+        self.session_id: Optional[int] = None
+        self.t0 = 0.0
+
+    def _request(self, http, route: str, method: str, path: str, **kw):
+        t = time.perf_counter()
+        status = None
+        try:
+            resp = http.request(method, self.base + path, timeout=self.timeout_s, **kw)
+            status = resp.status_code
+            _ = resp.content
+            return resp
+        except Exception:
+            return None
+        finally:
+            self.rec.add(route, (time.perf_counter() - t) * 1000, status)
+
+    def _loop(self, route: str, interval_s: float, fn):
+        """Fixed-rate loop like setInterval; ticks that are already past due are skipped and counted."""
+        import requests
+        http = requests.Session()
+        next_due = time.monotonic() + random.uniform(0, interval_s)
+        while not self.stop.wait(max(0.0, next_due - time.monotonic())):
+            fn(http)
+            next_due += interval_s
+            while next_due < time.monotonic():
+                self.rec.late(route)
+                next_due += interval_s
+
+    def _offset_ms(self) -> int:
+        return int((time.monotonic() - self.t0) * 1000)
+
+    def _frame_loop(self):
+        """Server-paced like record.html's sendFrame(): the reply's next_frame_ms sets the next wait."""
+        import requests
+        http = requests.Session()
+        route = "POST /analyze-frame"
+        interval_s = BASE_FRAME_INTERVAL_S
+        while not self.stop.wait(interval_s):
+            resp = self._request(http, route, "POST", f"/api/analyze-frame/{self.session_id}",
+                                 json={"frame": self.frame, "timestamp_ms": self._offset_ms()})
+            try:
+                resp.raise_for_status()
+                next_s = (resp.json().get("next_frame_ms") or BASE_FRAME_INTERVAL_S * 1000) / 1000
+                interval_s = max(BASE_FRAME_INTERVAL_S, min(MAX_FRAME_INTERVAL_S, next_s))
+            except Exception:   # backend busy/offline — back off
+                interval_s = min(MAX_FRAME_INTERVAL_S, interval_s * 2)
+            self.rec.interval(route, interval_s)
+
+    def _audio(self, http):
+        data, name = self.audio
+        self._request(http, "POST /transcribe", "POST",
+                      f"/api/transcribe/{self.session_id}?offset_ms={self._offset_ms()}",
+                      files={"audio": (name, data)})
+
+    def _morphcast(self, http):
+        snapshot = {"attention": random.randint(40, 95), "valence100": random.randint(30, 80),
+                    "positivity": random.randint(30, 80)}
+        self._request(http, "POST /events", "POST", f"/api/sessions/{self.session_id}/events",
+                      json=[{"timestamp_ms": self._offset_ms(), "source": "morphcast",
+                             "emotion": random.choice(["neutral", "happy", "surprise"]),
+                             "valence": round(random.uniform(-0.4, 0.6), 3),
+                             "text": json.dumps(snapshot)}])
+
+    def _poll_session(self, route):
+        def poll(http):
+            self._request(http, route, "GET", f"/api/sessions/{self.session_id}?events=true")
+        return poll
+
+    def _poll_windows(self, http):
+        self._request(http, "GET /summary/windows", "GET", f"/api/sessions/{self.session_id}/summary/windows")
+
+    def run(self):
+        import requests
+        http = requests.Session()
+        resp = self._request(http, "POST /sessions", "POST", "/api/sessions",
+                             json={"client_id": self.client_id, "title": f"Load test call {self.index}"})
+        if resp is None or resp.status_code != 201:
+            print(f"[load] Call {self.index}: could not create a session")
+            return
+        self.session_id = resp.json()["id"]
+        self.t0 = time.monotonic()
+
+        loops = [
+            ("POST /transcribe", AUDIO_INTERVAL_S, self._audio),
+            ("POST /events", MORPHCAST_INTERVAL_S, self._morphcast),
+            ("GET /sessions (emotion poll)", EMOTION_POLL_S, self._poll_session("GET /sessions (emotion poll)")),
+            ("GET /sessions (transcript poll)", TRANSCRIPT_POLL_S, self._poll_session("GET /sessions (transcript poll)")),
+            ("GET /summary/windows", LIVE_SUMMARY_POLL_S, self._poll_windows),
+        ]
+        threads = [
+            threading.Thread(target=self._loop, args=loop, daemon=True, name=f"call{self.index}-{loop[0]}")
+            for loop in loops
+        ]
+        threads.append(threading.Thread(target=self._frame_loop, daemon=True,
+                                        name=f"call{self.index}-POST /analyze-frame"))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self._request(http, "PATCH /sessions/end", "PATCH", f"/api/sessions/{self.session_id}/end",
+                      json={"summary": "Load test call", "overall_sentiment": 0.1, "engagement_score": 60})
+
+
+def run_load(args):
+    import requests
+
+    base = args.base_url.rstrip("/")
+    resp = requests.post(f"{base}/api/clients", json={"name": "Load Test", "company": "loadtest.py"}, timeout=10)
+    resp.raise_for_status()
+    client_id = resp.json()["id"]
+
+    rec = Recorder()
+    stop = threading.Event()
+    frame_b64 = _make_frame_b64(args.frame)
+    audio = _make_audio(args.audio)
+    calls = [
+        SimulatedCall(i, base, client_id, rec, stop, frame_b64, audio, args.timeout_s)
+        for i in range(args.calls)
+    ]
+    print(f"[load] {args.calls} call(s) against {base}, ramp {args.ramp_s:.0f} s, run {args.duration_s:.0f} s")
+
+    threads = []
+    started = time.monotonic()
+    for i, call in enumerate(calls):
+        if args.calls > 1 and args.ramp_s:
+            time.sleep(args.ramp_s / args.calls)
+        t = threading.Thread(target=call.run, daemon=True, name=f"call{i}")
+        t.start()
+        threads.append(t)
+    try:
+        time.sleep(max(0.0, args.duration_s - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("[load] Interrupted — ending calls")
+    stop.set()
+    for t in threads:
+        t.join(timeout=args.timeout_s + 5)
+    elapsed = time.monotonic() - started
+
+    report = summarize(rec, elapsed, args)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[load] Report written to {args.out}")
+
+
+def summarize(rec: Recorder, elapsed_s: float, args) -> Dict[str, Any]:
+    routes = {}
+    for route, lat in sorted(rec.latencies.items()):
+        ms = sorted(lat)
+        routes[route] = {
+            "requests": len(ms),
+            "rps": round(len(ms) / elapsed_s, 2),
+            "p50_ms": round(_percentile(ms, 50), 1),
+            "p95_ms": round(_percentile(ms, 95), 1),
+            "p99_ms": round(_percentile(ms, 99), 1),
+            "max_ms": round(ms[-1], 1),
+            "error_rate": round(rec.errors[route] / len(ms), 4),
+            "statuses": dict(rec.statuses[route]),
+            "late_ticks": rec.late_ticks.get(route, 0),
+        }
+        if rec.intervals.get(route):
+            routes[route]["mean_interval_s"] = round(sum(rec.intervals[route]) / len(rec.intervals[route]), 2)
+    total = sum(r["requests"] for r in routes.values())
+    errors = sum(rec.errors.values())
+    return {
+        "calls": args.calls,
+        "duration_s": round(elapsed_s, 1),
+        "base_url": args.base_url,
+        "requests": total,
+        "rps": round(total / elapsed_s, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "routes": routes,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n[load] {report['calls']} calls, {report['duration_s']} s, {report['requests']} requests, "
+          f"{report['rps']} req/s, {report['error_rate']:.2%} errors")
+    print(f"{'route':<34} {'req':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'late':>5}")
+    for route, r in report["routes"].items():
+        line = (f"{route:<34} {r['requests']:>6} {r['rps']:>7.2f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+                f"{r['p99_ms']:>8.0f} {r['error_rate'] * 100:>5.1f}% {r['late_ticks']:>5}")
+        if "mean_interval_s" in r:
+            line += f"  interval {r['mean_interval_s']:.2f} s"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live-call load generator with mock vendor APIs")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    m = sub.add_parser("mocks", help="Serve mock ElevenLabs + Gemini endpoints")
+    m.add_argument("--host", default="127.0.0.1")
+    m.add_argument("--port", type=int, default=8090)
+    m.add_argument("--stt-latency-ms", type=float, default=800, help="Mean speech-to-text latency")
+    m.add_argument("--llm-latency-ms", type=float, default=3000, help="Mean generateContent latency")
+    m.add_argument("--jitter", type=float, default=0.25, help="± fraction applied to latencies")
+    m.add_argument("--error-rate", type=float, default=0.0, help="Fraction of vendor calls answered 503")
+
+    r = sub.add_parser("run", help="Simulate concurrent recordings against a running backend")
+    r.add_argument("--base-url", default="http://127.0.0.1:5050")
+    r.add_argument("--calls", type=int, default=5, help="Concurrent simulated calls")
+    r.add_argument("--duration-s", type=float, default=60)
+    r.add_argument("--ramp-s", type=float, default=10, help="Spread call start-up over this long")
+    r.add_argument("--timeout-s", type=float, default=30, help="Per-request timeout")
+    r.add_argument("--frame", help="JPEG to send as the webcam frame")
+    r.add_argument("--audio", help="Audio file to send as each 10 s chunk (default: silent WAV)")
+    r.add_argument("--out", help="Write the report as JSON")
+
+    args = parser.parse_args()
+    if args.cmd == "mocks":
+        run_mocks(args)
+    else:
+        run_load(args)
+
+
+if __name__ == "__main__":
+    main()
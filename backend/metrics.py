@@ -0,0 +1,207 @@
+"""
+metrics.py — Per-route request metrics in Prometheus text format.
+
+init_app(app) installs request hooks that record, per route template
+(e.g. /api/sessions/<int:session_id>) and method:
+  - latency histogram, status-code counter, in-flight gauge
+  - SQL statements executed and time spent in them, as totals and as a
+    per-request histogram, so N+1 patterns show up as query-count spikes
+and serves everything at GET /metrics. Each response also gets a
+Server-Timing header (app / db time + query count) for the browser devtools.
+
+Other modules add their own series with register_collector(fn), where fn
+returns a list of exposition lines (see the DeepFace counters in
+blueprints/api.py).
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIX = "senselense"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+_lock = threading.Lock()
+_collectors: List[Callable[[], List[str]]] = []
+
+
+class Histogram:
+    """Fixed-bucket histogram; not thread-safe, callers hold their own lock."""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        out, cumulative = [], 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+Key = Tuple[str, str]   # (method, route)
+
+_latency: Dict[Key, Histogram] = {}
+_queries_per_request: Dict[Key, Histogram] = {}
+_status: Dict[Tuple[str, str, int], int] = defaultdict(int)
+_in_flight: Dict[Key, int] = defaultdict(int)
+_db_queries: Dict[Key, int] = defaultdict(int)
+_db_seconds: Dict[Key, float] = defaultdict(float)
+_background = {"queries": 0, "seconds": 0.0}   # SQL outside any request (worker threads)
+
+
+def register_collector(fn: Callable[[], List[str]]):
+    """Add a callable returning extra Prometheus exposition lines for /metrics."""
+    _collectors.append(fn)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(method: str, route: str) -> str:
+    return f'method="{method}",route="{_escape(route)}"'
+
+
+# ── SQL accounting ───────────────────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_metrics_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    try:
+        g._db_queries += 1
+        g._db_seconds += elapsed
+    except (RuntimeError, AttributeError):   # no request context / hooks not run
+        with _lock:
+            _background["queries"] += 1
+            _background["seconds"] += elapsed
+
+
+# ── Request hooks ────────────────────────────────────────────────────────────
+
+def _route_key() -> Key:
+    rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+    return request.method, rule
+
+
+def _before_request():
+    g._metrics_t0 = time.perf_counter()
+    g._db_queries = 0
+    g._db_seconds = 0.0
+    g._metrics_key = _route_key()
+    with _lock:
+        _in_flight[g._metrics_key] += 1
+
+
+def _after_request(response):
+    key = getattr(g, "_metrics_key", None)
+    if key is None:
+        return response
+    elapsed = time.perf_counter() - g._metrics_t0
+    response.headers["Server-Timing"] = (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={g._db_seconds * 1000:.1f};desc="{g._db_queries} queries"'
+    )
+    g._metrics_recorded = True
+    with _lock:
+        _latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+        _queries_per_request.setdefault(key, Histogram(QUERY_BUCKETS)).observe(g._db_queries)
+        _status[(key[0], key[1], response.status_code)] += 1
+        _db_queries[key] += g._db_queries
+        _db_seconds[key] += g._db_seconds
+    return response
+
+
+def _teardown_request(exc):
+    key = g.pop("_metrics_key", None)
+    if key is None:
+        return
+    recorded = g.pop("_metrics_recorded", False)
+    with _lock:
+        _in_flight[key] -= 1
+        if exc is not None and not recorded:   # response hooks never ran
+            _status[(key[0], key[1], 500)] += 1
+
+
+# ── Exposition ───────────────────────────────────────────────────────────────
+
+def render() -> str:
+    lines: List[str] = []
+
+    def header(name, kind, help_text):
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+    with _lock:
+        header("http_request_duration_seconds", "histogram", "Request latency by route.")
+        for (method, route), h in sorted(_latency.items()):
+            lines += h.lines(f"{PREFIX}_http_request_duration_seconds", _labels(method, route))
+
+        header("http_requests_total", "counter", "Responses by route and status code.")
+        for (method, route, status), n in sorted(_status.items()):
+            lines.append(f'{PREFIX}_http_requests_total{{{_labels(method, route)},status="{status}"}} {n}')
+
+        header("http_requests_in_flight", "gauge", "Requests currently being handled.")
+        for (method, route), n in sorted(_in_flight.items()):
+            lines.append(f"{PREFIX}_http_requests_in_flight{{{_labels(method, route)}}} {n}")
+
+        header("db_queries_per_request", "histogram", "SQL statements executed per request.")
+        for (method, route), h in sorted(_queries_per_request.items()):
+            lines += h.lines(f"{PREFIX}_db_queries_per_request", _labels(method, route))
+
+        header("db_queries_total", "counter", "SQL statements executed, by route.")
+        for (method, route), n in sorted(_db_queries.items()):
+            lines.append(f"{PREFIX}_db_queries_total{{{_labels(method, route)}}} {n}")
+        lines.append(f'{PREFIX}_db_queries_total{{method="",route="<background>"}} {_background["queries"]}')
+
+        header("db_query_seconds_total", "counter", "Time spent executing SQL, by route.")
+        for (method, route), s in sorted(_db_seconds.items()):
+            lines.append(f"{PREFIX}_db_query_seconds_total{{{_labels(method, route)}}} {s:.6f}")
+        lines.append(f'{PREFIX}_db_query_seconds_total{{method="",route="<background>"}} {_background["seconds"]:.6f}')
+
+    for collect in _collectors:
+        try:
+            lines += collect()
+        except Exception as e:
+            lines.append(f"# collector {getattr(collect, '__name__', collect)} failed: {e}")
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app: Flask):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
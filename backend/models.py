@@ -1,10 +1,21 @@
 # FILE: models.py - Database blueprint. Defines tables for Clients, Sessions, and ElevenLabs/Presage events.
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
+import json
+import sqlite3
 
 db = SQLAlchemy()
 
 
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores FOREIGN KEY / ON DELETE CASCADE unless enabled per connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
 class Client(db.Model):
     """A customer / prospect the sales team meets with."""
     __tablename__ = "clients"
@@ -16,7 +27,7 @@ class Client(db.Model):
     notes = db.Column(db.Text, default="")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    sessions = db.relationship("Session", back_populates="client", cascade="all, delete-orphan")
+    sessions = db.relationship("Session", back_populates="client", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -38,7 +49,7 @@ class Session(db.Model):
     __tablename__ = "sessions"
 
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
     title = db.Column(db.String(200), default="Meeting")
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     ended_at = db.Column(db.DateTime, nullable=True)
@@ -47,7 +58,11 @@ class Session(db.Model):
     engagement_score = db.Column(db.Float, default=0.0)   # 0–100
 
     client = db.relationship("Client", back_populates="sessions")
-    events = db.relationship("Event", back_populates="session", cascade="all, delete-orphan", order_by="Event.timestamp_ms")
+    events = db.relationship("Event", back_populates="session", cascade="all, delete-orphan", passive_deletes=True, order_by="Event.timestamp_ms")
+    summary_jobs = db.relationship("SummaryJob", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+    summary_windows = db.relationship("SummaryWindow", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+    emotion_chunks = db.relationship("EmotionChunk", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+    archive = db.relationship("SessionArchive", back_populates="session", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self, include_events=False):
         data = {
@@ -62,9 +77,24 @@ class Session(db.Model):
             "engagement_score": self.engagement_score,
         }
         if include_events:
-            data["events"] = [e.to_dict() for e in self.events]
+            data["events"] = [e.to_dict() for e in self.all_events()]
         return data
 
+    def all_events(self):
+        """Row events, packed emotion samples and archived events, in timeline order."""
+        if self.archive:
+            from archive import archived_events
+            from sample_store import merged_events
+            events = archived_events(self.archive) + merged_events(self.id)
+            return sorted(events, key=lambda e: (e.timestamp_ms, e.id))
+        has_chunks = db.session.query(
+            db.exists().where(EmotionChunk.session_id == self.id)
+        ).scalar()
+        if not has_chunks:
+            return list(self.events)
+        from sample_store import merged_events
+        return merged_events(self.id)
+
 
 class Event(db.Model):
     """
@@ -72,9 +102,13 @@ class Event(db.Model):
     source: 'presage' (emotion/reaction) | 'elevenlabs' (transcript chunk)
     """
     __tablename__ = "events"
+    # Packing / archiving deletes event rows but keeps their ids (PackedEvent,
+    # archive files), so ids must never be handed out again. Only applies to
+    # newly created tables; older ones keep plain rowid allocation.
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey("sessions.id"), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     timestamp_ms = db.Column(db.Integer, nullable=False)   # ms since session start
     source = db.Column(db.String(30), nullable=False)       # 'presage' | 'elevenlabs'
 
@@ -88,6 +122,20 @@ class Event(db.Model):
 
     session = db.relationship("Session", back_populates="events")
 
+    @classmethod
+    def bulk_insert(cls, rows):
+        """
+        executemany INSERT of plain column dicts — no ORM objects, no refresh.
+        Returns (first_id, last_id) of the new rows, or (None, None) if empty.
+        Relies on SQLite handing out consecutive rowids inside one write
+        transaction, so read the range before committing.
+        """
+        if not rows:
+            return None, None
+        db.session.execute(cls.__table__.insert(), rows)
+        last_id = db.session.execute(db.select(db.func.max(cls.id))).scalar()
+        return last_id - len(rows) + 1, last_id
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -99,3 +147,134 @@ class Event(db.Model):
             "speaker": self.speaker,
             "text": self.text,
         }
+
+
+class SummaryJob(db.Model):
+    """
+    A background AI summary run for a session (see AI/summary_jobs.py).
+    status: 'queued' | 'running' | 'done' | 'error'
+    """
+    __tablename__ = "summary_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    refresh = db.Column(db.Boolean, default=False)   # bypass the LLM response cache
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    worker = db.Column(db.String(120))                # "host:pid:boot" of the process that owns it
+    heartbeat_at = db.Column(db.DateTime)             # refreshed by the owner while queued/running
+
+    session = db.relationship("Session", back_populates="summary_jobs")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class SummaryWindow(db.Model):
+    """
+    A partial AI summary of one fixed-length window of a live session
+    (see AI/rolling_summary.py). Merged into the final summary on end.
+    status: 'queued' | 'running' | 'done' | 'error'
+    """
+    __tablename__ = "summary_windows"
+    __table_args__ = (db.UniqueConstraint("session_id", "window_index"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    window_index = db.Column(db.Integer, nullable=False)
+    start_ms = db.Column(db.Integer, nullable=False)     # ms since session start (inclusive)
+    end_ms = db.Column(db.Integer, nullable=False)       # exclusive
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    result_json = db.Column(db.Text)                     # parsed Gemini output for the window
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    session = db.relationship("Session", back_populates="summary_windows")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "window_index": self.window_index,
+            "start_ms": self.start_ms,
+            "end_ms": self.end_ms,
+            "status": self.status,
+            "result": json.loads(self.result_json) if self.result_json else None,
+            "error": self.error,
+        }
+
+
+class EmotionChunk(db.Model):
+    """
+    Packed block of high-rate emotion samples for one session + source
+    (see sample_store.py). Each *_blob is a zlib-compressed little-endian
+    array; ids/ts are delta-encoded. Replaces up to CHUNK_SIZE `events` rows.
+    """
+    __tablename__ = "emotion_chunks"
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = db.Column(db.String(30), nullable=False)     # 'presage' | 'morphcast'
+    start_ms = db.Column(db.Integer, nullable=False)
+    end_ms = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    ids_blob = db.Column(db.LargeBinary, nullable=False)        # int64, original events.id
+    ts_blob = db.Column(db.LargeBinary, nullable=False)         # int64 timestamp_ms
+    valence_blob = db.Column(db.LargeBinary, nullable=False)    # float64 (float32 in older chunks), NaN = NULL
+    emotion_blob = db.Column(db.LargeBinary, nullable=False)    # uint8 code into EMOTION_CODES
+    attention_blob = db.Column(db.LargeBinary)                  # float64 / older float32 (morphcast only)
+    extras_blob = db.Column(db.LargeBinary)                     # JSON list of remaining text fields
+
+    # Presage aggregates stored at pack time so trends.py never unpacks blobs
+    # (NULL on chunks packed before these columns existed; filled in on first read).
+    valence_sum = db.Column(db.Float)
+    valence_n = db.Column(db.Integer)
+    emotion_counts = db.Column(db.Text)                         # JSON {emotion: n} over valence_n samples
+
+    session = db.relationship("Session", back_populates="emotion_chunks")
+
+
+class SessionArchive(db.Model):
+    """
+    Stub left behind when an ended session's events are moved out of SQLite
+    into a compressed columnar file (see archive.py). The Session row stays;
+    reads of its events go through to the file.
+    """
+    __tablename__ = "session_archives"
+
+    session_id = db.Column(db.Integer, db.ForeignKey("sessions.id", ondelete="CASCADE"), primary_key=True)
+    path = db.Column(db.String(500), nullable=False)      # relative to Config.ARCHIVE_DIR
+    event_count = db.Column(db.Integer, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Aggregates stored at archive time (same as EmotionChunk's, plus duration
+    # and transcript lines) so trends.py never reads the file.
+    valence_sum = db.Column(db.Float)
+    valence_n = db.Column(db.Integer)
+    emotion_counts = db.Column(db.Text)
+    max_ms = db.Column(db.Integer)
+    transcript_n = db.Column(db.Integer)
+
+    session = db.relationship("Session", back_populates="archive")
+
+    def to_dict(self):
+        return {
+            "session_id": self.session_id,
+            "path": self.path,
+            "event_count": self.event_count,
+            "size_bytes": self.size_bytes,
+            "archived_at": self.archived_at.isoformat(),
+        }
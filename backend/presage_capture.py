@@ -1,7 +1,7 @@
 """
 presage_capture.py — Facial emotion capture using DeepFace + OpenCV
-Runs as a background thread during a session, sampling webcam every 2.4 s
-and POSTing emotion events to the Flask /api/sessions/<id>/events endpoint.
+Runs as a background pipeline during a session, sampling webcam every 2.4 s
+and POSTing batched emotion events to the Flask /api/sessions/<id>/events endpoint.
 
 Usage (standalone test):
     python3 presage_capture.py --session-id 1 --duration 30
@@ -15,7 +15,11 @@ Usage (from app):
 """
 
 import argparse
+import importlib.util
+import queue
 import time
+from collections import deque
+from itertools import islice
 import threading
 import json
 import requests
@@ -25,14 +29,23 @@ from dotenv import load_dotenv
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 
 # DeepFace + cv2 — install via: pip install deepface opencv-python-headless tf-keras
-try:
-    import cv2
-    from deepface import DeepFace
-    DEEPFACE_AVAILABLE = True
-except ImportError:
-    DEEPFACE_AVAILABLE = False
+# Only check they're installed here; importing them pulls in TensorFlow, so the
+# real import happens in the capture thread (see _load_models).
+DEEPFACE_AVAILABLE = all(importlib.util.find_spec(m) is not None for m in ("cv2", "deepface"))
+if not DEEPFACE_AVAILABLE:
     print("[presage] WARNING: deepface/cv2 not installed. Run: pip install deepface opencv-python-headless tf-keras")
 
+cv2 = None
+DeepFace = None
+
+
+def _load_models():
+    global cv2, DeepFace
+    if DeepFace is None:
+        import cv2 as _cv2
+        from deepface import DeepFace as _DeepFace
+        cv2, DeepFace = _cv2, _DeepFace
+
 # ── Emotion → valence mapping (rough approximation) ──────────────────────────
 EMOTION_VALENCE = {
     "happy":     0.9,
@@ -56,10 +69,179 @@ EMOTION_MAP = {
 }
 
 
+class EventSender:
+    """
+    Background shipper for timeline events.
+
+    Events are batched until `batch_size` is reached or `flush_interval_s`
+    passes, then sent in one request over a persistent keep-alive
+    `requests.Session` (one TCP connection, one DB commit per batch).
+    Batches that fail are kept in a bounded retry buffer (oldest dropped
+    once `max_buffered` is exceeded) and retried with backoff.
+
+    If `app` (the Flask app) is given, batches are inserted directly into
+    the events table instead — used when capture runs inside the server.
+    """
+
+    MAX_BATCH = 500   # cap per request when draining a backlog
+
+    def __init__(
+        self,
+        session_id: int,
+        flask_url: str = "http://localhost:5050",
+        batch_size: int = 5,
+        flush_interval_s: float = 5.0,
+        max_buffered: int = 2000,
+        app=None,
+    ):
+        self.session_id = session_id
+        self.url = f"{flask_url.rstrip('/')}/api/sessions/{session_id}/events"
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.app = app
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        self._pending: deque = deque(maxlen=max_buffered)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._http = None
+        self._backoff_s = 0.0
+        self._next_attempt = 0.0
+        self._stop_deadline = 0.0
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def start(self):
+        if self.app is None:
+            self._http = requests.Session()
+            self._http.headers["Content-Type"] = "application/json"
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, event: dict):
+        self._queue.put(event)
+
+    def stop(self, timeout: float = 5.0):
+        """Flush everything buffered (until a send fails or `timeout` runs out) and stop."""
+        self._stop_deadline = time.monotonic() + timeout
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        if self._http:
+            self._http.close()
+        if self._pending:
+            print(f"[presage] {len(self._pending)} events could not be delivered")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "direct-db" if self.app is not None else "http",
+            "sent": self.sent,
+            "batches": self.batches,
+            "failures": self.failures,
+            "buffered": len(self._pending) + self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+    def _loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                self._buffer(self._queue.get(timeout=0.5))
+                while True:
+                    self._buffer(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if self._stop_event.is_set() and self._queue.empty():
+                self._drain()
+                return
+            now = time.monotonic()
+            due = now - last_flush >= self.flush_interval_s
+            if self._pending and (len(self._pending) >= self.batch_size or due) \
+                    and now >= self._next_attempt:
+                self._flush()
+                last_flush = now
+
+    def _drain(self):
+        """On stop: send MAX_BATCH-sized batches until empty, a send fails, or the stop deadline passes."""
+        while self._pending and time.monotonic() < self._stop_deadline:
+            failures = self.failures
+            self._flush()
+            if self.failures != failures:
+                return
+
+    def _buffer(self, event: dict):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1   # deque drops the oldest
+        self._pending.append(event)
+
+    def _flush(self):
+        batch = list(islice(self._pending, self.MAX_BATCH))
+        ok = self._send_db(batch) if self.app is not None else self._send_http(batch)
+        if ok:
+            for _ in batch:
+                self._pending.popleft()
+            self.sent += len(batch)
+            self.batches += 1
+            self._backoff_s = 0.0
+            self._next_attempt = 0.0
+        else:
+            self.failures += 1
+            self._backoff_s = min(30.0, (self._backoff_s * 2) or 1.0)
+            self._next_attempt = time.monotonic() + self._backoff_s
+
+    def _send_http(self, batch: list) -> bool:
+        try:
+            r = self._http.post(self.url, json=batch, timeout=3)
+            if r.status_code in (200, 201):
+                return True
+            print(f"[presage] POST failed: {r.status_code} {r.text[:80]}")
+        except requests.RequestException as e:
+            print(f"[presage] POST error: {e}")
+        return False
+
+    def _send_db(self, batch: list) -> bool:
+        import timeline_cache
+        from models import db, Event
+        from blueprints.api import _notify_live_summary
+        try:
+            with self.app.app_context():
+                Event.bulk_insert([{
+                    "session_id": self.session_id,
+                    "timestamp_ms": e.get("timestamp_ms", 0),
+                    "source": e.get("source", "presage"),
+                    "emotion": e.get("emotion"),
+                    "valence": e.get("valence"),
+                    "speaker": e.get("speaker"),
+                    "text": e.get("text"),
+                } for e in batch])
+                db.session.commit()
+                # Same follow-up as POST /api/sessions/<id>/events
+                timeline_cache.invalidate(self.session_id)
+                _notify_live_summary(self.session_id, max((e.get("timestamp_ms", 0) for e in batch), default=0))
+            return True
+        except Exception as e:
+            print(f"[presage] DB insert error: {e}")
+            return False
+
+
 class PresageCapture:
     """
-    Captures webcam frames at `interval_ms` intervals, runs DeepFace emotion
-    analysis, and POSTs results to Flask.
+    Three-stage capture pipeline:
+
+      grab thread   — reads the camera continuously and keeps ONLY the latest
+                      frame (plus its capture time), so buffered frames never
+                      go stale while DeepFace is busy.
+      analyze loop  — every `interval_ms` (fixed-rate, no drift) takes the
+                      newest unseen frame, runs DeepFace, queues the result.
+      sender        — EventSender ships batches over a keep-alive connection
+                      (or straight into SQLite in-process), so a slow network
+                      never delays the next sample.
+
+    Event timestamps are the frame's capture time, not the time analysis or
+    the POST finished.
     """
 
     def __init__(
@@ -68,61 +250,137 @@ class PresageCapture:
         flask_url: str = "http://localhost:5050",
         interval_ms: int = 2400,
         camera_index: int = 0,
+        frame_width: int = 640,
+        frame_height: int = 480,
+        detector_backend: str = "opencv",
+        batch_size: int = 5,
+        flush_interval_s: float = 5.0,
+        app=None,
     ):
         self.session_id = session_id
         self.flask_url = flask_url.rstrip("/")
         self.interval_s = interval_ms / 1000
         self.camera_index = camera_index
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.detector_backend = detector_backend   # 'opencv' matches the API path; much faster than the default
         self._stop_event = threading.Event()
         self._thread = None
+        self._grab_thread = None
         self._session_start_ms = int(time.time() * 1000)
 
+        # latest-frame slot shared by grab → analyze
+        self._frame_lock = threading.Lock()
+        self._latest_frame = None
+        self._latest_frame_ms = 0
+        self._last_analyzed_ms = 0
+
+        # app given → write straight to SQLite instead of POSTing to ourselves
+        self._sender = EventSender(
+            session_id,
+            flask_url=flask_url,
+            batch_size=batch_size,
+            flush_interval_s=flush_interval_s,
+            app=app,
+        )
+
+        self._samples = 0
+        self._frames_grabbed = 0
+        self._started_at = None
+
     def start(self):
-        """Start capturing in a background thread (non-blocking)."""
+        """Start capturing in background threads (non-blocking)."""
         if not DEEPFACE_AVAILABLE:
             print("[presage] Cannot start — install deepface + opencv-python-headless first")
             return
         self._stop_event.clear()
+        self._started_at = time.time()
         self._thread = threading.Thread(target=self._run, daemon=True)
+        self._sender.start()
         self._thread.start()
         print(f"[presage] Started capture for session {self.session_id} @ {self.interval_s}s intervals")
 
     def stop(self):
-        """Signal the capture thread to stop."""
+        """Signal all stages to stop and flush any queued samples."""
         self._stop_event.set()
-        if self._thread:
-            self._thread.join(timeout=5)
-        print("[presage] Stopped")
+        for t in (self._thread, self._grab_thread):
+            if t:
+                t.join(timeout=5)
+        self._sender.stop()
+        s = self.stats()
+        print(f"[presage] Stopped — {s['samples']} samples, "
+              f"{s['achieved_hz']:.2f} Hz achieved (target {s['target_hz']:.2f} Hz)")
+
+    def stats(self) -> dict:
+        """Sample-rate report: achieved vs. target analysis rate."""
+        elapsed = (time.time() - self._started_at) if self._started_at else 0.0
+        return {
+            "samples": self._samples,
+            "frames_grabbed": self._frames_grabbed,
+            "elapsed_s": round(elapsed, 1),
+            "target_hz": 1 / self.interval_s if self.interval_s else 0.0,
+            "achieved_hz": self._samples / elapsed if elapsed else 0.0,
+            "sender": self._sender.stats(),
+        }
+
+    # ── Stage 1: grab ─────────────────────────────────────────────────────────
+
+    def _grab_loop(self, cap):
+        while not self._stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                print("[presage] Camera read failed, retrying…")
+                self._stop_event.wait(timeout=0.5)
+                continue
+            captured_ms = int(time.time() * 1000)
+            with self._frame_lock:
+                self._latest_frame = frame
+                self._latest_frame_ms = captured_ms
+            self._frames_grabbed += 1
+
+    # ── Stage 2: analyze ──────────────────────────────────────────────────────
 
     def _run(self):
+        _load_models()
         cap = cv2.VideoCapture(self.camera_index)
         if not cap.isOpened():
             print("[presage] ERROR: Could not open camera")
             return
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._grab_thread = threading.Thread(target=self._grab_loop, args=(cap,), daemon=True)
+        self._grab_thread.start()
 
         try:
+            next_tick = time.monotonic()
             while not self._stop_event.is_set():
-                loop_start = time.time()
-
-                ret, frame = cap.read()
-                if not ret:
-                    print("[presage] Camera read failed, retrying…")
-                    time.sleep(0.5)
-                    continue
-
-                # Run DeepFace emotion analysis on the frame
-                emotion, valence = self._analyze(frame)
-                timestamp_ms = int(time.time() * 1000) - self._session_start_ms
-
-                # POST to Flask
-                self._post_event(timestamp_ms, emotion, valence)
-
-                # Sleep remainder of interval
-                elapsed = time.time() - loop_start
-                sleep_for = max(0, self.interval_s - elapsed)
-                self._stop_event.wait(timeout=sleep_for)
-
+                with self._frame_lock:
+                    frame = self._latest_frame
+                    captured_ms = self._latest_frame_ms
+
+                if frame is not None and captured_ms > self._last_analyzed_ms:
+                    self._last_analyzed_ms = captured_ms
+                    emotion, valence = self._analyze(frame)
+                    self._samples += 1
+                    self._sender.submit({
+                        "timestamp_ms": captured_ms - self._session_start_ms,
+                        "source": "presage",
+                        "emotion": emotion,
+                        "valence": valence,
+                    })
+
+                # Fixed-rate schedule; if analysis overran, skip missed ticks
+                next_tick += self.interval_s
+                now = time.monotonic()
+                if next_tick < now:
+                    next_tick = now
+                self._stop_event.wait(timeout=next_tick - now)
         finally:
+            self._stop_event.set()
+            if self._grab_thread:
+                self._grab_thread.join(timeout=2)
             cap.release()
 
     def _analyze(self, frame):
@@ -133,6 +391,7 @@ class PresageCapture:
                 actions=["emotion"],
                 enforce_detection=False,  # don't crash if face not detected
                 silent=True,
+                detector_backend=self.detector_backend,
             )
             # result is a list when multiple faces; take first
             if isinstance(result, list):
@@ -148,25 +407,6 @@ class PresageCapture:
             print(f"[presage] Analysis error: {e}")
             return "neutral", 0.0
 
-    def _post_event(self, timestamp_ms: int, emotion: str, valence: float):
-        """POST a single presage event to Flask."""
-        payload = {
-            "timestamp_ms": timestamp_ms,
-            "source": "presage",
-            "emotion": emotion,
-            "valence": valence,
-        }
-        try:
-            r = requests.post(
-                f"{self.flask_url}/api/sessions/{self.session_id}/events",
-                json=[payload],  # endpoint accepts a list
-                timeout=3,
-            )
-            if r.status_code not in (200, 201):
-                print(f"[presage] POST failed: {r.status_code} {r.text[:80]}")
-        except requests.RequestException as e:
-            print(f"[presage] POST error: {e}")
-
 
 # ── Flask Integration Helpers ─────────────────────────────────────────────────
 
@@ -174,11 +414,14 @@ class PresageCapture:
 _active_captures: dict[int, PresageCapture] = {}
 
 
-def start_presage_for_session(session_id: int, flask_url: str = "http://localhost:5050") -> bool:
-    """Start a PresageCapture for a session. Called from Flask /api/record."""
+def start_presage_for_session(session_id: int, flask_url: str = "http://localhost:5050", app=None) -> bool:
+    """
+    Start a PresageCapture for a session. Called from Flask /api/record.
+    Pass `app` to write events straight to the DB instead of over HTTP.
+    """
     if session_id in _active_captures:
         return False  # already running
-    cap = PresageCapture(session_id=session_id, flask_url=flask_url)
+    cap = PresageCapture(session_id=session_id, flask_url=flask_url, app=app)
     cap.start()
     _active_captures[session_id] = cap
     return True
@@ -200,12 +443,18 @@ if __name__ == "__main__":
     parser.add_argument("--duration", type=int, default=30, help="Capture duration in seconds")
     parser.add_argument("--flask-url", default="http://localhost:5050", help="Flask base URL")
     parser.add_argument("--interval-ms", type=int, default=2400, help="Sample interval in ms")
+    parser.add_argument("--width", type=int, default=640, help="Capture width in px")
+    parser.add_argument("--height", type=int, default=480, help="Capture height in px")
+    parser.add_argument("--detector", default="opencv", help="DeepFace detector backend")
     args = parser.parse_args()
 
     cap = PresageCapture(
         session_id=args.session_id,
         flask_url=args.flask_url,
         interval_ms=args.interval_ms,
+        frame_width=args.width,
+        frame_height=args.height,
+        detector_backend=args.detector,
     )
     cap.start()
     try:
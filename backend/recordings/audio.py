@@ -2,42 +2,119 @@ try:
     import pyaudio
 except ImportError:
     pyaudio = None
+import os
 import wave
 
+SAMPLE_WIDTH = 2   # paInt16
+
+
+def _open_wav(path, sample_rate, channels):
+    wf = wave.open(path, 'wb')
+    wf.setnchannels(channels)
+    wf.setsampwidth(SAMPLE_WIDTH)
+    wf.setframerate(sample_rate)
+    return wf
+
+
+def _open_stream(p, sample_rate, channels, chunk_size):
+    return p.open(format=pyaudio.paInt16,
+                  channels=channels,
+                  rate=sample_rate,
+                  input=True,
+                  frames_per_buffer=chunk_size)
+
+
 def record_wav(path, seconds=10, sample_rate=16000, channels=1, chunk_size=1024):
     """
     Records audio from the default input device and saves it to a WAV file.
+    Each buffer is written as it arrives, so memory stays flat for long calls.
     """
     if pyaudio is None:
         print("[!] PyAudio is not installed or no audio device found. Skipping recording.")
         return
 
     p = pyaudio.PyAudio()
-    
+
     try:
-        stream = p.open(format=pyaudio.paInt16,
-                        channels=channels,
-                        rate=sample_rate,
-                        input=True,
-                        frames_per_buffer=chunk_size)
+        stream = _open_stream(p, sample_rate, channels, chunk_size)
 
         print(f"[*] Recording for {seconds} seconds...")
-        frames = []
+        with _open_wav(path, sample_rate, channels) as wf:
+            for _ in range(0, int(sample_rate / chunk_size * seconds)):
+                wf.writeframes(stream.read(chunk_size, exception_on_overflow=False))
+
+        print("[*] Recording complete.")
+
+        stream.stop_stream()
+        stream.close()
+
+    finally:
+        p.terminate()
+
+
+def record_chunks(out_dir, on_chunk, seconds=10, chunk_seconds=30, sample_rate=16000,
+                  channels=1, chunk_size=1024, prefix="chunk", overlap_seconds=0):
+    """
+    Records like record_wav, but cuts a new WAV file every `chunk_seconds`
+    and calls on_chunk(path, offset_ms, index) as soon as each one is closed,
+    so the caller can transcribe it while recording continues. offset_ms is
+    where the chunk starts in the recording. Only the current buffer (plus
+    the overlap tail) is held in memory. Returns the number of chunks written.
+
+    With overlap_seconds, every chunk after the first also starts with the
+    last overlap_seconds of the previous one (its offset_ms is moved back
+    to match), so a speaker can be followed across the cut.
+    """
+    if pyaudio is None:
+        print("[!] PyAudio is not installed or no audio device found. Skipping recording.")
+        return 0
+
+    os.makedirs(out_dir, exist_ok=True)
+    total_frames = int(sample_rate * seconds)
+    frames_per_chunk = int(sample_rate * chunk_seconds)
+    tail_bytes = int(sample_rate * overlap_seconds) * SAMPLE_WIDTH * channels
+    tail = bytearray()   # most recent audio, replayed at the start of the next chunk
+    p = pyaudio.PyAudio()
+    wf, path, index, written, chunk_start, chunk_offset = None, None, 0, 0, 0, 0
 
-        for _ in range(0, int(sample_rate / chunk_size * seconds)):
-            data = stream.read(chunk_size, exception_on_overflow=False)
-            frames.append(data)
+    def close_chunk():
+        nonlocal wf
+        wf.close()
+        wf = None
+        on_chunk(path, chunk_offset * 1000 // sample_rate, index)
 
+    try:
+        stream = _open_stream(p, sample_rate, channels, chunk_size)
+        print(f"[*] Recording for {seconds} seconds in {chunk_seconds}s chunks...")
+
+        while written < total_frames:
+            if wf is None:
+                chunk_start = written
+                path = os.path.join(out_dir, f"{prefix}_{index:04d}.wav")
+                wf = _open_wav(path, sample_rate, channels)
+                wf.writeframes(bytes(tail))
+                chunk_offset = chunk_start - len(tail) // (SAMPLE_WIDTH * channels)
+            n = min(chunk_size, total_frames - written, chunk_start + frames_per_chunk - written)
+            data = stream.read(n, exception_on_overflow=False)
+            wf.writeframes(data)
+            if tail_bytes:
+                tail += data
+                del tail[:-tail_bytes]
+            written += n
+            if written - chunk_start >= frames_per_chunk:
+                close_chunk()
+                index += 1
+
+        if wf is not None:   # final partial chunk
+            close_chunk()
+            index += 1
         print("[*] Recording complete.")
 
         stream.stop_stream()
         stream.close()
-        
-        with wave.open(path, 'wb') as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-            wf.setframerate(sample_rate)
-            wf.writeframes(b''.join(frames))
-            
+
     finally:
+        if wf is not None:
+            wf.close()
         p.terminate()
+    return index
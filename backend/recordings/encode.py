@@ -0,0 +1,168 @@
+"""
+encode.py — Shrink audio before it goes to ElevenLabs speech-to-text.
+
+A 15-minute call as 16 kHz mono PCM WAV is ~29 MB; the same audio as
+Opus at 24 kbps is ~2.7 MB and as FLAC roughly half the WAV. encode_for_stt()
+transcodes a file to STT_AUDIO_CODEC (16 kHz mono) with ffmpeg before upload.
+It is used for the CLI recorder's chunks (Transcriptions/main.py) and for the
+browser's webm chunks at /api/transcribe, so both paths send the same format.
+
+ffmpeg is optional: without it (or with STT_AUDIO_CODEC=off, or if the
+encoded file would be larger than the input) the original file is sent.
+
+Compare codecs on a real recording:
+    python3 recordings/encode.py bench call.wav --codecs wav,flac,opus --stt
+Prints size / encode time / estimated upload time per codec and, with --stt,
+the measured end-to-end STT turnaround (honors ELEVENLABS_BASE_URL, so the
+loadtest.py mock server works too). Writes bench_audio.json.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+# 'opus' | 'flac' | 'off'
+STT_AUDIO_CODEC = os.getenv("STT_AUDIO_CODEC", "opus").lower()
+OPUS_BITRATE = os.getenv("STT_OPUS_BITRATE", "24k")
+SAMPLE_RATE = 16000
+ENCODE_TIMEOUT_S = 60
+
+CODECS = {
+    # codec: (file extension, ffmpeg output args)
+    "wav": ("wav", ["-c:a", "pcm_s16le"]),
+    "flac": ("flac", ["-c:a", "flac", "-compression_level", "5"]),
+    "opus": ("ogg", ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip"]),
+}
+
+_ffmpeg = shutil.which("ffmpeg")
+_warned = False
+
+
+def available() -> bool:
+    return _ffmpeg is not None
+
+
+def transcode(src_path: str, codec: str, dst_path: str = None) -> str:
+    """Convert src_path to `codec` at 16 kHz mono; returns the output path. Raises on ffmpeg failure."""
+    ext, args = CODECS[codec]
+    if dst_path is None:
+        fd, dst_path = tempfile.mkstemp(suffix=f".{ext}")
+        os.close(fd)
+    subprocess.run(
+        [_ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", src_path,
+         "-ac", "1", "-ar", str(SAMPLE_RATE), *args, dst_path],
+        check=True, capture_output=True, timeout=ENCODE_TIMEOUT_S,
+    )
+    return dst_path
+
+
+def encode_for_stt(src_path: str, codec: str = None) -> str:
+    """
+    Return the path to upload: a new temp file in the configured codec, or
+    src_path itself when encoding is off, unavailable, fails, or doesn't help.
+    Callers delete the returned path only if it differs from src_path.
+    """
+    global _warned
+    codec = (codec or STT_AUDIO_CODEC).lower()
+    if codec in ("off", "none", "") or codec not in CODECS:
+        return src_path
+    if not available():
+        if not _warned:
+            print("[encode] ffmpeg not found — uploading audio as recorded")
+            _warned = True
+        return src_path
+
+    try:
+        out = transcode(src_path, codec)
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"[encode] {codec} encode failed, sending original: {e}")
+        return src_path
+    if os.path.getsize(out) >= os.path.getsize(src_path):
+        os.unlink(out)
+        return src_path
+    return out
+
+
+# ── Codec benchmark ──────────────────────────────────────────────────────────
+
+def _stt_seconds(path: str) -> float:
+    from elevenlabs.client import ElevenLabs
+
+    base_url = os.getenv("ELEVENLABS_BASE_URL") or None
+    api_key = os.getenv("ELEVENLABS_API_KEY", "")
+    client = ElevenLabs(api_key=api_key, base_url=base_url) if base_url else ElevenLabs(api_key=api_key)
+    t = time.perf_counter()
+    with open(path, "rb") as f:
+        client.speech_to_text.convert(file=f, model_id="scribe_v2", diarize=True)
+    return time.perf_counter() - t
+
+
+def bench(src_path: str, codecs, repeat: int, uplink_kbps: float, stt: bool):
+    if not available():
+        raise SystemExit("ffmpeg is required for the codec benchmark")
+    results = []
+    for codec in codecs:
+        encode_runs, stt_runs, out = [], [], None
+        for _ in range(repeat):
+            if out:
+                os.unlink(out)
+            t = time.perf_counter()
+            out = transcode(src_path, codec)
+            encode_runs.append(time.perf_counter() - t)
+            if stt:
+                stt_runs.append(_stt_seconds(out))
+        size = os.path.getsize(out)
+        os.unlink(out)
+
+        encode_s = statistics.median(encode_runs)
+        upload_s = size * 8 / (uplink_kbps * 1000)
+        r = {
+            "codec": codec,
+            "bytes": size,
+            "encode_ms": round(encode_s * 1000, 1),
+            f"upload_ms_at_{uplink_kbps:g}kbps": round(upload_s * 1000, 1),
+            "estimated_total_ms": round((encode_s + upload_s) * 1000, 1),
+        }
+        if stt:
+            r["stt_turnaround_ms"] = round((encode_s + statistics.median(stt_runs)) * 1000, 1)
+        results.append(r)
+        line = (f"[bench] {codec:<5} {size / 1e6:>8.2f} MB  encode {r['encode_ms']:>8.1f} ms  "
+                f"upload≈{upload_s * 1000:>9.1f} ms")
+        if stt:
+            line += f"  stt {r['stt_turnaround_ms']:>9.1f} ms"
+        print(line)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio encoding for speech-to-text uploads")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="Compare upload size and STT turnaround across codecs")
+    b.add_argument("audio", help="Recording to encode (any format ffmpeg reads)")
+    b.add_argument("--codecs", default="wav,flac,opus", help=f"Comma-separated, from {','.join(CODECS)}")
+    b.add_argument("--repeat", type=int, default=3)
+    b.add_argument("--uplink-kbps", type=float, default=1000, help="Uplink speed for the upload estimate")
+    b.add_argument("--stt", action="store_true", help="Also time real STT calls (uses ELEVENLABS_API_KEY)")
+    b.add_argument("--out", default="bench_audio.json")
+    args = parser.parse_args()
+
+    codecs = [c.strip() for c in args.codecs.split(",") if c.strip()]
+    unknown = [c for c in codecs if c not in CODECS]
+    if unknown:
+        parser.error(f"unknown codec(s): {', '.join(unknown)}")
+    results = bench(args.audio, codecs, args.repeat, args.uplink_kbps, args.stt)
+    with open(args.out, "w") as f:
+        json.dump({"source": os.path.basename(args.audio),
+                   "source_bytes": os.path.getsize(args.audio),
+                   "results": results}, f, indent=2)
+    print(f"[bench] Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+sample_store.py — Packed columnar storage for high-rate emotion samples.
+
+Presage/MorphCast samples arrive every few seconds and each one is a full
+`events` row with NULL speaker/text (MorphCast even stuffs JSON into text).
+Packing moves a session's samples into EmotionChunk rows: up to CHUNK_SIZE
+samples per row, stored as compressed little-endian arrays
+(ids, timestamps, valence, emotion code, attention) plus the leftover
+MorphCast fields as compressed JSON.
+
+Reads are transparent: `merged_events()` returns row events and unpacked
+samples together, as objects with the same attributes / to_dict() as
+models.Event, so callers never care which layout a session uses.
+
+Enable with PACK_EMOTION_SAMPLES=true (sessions are packed when they end),
+or pack existing sessions from the CLI:
+    python3 sample_store.py --session-id 12
+    python3 sample_store.py --all-ended
+"""
+
+import sys
+import math
+import json
+import zlib
+import heapq
+import argparse
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from models import db, Event, EmotionChunk, Session
+
+PACKED_SOURCES = ("presage", "morphcast")
+CHUNK_SIZE = 4096
+
+# Stable code table — only ever append, codes are persisted.
+EMOTION_CODES = [
+    "neutral", "happy", "engaged", "confused", "negative",
+    "sad", "surprise", "angry", "fear", "disgust",
+]
+_CODE_OF = {name: i for i, name in enumerate(EMOTION_CODES)}
+NO_EMOTION = 255
+
+
+# ── Array codec ──────────────────────────────────────────────────────────────
+
+def _pack(typecode: str, values: Iterable, delta: bool = False) -> bytes:
+    arr = array(typecode, values)
+    if delta:
+        for i in range(len(arr) - 1, 0, -1):
+            arr[i] -= arr[i - 1]
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return zlib.compress(arr.tobytes(), 6)
+
+
+def _unpack(typecode: str, blob: bytes, delta: bool = False, raw: bytes = None) -> array:
+    arr = array(typecode)
+    arr.frombytes(zlib.decompress(blob) if raw is None else raw)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    if delta:
+        for i in range(1, len(arr)):
+            arr[i] += arr[i - 1]
+    return arr
+
+
+def _unpack_float(blob: bytes, count: int) -> array:
+    """Float column: float64, or float32 in chunks packed before that (told apart by size)."""
+    raw = zlib.decompress(blob)
+    return _unpack("d" if len(raw) == 8 * count else "f", blob, raw=raw)
+
+
+# ── Logical events ───────────────────────────────────────────────────────────
+
+class PackedEvent:
+    """Read-only stand-in for models.Event, rebuilt from packed storage."""
+    __slots__ = ("id", "session_id", "timestamp_ms", "source", "emotion",
+                 "valence", "speaker", "text")
+
+    def __init__(self, id, session_id, timestamp_ms, source, emotion, valence, text, speaker=None):
+        self.id = id
+        self.session_id = session_id
+        self.timestamp_ms = timestamp_ms
+        self.source = source
+        self.emotion = emotion
+        self.valence = valence
+        self.speaker = speaker
+        self.text = text
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "timestamp_ms": self.timestamp_ms,
+            "source": self.source,
+            "emotion": self.emotion,
+            "valence": self.valence,
+            "speaker": self.speaker,
+            "text": self.text,
+        }
+
+
+def _split_text(e: Event):
+    """Return (attention, extras) for a packable sample, or None if it isn't packable."""
+    if e.text is None:
+        return math.nan, None
+    if e.source != "morphcast":
+        return None
+    try:
+        payload = json.loads(e.text)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    attention = payload.pop("attention", None)
+    if attention is not None and not isinstance(attention, (int, float)):
+        return None
+    return (math.nan if attention is None else float(attention)), payload
+
+
+def iter_chunk(chunk: EmotionChunk) -> Iterable[PackedEvent]:
+    ids = _unpack("q", chunk.ids_blob, delta=True)
+    ts = _unpack("q", chunk.ts_blob, delta=True)
+    valence = _unpack_float(chunk.valence_blob, chunk.count)
+    exact = valence.typecode == "d"
+    emotion = _unpack("B", chunk.emotion_blob)
+    attention = _unpack_float(chunk.attention_blob, chunk.count) if chunk.attention_blob else None
+    extras = json.loads(zlib.decompress(chunk.extras_blob)) if chunk.extras_blob else None
+
+    for i in range(chunk.count):
+        v = valence[i]
+        code = emotion[i]
+        text = None
+        if attention is not None or extras is not None:
+            fields = {}
+            a = attention[i] if attention is not None else math.nan
+            if not math.isnan(a):
+                fields["attention"] = int(a) if a.is_integer() else a
+            if extras is not None and extras[i] is not None:
+                fields.update(extras[i])
+            if fields or (extras is not None and extras[i] is not None):
+                text = json.dumps(fields, separators=(",", ":"))
+        yield PackedEvent(
+            ids[i], chunk.session_id, ts[i], chunk.source,
+            None if code == NO_EMOTION else EMOTION_CODES[code],
+            None if math.isnan(v) else (v if exact else round(v, 6)),
+            text,
+        )
+
+
+def merged_events(
+    session_id: int,
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None,
+) -> List[Any]:
+    """Row events + packed samples for a session in [start_ms, end_ms), by timestamp."""
+    q = Event.query.filter(Event.session_id == session_id)
+    cq = EmotionChunk.query.filter(EmotionChunk.session_id == session_id)
+    if start_ms is not None:
+        q = q.filter(Event.timestamp_ms >= start_ms)
+        cq = cq.filter(EmotionChunk.end_ms >= start_ms)
+    if end_ms is not None:
+        q = q.filter(Event.timestamp_ms < end_ms)
+        cq = cq.filter(EmotionChunk.start_ms < end_ms)
+
+    out: List[Any] = list(q.all())
+    for chunk in cq.all():
+        for e in iter_chunk(chunk):
+            if (start_ms is None or e.timestamp_ms >= start_ms) and (end_ms is None or e.timestamp_ms < end_ms):
+                out.append(e)
+    out.sort(key=lambda e: (e.timestamp_ms, e.id))
+    return out
+
+
+def _iter_source_chunks(session_id: int, source: str) -> Iterator[PackedEvent]:
+    chunk_ids = [
+        cid for (cid,) in db.session.query(EmotionChunk.id)
+        .filter_by(session_id=session_id, source=source)
+        .order_by(EmotionChunk.start_ms, EmotionChunk.id)
+    ]
+    for cid in chunk_ids:   # one decoded chunk in memory at a time
+        chunk = db.session.get(EmotionChunk, cid)
+        yield from iter_chunk(chunk)
+        db.session.expunge(chunk)
+
+
+def iter_merged_events(session_id: int, batch_size: int = 1000) -> Iterator[Any]:
+    """
+    Streaming variant of merged_events() for exports: row events come from
+    a yield_per cursor (plain Row tuples, no ORM identity map) and packed
+    chunks are decoded one at a time, merged by (timestamp_ms, id).
+    """
+    rows = db.session.execute(
+        db.select(Event.__table__)
+        .where(Event.session_id == session_id)
+        .order_by(Event.timestamp_ms, Event.id)
+        .execution_options(yield_per=batch_size)
+    )
+    streams = [iter(rows)] + [_iter_source_chunks(session_id, src) for src in PACKED_SOURCES]
+    return heapq.merge(*streams, key=lambda e: (e.timestamp_ms, e.id))
+
+
+# ── Packing ──────────────────────────────────────────────────────────────────
+
+def sample_aggregates(events: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Presage valence sum / count and emotion counts (over samples with a
+    valence), plus the last timestamp and elevenlabs line count across all
+    events. Stored on EmotionChunk / SessionArchive rows for trends.py.
+    """
+    agg: Dict[str, Any] = {"valence_sum": 0.0, "valence_n": 0, "emotions": {}, "max_ms": 0, "transcript_n": 0}
+    for e in events:
+        agg["max_ms"] = max(agg["max_ms"], e.timestamp_ms)
+        if e.source == "elevenlabs":
+            agg["transcript_n"] += 1
+        elif e.source == "presage" and e.valence is not None:
+            agg["valence_sum"] += e.valence
+            agg["valence_n"] += 1
+            if e.emotion:
+                agg["emotions"][e.emotion] = agg["emotions"].get(e.emotion, 0) + 1
+    return agg
+
+
+def _build_chunk(session_id: int, source: str, rows: List[Event], splits: List) -> EmotionChunk:
+    has_text = any(extra is not None or not math.isnan(att) for att, extra in splits)
+    agg = sample_aggregates(rows)
+    return EmotionChunk(
+        session_id=session_id,
+        source=source,
+        start_ms=rows[0].timestamp_ms,
+        end_ms=rows[-1].timestamp_ms,
+        count=len(rows),
+        ids_blob=_pack("q", (e.id for e in rows), delta=True),
+        ts_blob=_pack("q", (e.timestamp_ms for e in rows), delta=True),
+        valence_blob=_pack("d", (math.nan if e.valence is None else e.valence for e in rows)),
+        emotion_blob=_pack("B", (NO_EMOTION if e.emotion is None else _CODE_OF[e.emotion] for e in rows)),
+        attention_blob=_pack("d", (att for att, _ in splits)) if has_text else None,
+        extras_blob=zlib.compress(json.dumps([extra for _, extra in splits]).encode(), 6) if has_text else None,
+        valence_sum=agg["valence_sum"],
+        valence_n=agg["valence_n"],
+        emotion_counts=json.dumps(agg["emotions"]),
+    )
+
+
+def pack_session(session_id: int, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Move a session's packable emotion samples into EmotionChunk rows.
+    Samples with an unknown emotion label, a speaker, or text that isn't a
+    MorphCast JSON object stay as ordinary rows. Returns samples packed.
+    Must run inside an app context; commits once.
+    """
+    packed = 0
+    for source in PACKED_SOURCES:
+        rows, splits = [], []
+        for e in (
+            Event.query.filter_by(session_id=session_id, source=source)
+            .order_by(Event.timestamp_ms, Event.id)
+            .yield_per(chunk_size)
+        ):
+            if e.speaker is not None or (e.emotion is not None and e.emotion not in _CODE_OF):
+                continue
+            split = _split_text(e)
+            if split is None:
+                continue
+            rows.append(e)
+            splits.append(split)
+
+        ids = [e.id for e in rows]
+        for i in range(0, len(rows), chunk_size):
+            db.session.add(_build_chunk(session_id, source, rows[i:i + chunk_size], splits[i:i + chunk_size]))
+        for i in range(0, len(ids), 900):   # stay under SQLite's bound-parameter limit
+            Event.query.filter(Event.id.in_(ids[i:i + 900])).delete(synchronize_session=False)
+        packed += len(rows)
+
+    db.session.commit()
+    if packed:
+        print(f"[samples] Packed {packed} samples for session {session_id}")
+    return packed
+
+
+def storage_stats(session_id: int) -> Dict[str, Any]:
+    """Row vs. packed sample counts and packed bytes for a session."""
+    chunks = EmotionChunk.query.filter_by(session_id=session_id).all()
+    return {
+        "row_events": Event.query.filter_by(session_id=session_id).count(),
+        "packed_samples": sum(c.count for c in chunks),
+        "chunks": len(chunks),
+        "packed_bytes": sum(
+            len(c.ids_blob) + len(c.ts_blob) + len(c.valence_blob) + len(c.emotion_blob)
+            + len(c.attention_blob or b"") + len(c.extras_blob or b"")
+            for c in chunks
+        ),
+    }
+
+
+# ── Standalone CLI ────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack emotion samples into columnar chunks")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--session-id", type=int, help="Pack a single session")
+    group.add_argument("--all-ended", action="store_true", help="Pack every ended session")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Samples per chunk")
+    args = parser.parse_args()
+
+    import os
+    os.environ.setdefault("DEEPFACE_WARMUP", "off")
+    from app import app
+
+    with app.app_context():
+        if args.session_id:
+            ids = [args.session_id]
+        else:
+            ids = [s.id for s in Session.query.filter(Session.ended_at.isnot(None)).all()]
+        total = sum(pack_session(sid, chunk_size=args.chunk_size) for sid in ids)
+        print(f"[samples] Packed {total} samples across {len(ids)} session(s)")
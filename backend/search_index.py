@@ -0,0 +1,164 @@
+"""
+search_index.py — Full-text search over session transcripts.
+
+An FTS5 index (`transcript_fts`) over Event.text, restricted to
+`elevenlabs` events. It is an external-content table on `events`, so the
+text is not stored twice, and SQLite triggers keep it in sync with every
+insert/update/delete — ORM writes, the Core bulk insert, and the presage
+direct-DB sender all go through them without any Python hooks.
+
+ensure_index() runs at startup (after db.create_all) and backfills the
+index the first time it is created.
+"""
+
+import re
+import html
+from typing import Any, Dict, List, Optional
+
+from models import db
+
+FTS_TABLE = "transcript_fts"
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# snippet() marks matches with these control characters; the text is
+# HTML-escaped first and only then are they turned into <mark> tags.
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='events', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events
+        WHEN new.source = 'elevenlabs' AND new.text IS NOT NULL BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events
+        WHEN old.source = 'elevenlabs' AND old.text IS NOT NULL BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF text, source ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            SELECT 'delete', old.id, old.text
+            WHERE old.source = 'elevenlabs' AND old.text IS NOT NULL;
+        INSERT INTO {FTS_TABLE}(rowid, text)
+            SELECT new.id, new.text
+            WHERE new.source = 'elevenlabs' AND new.text IS NOT NULL;
+    END""",
+]
+
+
+def ensure_index():
+    """Create the FTS table + triggers if missing, backfilling existing transcript rows."""
+    exists = db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :n"),
+        {"n": FTS_TABLE},
+    ).first()
+    for stmt in _DDL:
+        db.session.execute(db.text(stmt))
+    if not exists:
+        db.session.execute(db.text(
+            f"INSERT INTO {FTS_TABLE}(rowid, text) "
+            "SELECT id, text FROM events WHERE source = 'elevenlabs' AND text IS NOT NULL"
+        ))
+        print("[search] Built transcript index")
+    db.session.commit()
+
+
+def rebuild_index():
+    """Drop and rebuild the index from the events table (e.g. after restoring a backup)."""
+    db.session.execute(db.text(f"DELETE FROM {FTS_TABLE}"))
+    db.session.execute(db.text(
+        f"INSERT INTO {FTS_TABLE}(rowid, text) "
+        "SELECT id, text FROM events WHERE source = 'elevenlabs' AND text IS NOT NULL"
+    ))
+    db.session.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    db.session.commit()
+
+
+_OPERATORS = {"AND", "OR", "NOT"}
+_TOKEN_RE = re.compile(r'"[^"]*"|\S+')
+
+
+def to_match_query(q: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression: every term is quoted
+    (so punctuation can't break the syntax), "double-quoted phrases" stay
+    phrases, a trailing * keeps prefix search, and bare AND/OR/NOT pass
+    through as operators. Terms are ANDed by default.
+    """
+    parts = []
+    for tok in _TOKEN_RE.findall(q):
+        if tok in _OPERATORS:
+            if parts and parts[-1] not in _OPERATORS:
+                parts.append(tok)
+            continue
+        prefix = tok.endswith("*") and not tok.startswith('"')
+        term = tok.strip('"').rstrip("*").replace('"', '""').strip()
+        if term:
+            parts.append(f'"{term}"' + ("*" if prefix else ""))
+    while parts and parts[-1] in _OPERATORS:
+        parts.pop()
+    return " ".join(parts)
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    """Escape transcript text for HTML, then turn the match markers into <mark> tags."""
+    return (
+        html.escape(snippet or "")
+        .replace(_MARK_OPEN, "<mark>")
+        .replace(_MARK_CLOSE, "</mark>")
+    )
+
+
+def search(
+    q: str,
+    client_id: Optional[int] = None,
+    speaker: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Ranked transcript hits (best bm25 first) with a highlighted snippet."""
+    match = to_match_query(q)
+    if not match:
+        return []
+
+    where = [f"{FTS_TABLE} MATCH :match"]
+    params: Dict[str, Any] = {
+        "match": match, "limit": min(limit, MAX_LIMIT), "offset": offset,
+        "mark_open": _MARK_OPEN, "mark_close": _MARK_CLOSE,
+    }
+    if client_id is not None:
+        where.append("s.client_id = :client_id")
+        params["client_id"] = client_id
+    if speaker:
+        where.append("e.speaker = :speaker")
+        params["speaker"] = speaker
+
+    rows = db.session.execute(db.text(f"""
+        SELECT e.id, e.session_id, e.timestamp_ms, e.speaker,
+               s.client_id, s.title, s.started_at,
+               snippet({FTS_TABLE}, 0, :mark_open, :mark_close, '…', 16) AS snippet,
+               bm25({FTS_TABLE}) AS score
+        FROM {FTS_TABLE}
+        JOIN events e ON e.id = {FTS_TABLE}.rowid
+        JOIN sessions s ON s.id = e.session_id
+        WHERE {' AND '.join(where)}
+        ORDER BY score
+        LIMIT :limit OFFSET :offset
+    """), params).mappings().all()
+
+    return [
+        {
+            "event_id": r["id"],
+            "session_id": r["session_id"],
+            "session_title": r["title"],
+            "session_started_at": r["started_at"],
+            "client_id": r["client_id"],
+            "timestamp_ms": r["timestamp_ms"],
+            "speaker": r["speaker"],
+            "snippet": _highlight(r["snippet"]),
+            "score": round(-r["score"], 4),   # bm25 is lower-is-better; flip for readability
+        }
+        for r in rows
+    ]
@@ -1,16 +1,47 @@
+import os
+import sys
+import math
+import time
 import random
+import argparse
 from datetime import datetime, timedelta
+
+# DB-only script: don't pre-load DeepFace
+os.environ.setdefault("DEEPFACE_WARMUP", "off")
 from app import app
 from models import db, Client, Session, Event
 
+EMOTIONS = ["happy", "neutral", "engaged", "confused", "negative"]
+
+SCRIPT_PARTS = [
+    ("seller", "Hi, thanks for joining today. I'd love to show you how SenseLense integrates with your ADP workflow."),
+    ("client", "Yes, we've been looking for something that can help us track client engagement during these long demo calls."),
+    ("seller", "Exactly. Our AI analysis picks up on subtle cues that might be missed otherwise."),
+    ("client", "That sounds very promising. How does it handle multi-speaker environments?"),
+    ("seller", "It uses advanced diarization from ElevenLabs to distinguish between you and the customer automatically."),
+    ("client", "I see. And the emotion tracking? How accurate is that?"),
+    ("seller", "We use DeepFace for high-precision facial analysis, mapped directly to valence and specific emotion categories."),
+    ("client", "Interesting. Let's dive into the pricing and implementation timeline.")
+]
+
+SAMPLE_INTERVAL_MS = 2400  # presage sample rate as per README
+
+
+def _wipe():
+    """Delete all rows, children first (foreign keys are enforced)."""
+    from models import EmotionChunk, SummaryJob, SummaryWindow, SessionArchive
+    for model in (Event, EmotionChunk, SummaryWindow, SummaryJob, SessionArchive, Session, Client):
+        model.query.delete()
+    db.session.commit()
+    import timeline_cache
+    timeline_cache.reset()   # ids repeat after a wipe; drop entries keyed on the old ones
+
+
 def seed_data():
     with app.app_context():
         # Clear existing
         print("Cleaning database...")
-        Event.query.delete()
-        Session.query.delete()
-        Client.query.delete()
-        db.session.commit()
+        _wipe()
 
         # 1. Create Clients
         print("Seeding clients...")
@@ -60,24 +91,12 @@ def seed_data():
 
         # 3. Create Events (Timeline)
         print("Seeding events...")
-        emotions = ["happy", "neutral", "engaged", "confused", "negative"]
-        
-        script_parts = [
-            ("seller", "Hi, thanks for joining today. I'd love to show you how SenseLense integrates with your ADP workflow."),
-            ("client", "Yes, we've been looking for something that can help us track client engagement during these long demo calls."),
-            ("seller", "Exactly. Our AI analysis picks up on subtle cues that might be missed otherwise."),
-            ("client", "That sounds very promising. How does it handle multi-speaker environments?"),
-            ("seller", "It uses advanced diarization from ElevenLabs to distinguish between you and the customer automatically."),
-            ("client", "I see. And the emotion tracking? How accurate is that?"),
-            ("seller", "We use DeepFace for high-precision facial analysis, mapped directly to valence and specific emotion categories."),
-            ("client", "Interesting. Let's dive into the pricing and implementation timeline.")
-        ]
 
         for session in sessions:
             # Add some emotion samples (Presage)
             current_ms = 0
             while current_ms < 300000: # 5 minutes of data
-                emo = random.choice(emotions)
+                emo = random.choice(EMOTIONS)
                 valence = 0.5 if emo in ["happy", "engaged"] else (-0.5 if emo == "negative" else 0.0)
                 valence += random.uniform(-0.2, 0.2)
                 
@@ -89,11 +108,11 @@ def seed_data():
                     valence=max(-1.0, min(1.0, valence))
                 )
                 db.session.add(event)
-                current_ms += 2400 # 2.4s sample rate as per README
+                current_ms += SAMPLE_INTERVAL_MS
             
             # Add some transcript segments (ElevenLabs)
             current_ms = 5000
-            for speaker, text in script_parts:
+            for speaker, text in SCRIPT_PARTS:
                 event = Event(
                     session_id=session.id,
                     timestamp_ms=current_ms,
@@ -107,5 +126,207 @@ def seed_data():
         db.session.commit()
         print("✅ Database seeding complete.")
 
+# ── Generator mode ───────────────────────────────────────────────────────────
+# `python3 seed.py generate ...` builds production-sized DBs for profiling:
+# clients × sessions × duration × sample rate, fully reproducible from --seed,
+# written with executemany in --batch-rows chunks and committed every
+# --txn-rows rows.
+
+GEN_COMPANIES = ["Northwind", "Contoso", "Fabrikam", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay"]
+GEN_FIRST = ["Alex", "Jordan", "Priya", "Sam", "Mei", "Omar", "Lucia", "Tom", "Aisha", "Ken"]
+GEN_LAST = ["Nguyen", "Smith", "Patel", "Garcia", "Kim", "Okafor", "Rossi", "Müller", "Haddad", "Cohen"]
+GEN_LINES = {
+    "seller": [text for speaker, text in SCRIPT_PARTS if speaker == "seller"] + [
+        "Let me share my screen and walk you through the dashboard.",
+        "Most teams see payroll processing time drop by about a third.",
+        "We can phase the rollout so nothing changes for your employees mid-quarter.",
+        "What would need to be true for this to be a yes by the end of the month?",
+        "I'll send over the pricing sheet and a draft contract after this call.",
+    ],
+    "client": [text for speaker, text in SCRIPT_PARTS if speaker == "client"] + [
+        "Honestly the current provider has been a headache at year end.",
+        "I'm not sure the budget is there this quarter.",
+        "How long does implementation usually take for a team our size?",
+        "That's more than we were expecting to pay.",
+        "Okay, that actually addresses my main concern.",
+        "I'd need to loop in our CFO before we sign anything.",
+    ],
+}
+
+EVENT_INSERT_SQL = (
+    "INSERT INTO events (session_id, timestamp_ms, source, emotion, valence, speaker, text) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _emotion_for(valence: float, prev: str, rng: random.Random) -> str:
+    """Map valence to a label, sticking with the previous one most of the time."""
+    if prev and rng.random() < 0.7:
+        return prev
+    if valence > 0.45:
+        return "happy"
+    if valence > 0.2:
+        return "engaged"
+    if valence < -0.35:
+        return "negative"
+    if valence < -0.1:
+        return "confused"
+    return "neutral"
+
+
+def generate_session_events(session_id: int, duration_ms: int, sample_ms: int, rng: random.Random):
+    """
+    Yield (session_id, timestamp_ms, source, emotion, valence, speaker, text)
+    tuples: presage samples following a mean-reverting valence random walk,
+    and transcript lines in alternating speaker turns of realistic length.
+    Returns (mean valence, engagement 0–100) via StopIteration.value.
+    """
+    # Presage: Ornstein–Uhlenbeck walk around a per-call mood
+    mood = rng.uniform(-0.25, 0.5)
+    theta, sigma = 0.05, 0.12            # per-second reversion rate / volatility (stationary sd ≈ 0.38)
+    dt = sample_ms / 1000
+    step = sigma * math.sqrt(dt)
+    v, emo = mood, None
+    total_v, counts = 0.0, {e: 0 for e in EMOTIONS}
+    samples = max(1, duration_ms // sample_ms)
+    for i in range(samples):
+        v += theta * (mood - v) * dt + step * rng.gauss(0, 1)
+        v = max(-1.0, min(1.0, v))
+        emo = _emotion_for(v, emo, rng)
+        counts[emo] += 1
+        total_v += v
+        yield (session_id, i * sample_ms, "presage", emo, round(v, 4), None, None)
+
+    # Transcript: ~10 s chunks, turns of 1–4 lines, seller talks a bit more
+    t = rng.randint(2000, 6000)
+    speaker = "seller"
+    while t < duration_ms:
+        for _ in range(rng.randint(1, 4)):
+            yield (session_id, t, "elevenlabs", None, None, speaker, rng.choice(GEN_LINES[speaker]))
+            t += int(rng.lognormvariate(math.log(6000), 0.5))
+            if t >= duration_ms:
+                break
+        t += rng.randint(300, 2500)      # pause between turns
+        speaker = "client" if speaker == "seller" and rng.random() < 0.8 else "seller"
+
+    engagement = (counts["happy"] + counts["engaged"] + counts["neutral"] * 0.5) / samples * 100
+    return total_v / samples, engagement
+
+
+def generate(
+    clients: int = 10,
+    sessions_per_client: int = 10,
+    duration_min: float = 30,
+    sample_ms: int = SAMPLE_INTERVAL_MS,
+    seed: int = 42,
+    batch_rows: int = 10_000,
+    txn_rows: int = 250_000,
+    days: int = 90,
+    append: bool = False,
+):
+    rng = random.Random(seed)
+    duration_ms = int(duration_min * 60_000)
+    t_start = time.perf_counter()
+
+    with app.app_context():
+        if not append:
+            print("Cleaning database...")
+            _wipe()
+
+        conn = db.session.connection()
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")   # throwaway data; fsync would dominate
+
+        print(f"Seeding {clients} clients × {sessions_per_client} sessions...")
+        client_rows = []
+        for _ in range(clients):
+            first, last, company = rng.choice(GEN_FIRST), rng.choice(GEN_LAST), rng.choice(GEN_COMPANIES)
+            client_rows.append(Client(
+                name=f"{first} {last}",
+                company=f"{company} {rng.choice(['Inc', 'LLC', 'Group', 'Labs'])}",
+                email=f"{first.lower()}.{last.lower()}@{company.lower()}.com",
+                notes="Generated by seed.py generate",
+            ))
+        db.session.add_all(client_rows)
+        db.session.flush()
+
+        now = datetime.utcnow()
+        sessions = []
+        for c in client_rows:
+            for _ in range(sessions_per_client):
+                started = now - timedelta(days=rng.uniform(0, days))
+                sessions.append(Session(
+                    client_id=c.id,
+                    title=f"{rng.choice(['Discovery Call', 'Product Demo', 'Pricing Review', 'Renewal'])} - {c.company}",
+                    started_at=started,
+                    ended_at=started + timedelta(milliseconds=duration_ms),
+                ))
+        db.session.add_all(sessions)
+        db.session.commit()
+
+        print(f"Seeding events ({duration_min:g} min per session, sample every {sample_ms} ms)...")
+        conn = db.session.connection()
+        batch, in_txn, total = [], 0, 0
+        scores = []
+        for session in sessions:
+            gen = generate_session_events(session.id, duration_ms, sample_ms, rng)
+            while True:
+                try:
+                    batch.append(next(gen))
+                except StopIteration as stop:
+                    scores.append((session.id, *stop.value))
+                    break
+                if len(batch) >= batch_rows:
+                    conn.exec_driver_sql(EVENT_INSERT_SQL, batch)
+                    in_txn += len(batch)
+                    total += len(batch)
+                    batch = []
+                    if in_txn >= txn_rows:
+                        db.session.commit()
+                        conn = db.session.connection()
+                        in_txn = 0
+                        rate = total / (time.perf_counter() - t_start)
+                        print(f"  {total:,} events ({rate:,.0f}/s)")
+        if batch:
+            conn.exec_driver_sql(EVENT_INSERT_SQL, batch)
+            total += len(batch)
+
+        db.session.execute(
+            Session.__table__.update()
+            .where(Session.id == db.bindparam("sid"))
+            .values(overall_sentiment=db.bindparam("sentiment"), engagement_score=db.bindparam("engagement")),
+            [{"sid": sid, "sentiment": round(v, 3), "engagement": round(e, 1)} for sid, v, e in scores],
+        )
+        db.session.commit()
+
+    elapsed = time.perf_counter() - t_start
+    print(f"✅ Generated {total:,} events in {len(sessions)} sessions in {elapsed:.1f}s "
+          f"({total / elapsed:,.0f} events/s).")
+    return total
+
+
 if __name__ == "__main__":
-    seed_data()
+    if len(sys.argv) > 1 and sys.argv[1] == "generate":
+        parser = argparse.ArgumentParser(prog="seed.py generate", description="Generate a large synthetic DB")
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument("--sessions", type=int, default=10, help="Sessions per client")
+        parser.add_argument("--duration-min", type=float, default=30, help="Length of each session")
+        parser.add_argument("--sample-ms", type=int, default=SAMPLE_INTERVAL_MS, help="Presage sample interval")
+        parser.add_argument("--seed", type=int, default=42, help="RNG seed (same seed → same DB)")
+        parser.add_argument("--batch-rows", type=int, default=10_000, help="Rows per executemany")
+        parser.add_argument("--txn-rows", type=int, default=250_000, help="Rows per transaction")
+        parser.add_argument("--days", type=int, default=90, help="Spread session start times over this many days")
+        parser.add_argument("--append", action="store_true", help="Keep existing data")
+        args = parser.parse_args(sys.argv[2:])
+        generate(
+            clients=args.clients,
+            sessions_per_client=args.sessions,
+            duration_min=args.duration_min,
+            sample_ms=args.sample_ms,
+            seed=args.seed,
+            batch_rows=args.batch_rows,
+            txn_rows=args.txn_rows,
+            days=args.days,
+            append=args.append,
+        )
+    else:
+        seed_data()
@@ -0,0 +1,86 @@
+"""
+startup_report.py — Cold-start import timing for backend entry points.
+
+Imports the target module in a fresh interpreter with `-X importtime` and
+prints the total wall time plus the slowest imports, so regressions like a
+heavy SDK creeping back into the import path are easy to spot.
+
+Usage:
+    python3 startup_report.py                      # the Flask app (app.py)
+    python3 startup_report.py --module seed        # a DB-only entry point
+    python3 startup_report.py --top 30 --by-package
+    python3 startup_report.py --warmup             # include DeepFace warmup thread
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(module: str, warmup: bool = False):
+    """Return (wall_seconds, [(self_us, cumulative_us, name, depth), ...])."""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print(f'__wall__ {time.perf_counter() - t:.6f}')"
+    )
+    env = os.environ.copy()
+    env["DEEPFACE_WARMUP"] = "startup" if warmup else "off"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Importing {module!r} failed (exit {proc.returncode})")
+
+    wall = 0.0
+    for line in proc.stdout.splitlines():
+        if line.startswith("__wall__ "):
+            wall = float(line.split()[1])
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cum_us), name.strip(), depth))
+    return wall, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import timing for a backend entry point")
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--top", type=int, default=20, help="Number of rows to show")
+    parser.add_argument("--by-package", action="store_true", help="Group self time by top-level package")
+    parser.add_argument("--warmup", action="store_true", help="Let create_app start the DeepFace warmup")
+    args = parser.parse_args()
+
+    wall, rows = measure(args.module, warmup=args.warmup)
+    print(f"[startup] import {args.module}: {wall * 1000:.0f} ms wall, {len(rows)} modules")
+
+    if args.by_package:
+        totals = defaultdict(int)
+        for self_us, _, name, _ in rows:
+            totals[name.split(".")[0]] += self_us
+        ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+        print(f"{'self ms':>9}  package")
+        for name, us in ranked:
+            print(f"{us / 1000:9.1f}  {name}")
+    else:
+        ranked = sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]
+        print(f"{'cum ms':>9} {'self ms':>9}  module")
+        for self_us, cum_us, name, depth in ranked:
+            print(f"{cum_us / 1000:9.1f} {self_us / 1000:9.1f}  {'  ' * depth}{name}")
+
+
+if __name__ == "__main__":
+    main()
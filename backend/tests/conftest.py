@@ -0,0 +1,66 @@
+"""
+Shared fixtures. The app reads DATABASE_URL / ARCHIVE_DIR when config.py is
+imported, so they are pointed at a throwaway directory before `app` is.
+
+Run from backend/:  python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp(prefix="senselense-test-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["ARCHIVE_DIR"] = os.path.join(_TMP, "archive")
+os.environ["LLM_CACHE_DB"] = os.path.join(_TMP, "llm_cache.db")
+os.environ["DEEPFACE_WARMUP"] = "off"
+os.environ["LIVE_SUMMARY"] = "false"
+os.environ.pop("TIMELINE_CACHE_DIR", None)
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app
+    from seed import _wipe
+
+    with flask_app.app_context():
+        yield flask_app
+        _wipe()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_session(app):
+    """make_session(n_samples=20, transcript=("hello",), ended=True) → Session with presage + elevenlabs rows."""
+    from models import db, Client, Session, Event
+
+    def make(n_samples=20, transcript=("hello there", "how are you"), ended=True):
+        owner = Client(name="Test Client")
+        db.session.add(owner)
+        db.session.flush()
+        started = datetime.utcnow() - timedelta(hours=1)
+        session = Session(client_id=owner.id, title="Test", started_at=started,
+                          ended_at=started + timedelta(minutes=30) if ended else None)
+        db.session.add(session)
+        db.session.flush()
+        rows = [{"session_id": session.id, "timestamp_ms": i * 2400, "source": "presage",
+                 "emotion": ("happy", "neutral", "negative")[i % 3], "valence": round((i % 5 - 2) / 2, 2),
+                 "speaker": None, "text": None} for i in range(n_samples)]
+        rows += [{"session_id": session.id, "timestamp_ms": 1000 + i * 15000, "source": "elevenlabs",
+                  "emotion": None, "valence": None, "speaker": ("seller", "client")[i % 2], "text": text}
+                 for i, text in enumerate(transcript)]
+        Event.bulk_insert(rows)
+        db.session.commit()
+        return session
+
+    return make
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import sample_store
+from models import db, Event, EmotionChunk, Session
+
+archive = pytest.importorskip("archive")
+pytest.importorskip("numpy")
+
+FIELDS = ("id", "session_id", "timestamp_ms", "source", "emotion", "valence", "speaker", "text")
+
+
+def _snapshot(events):
+    return [{f: getattr(e, f) for f in FIELDS} for e in events]
+
+
+def test_archive_read_through(app, make_session):
+    session = make_session(n_samples=30, transcript=("héllo — naïve café", "", "plain"))
+    sample_store.pack_session(session.id, chunk_size=8)
+    db.session.expire_all()
+    before = _snapshot(session.all_events())
+
+    stub = archive.archive_session(session.id)
+
+    assert stub is not None and stub.event_count == len(before)
+    assert os.path.exists(os.path.join(app.config["ARCHIVE_DIR"], stub.path))
+    assert Event.query.filter_by(session_id=session.id).count() == 0
+    assert EmotionChunk.query.filter_by(session_id=session.id).count() == 0
+    db.session.expire_all()
+    assert _snapshot(db.session.get(Session, session.id).all_events()) == before
+
+
+def test_events_after_archive_are_merged(make_session):
+    session = make_session()
+    archive.archive_session(session.id)
+    db.session.add(Event(session_id=session.id, timestamp_ms=5, source="elevenlabs",
+                         speaker="client", text="late chunk"))
+    db.session.commit()
+    db.session.expire_all()
+
+    events = db.session.get(Session, session.id).all_events()
+
+    assert len(events) == 23
+    assert [e.timestamp_ms for e in events] == sorted(e.timestamp_ms for e in events)
+    assert any(e.text == "late chunk" for e in events)
+
+
+def test_live_and_archived_sessions_are_skipped(make_session):
+    live = make_session(ended=False)
+    assert archive.archive_session(live.id) is None
+    done = make_session()
+    assert archive.archive_session(done.id) is not None
+    assert archive.archive_session(done.id) is None
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import cleanup
+import sample_store
+from models import db, Client, Event, EmotionChunk, Session, SummaryJob
+
+
+def test_delete_session_removes_children(client, make_session):
+    session = make_session()
+    other = make_session()
+    sample_store.pack_session(session.id, chunk_size=8)
+    db.session.add(SummaryJob(session_id=session.id, status="done"))
+    db.session.commit()
+    sid = session.id
+
+    assert client.delete(f"/api/sessions/{sid}").status_code == 200
+
+    db.session.expire_all()
+    assert db.session.get(Session, sid) is None
+    assert Event.query.filter_by(session_id=sid).count() == 0
+    assert EmotionChunk.query.filter_by(session_id=sid).count() == 0
+    assert SummaryJob.query.filter_by(session_id=sid).count() == 0
+    assert Event.query.filter_by(session_id=other.id).count() == 22
+
+
+def test_delete_client_removes_its_sessions(client, make_session):
+    session = make_session()
+    owner_id, sid = session.client_id, session.id
+
+    assert client.delete(f"/api/clients/{owner_id}").status_code == 200
+
+    db.session.expire_all()
+    assert db.session.get(Client, owner_id) is None
+    assert db.session.get(Session, sid) is None
+    assert Event.query.filter_by(session_id=sid).count() == 0
+
+
+def test_large_delete_is_hidden_until_done(app, client, make_session, monkeypatch):
+    sid = make_session().id
+    monkeypatch.setattr(cleanup, "INLINE_DELETE_MAX", 5)
+    scheduled = []
+    monkeypatch.setattr(cleanup._cleanup_executor, "submit", lambda fn, *args: scheduled.append((fn, args)))
+
+    assert client.delete(f"/api/sessions/{sid}").status_code == 202
+    assert client.get(f"/api/sessions/{sid}").status_code == 404
+
+    fn, args = scheduled[0]
+    fn(*args)
+    assert not cleanup.is_pending(sid)
+    db.session.expire_all()
+    assert db.session.get(Session, sid) is None
+
+
+def test_archive_file_kept_when_final_commit_fails(app, make_session, monkeypatch):
+    archive = pytest.importorskip("archive")
+    sid = make_session().id
+    path = os.path.join(app.config["ARCHIVE_DIR"], archive.archive_session(sid).path)
+
+    commit = db.session.commit
+    calls = []
+
+    def fail_final_commit():
+        calls.append(1)
+        if len(calls) == 2:   # 1st: the (empty) event batch, 2nd: stubs + sessions
+            raise RuntimeError("disk I/O error")
+        commit()
+
+    monkeypatch.setattr(db.session, "commit", fail_final_commit)
+    with pytest.raises(RuntimeError):
+        cleanup.delete_sessions([sid])
+    monkeypatch.undo()
+    db.session.rollback()
+
+    assert os.path.exists(path)
+    assert db.session.get(Session, sid).archive is not None
+
+    cleanup.delete_sessions([sid])
+    assert not os.path.exists(path)
@@ -0,0 +1,100 @@
+import re
+from types import SimpleNamespace
+
+from AI import compaction
+
+
+def _line(t_ms, text, speaker="client"):
+    return SimpleNamespace(source="elevenlabs", timestamp_ms=t_ms, speaker=speaker, text=text,
+                           emotion=None, valence=None)
+
+
+def _sample(t_ms, emotion, valence):
+    return SimpleNamespace(source="presage", timestamp_ms=t_ms, speaker=None, text=None,
+                           emotion=emotion, valence=valence)
+
+
+def _call(n_lines=200, swing_at=None):
+    """n_lines transcript lines 10 s apart with flat valence, optionally swinging around one line."""
+    events = [_line(i * 10_000, f"line {i} " + "words " * 10, ("seller", "client")[i // 20 % 2])
+              for i in range(n_lines)]
+    for t in range(0, n_lines * 10_000, 2_400):
+        v = 0.0
+        if swing_at is not None and abs(t - swing_at * 10_000) <= 5_000:
+            v = 1.0 if t % 4_800 else -1.0
+        events.append(_sample(t, "neutral", v))
+    return sorted(events, key=lambda e: e.timestamp_ms)
+
+
+def _kept(text):
+    return [int(m) for m in re.findall(r"^\[\d+ms\] \w+: line (\d+)", text, re.M)]
+
+
+def test_estimate_tokens_rounds_up():
+    assert compaction.estimate_tokens("") == 0
+    assert compaction.estimate_tokens("abcd") == 1
+    assert compaction.estimate_tokens("abcde") == 2
+
+
+def test_transcript_within_budget_is_untouched():
+    events = [_line(0, " hello "), _line(1000, "", "seller"), _line(2000, "hi", None), _sample(500, "happy", 0.5)]
+
+    assert compaction.compact_transcript(events, token_budget=100) == "[0ms] client: hello\n[2000ms] unknown: hi"
+
+
+def test_over_budget_keeps_lines_within_budget_and_counts_omitted():
+    events = _call()
+    budget = 500
+    text = compaction.compact_transcript(events, token_budget=budget)
+
+    kept = _kept(text)
+    lines = [ln for ln in text.splitlines() if not ln.startswith("[…")]
+    assert sum(compaction.estimate_tokens(ln) + 1 for ln in lines) <= budget
+    omitted = sum(int(n) for n in re.findall(r"\[… (\d+) lines omitted …\]", text))
+    assert len(kept) + omitted == 200
+    assert kept == sorted(kept)
+
+
+def test_closing_lines_are_reserved():
+    events = _call()
+    kept = _kept(compaction.compact_transcript(events, token_budget=500))
+
+    last = [e for e in events if e.source == "elevenlabs"][-1]
+    line_cost = compaction.estimate_tokens(f"[{last.timestamp_ms}ms] {last.speaker}: {last.text.strip()}") + 1
+    reserved = int(500 * compaction.CLOSING_BUDGET_FRACTION // line_cost)
+    assert reserved >= 3
+    assert set(range(200 - reserved, 200)) <= set(kept)
+
+
+def test_valence_swing_line_is_kept_with_context():
+    flat = _kept(compaction.compact_transcript(_call(), token_budget=500))
+    swung = _kept(compaction.compact_transcript(_call(swing_at=100), token_budget=500))
+
+    assert 100 not in flat
+    assert {99, 100, 101} <= set(swung)
+
+
+def test_mood_changepoints_split_on_label_and_drift():
+    events = [
+        _sample(0, "neutral", 0.0), _sample(1000, "neutral", 0.1), _sample(2000, "neutral", 0.15),
+        _sample(3000, "neutral", 0.3),            # drifts > 0.15 from the segment start
+        _sample(4000, "happy", 0.3),              # label change
+        _sample(5000, "happy", None),             # missing valence counts as 0 → drift
+        _line(4500, "ignored"),
+        _sample(6000, None, 0.9),                 # no label, skipped
+    ]
+
+    segments = compaction.mood_changepoints(events)
+
+    assert [(s["t_ms"], s["end_ms"], s["emotion"], s["n"]) for s in segments] == [
+        (0, 2000, "neutral", 3), (3000, 3000, "neutral", 1), (4000, 4000, "happy", 1), (5000, 5000, "happy", 1),
+    ]
+    assert segments[0]["valence"] == 0.08
+    assert set(segments[0]) == {"t_ms", "end_ms", "emotion", "valence", "n"}
+
+
+def test_mood_changepoints_min_delta():
+    events = [_sample(i * 1000, "neutral", 0.1 * i) for i in range(5)]
+
+    assert len(compaction.mood_changepoints(events, min_delta=0.5)) == 1
+    assert len(compaction.mood_changepoints(events, min_delta=0.05)) == 5
@@ -0,0 +1,57 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from blueprints import api
+
+
+@pytest.fixture
+def fake_deepface(monkeypatch):
+    calls = []
+
+    def extract_faces(**kwargs):
+        calls.append(("extract_faces", kwargs))
+        return [{"face": np.full((48, 48, 3), 128.0)}]
+
+    def analyze(**kwargs):
+        calls.append(("analyze", kwargs))
+        return [{"dominant_emotion": "happy"}]
+
+    monkeypatch.setitem(sys.modules, "cv2", types.SimpleNamespace(
+        IMREAD_COLOR=1, imdecode=lambda arr, flag: arr))
+    monkeypatch.setitem(sys.modules, "deepface", types.SimpleNamespace(
+        DeepFace=types.SimpleNamespace(extract_faces=extract_faces, analyze=analyze)))
+    monkeypatch.setattr(api, "_df_ready", False)
+    return calls
+
+
+def test_detect_and_classify_timed_as_separate_calls(fake_deepface):
+    timings = {}
+    assert api._run_deepface(b"\xff\xd8", timings=timings) == ("happy", 0.9, "happy")
+
+    (detect, detect_kw), (classify, classify_kw) = fake_deepface
+    assert (detect, classify) == ("extract_faces", "analyze")
+    assert detect_kw["detector_backend"] == "opencv"
+    assert detect_kw["align"] is True
+    assert classify_kw["detector_backend"] == "skip"
+    assert classify_kw["img_path"].dtype == np.uint8
+    assert set(timings) == {"imdecode", "detect", "classify"}
+
+
+def test_no_face_classifies_whole_frame(fake_deepface, monkeypatch):
+    monkeypatch.setattr(sys.modules["deepface"].DeepFace, "extract_faces", lambda **kw: [])
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    api.deepface_split_analyze(frame)
+
+    assert fake_deepface[-1][1]["img_path"] is frame
+
+
+def test_only_frames_before_first_analyze_are_cold(fake_deepface):
+    before = api.deepface_stats()["cold_frames"]
+    for _ in range(3):
+        api._run_deepface(b"\xff\xd8")
+
+    assert api.deepface_stats()["cold_frames"] - before == 1
+    assert api._df_ready is True
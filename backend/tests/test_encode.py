@@ -0,0 +1,92 @@
+import os
+import subprocess
+
+import pytest
+
+from recordings import encode
+
+
+@pytest.fixture
+def wav(tmp_path):
+    path = tmp_path / "chunk.wav"
+    path.write_bytes(b"\x00" * 4000)
+    return str(path)
+
+
+def _fake_transcode(size):
+    def transcode(src_path, codec, dst_path=None):
+        out = f"{src_path}.{codec}"
+        with open(out, "wb") as f:
+            f.write(b"\x01" * size)
+        return out
+    return transcode
+
+
+def test_uploads_encoded_file_when_smaller(wav, monkeypatch):
+    monkeypatch.setattr(encode, "_ffmpeg", "/usr/bin/ffmpeg")
+    monkeypatch.setattr(encode, "transcode", _fake_transcode(400))
+
+    out = encode.encode_for_stt(wav, "opus")
+    assert out == f"{wav}.opus" and os.path.getsize(out) == 400
+
+
+def test_ffmpeg_missing_sends_original(wav, monkeypatch):
+    monkeypatch.setattr(encode, "_ffmpeg", None)
+    monkeypatch.setattr(encode, "transcode", lambda *a, **kw: pytest.fail("transcode called"))
+
+    assert encode.encode_for_stt(wav, "opus") == wav
+
+
+def test_encode_failure_sends_original(wav, monkeypatch):
+    def fail(*args, **kwargs):
+        raise subprocess.CalledProcessError(1, "ffmpeg")
+
+    monkeypatch.setattr(encode, "_ffmpeg", "/usr/bin/ffmpeg")
+    monkeypatch.setattr(encode, "transcode", fail)
+
+    assert encode.encode_for_stt(wav, "opus") == wav
+
+
+def test_larger_output_is_discarded(wav, monkeypatch):
+    monkeypatch.setattr(encode, "_ffmpeg", "/usr/bin/ffmpeg")
+    monkeypatch.setattr(encode, "transcode", _fake_transcode(5000))
+
+    assert encode.encode_for_stt(wav, "flac") == wav
+    assert not os.path.exists(f"{wav}.flac")
+
+
+@pytest.mark.parametrize("codec", ["off", "none", "mp3"])
+def test_codec_off_or_unknown_sends_original(wav, monkeypatch, codec):
+    monkeypatch.setattr(encode, "_ffmpeg", "/usr/bin/ffmpeg")
+    monkeypatch.setattr(encode, "transcode", lambda *a, **kw: pytest.fail("transcode called"))
+
+    assert encode.encode_for_stt(wav, codec) == wav
+
+
+def test_stt_audio_codec_env_default(wav, monkeypatch):
+    monkeypatch.setattr(encode, "STT_AUDIO_CODEC", "off")
+    monkeypatch.setattr(encode, "transcode", lambda *a, **kw: pytest.fail("transcode called"))
+
+    assert encode.encode_for_stt(wav) == wav
+
+
+def test_transcribe_removes_upload_when_encode_raises(client, make_session, monkeypatch):
+    import io
+    import sys
+    import types
+
+    monkeypatch.setitem(sys.modules, "elevenlabs", types.ModuleType("elevenlabs"))
+    monkeypatch.setitem(sys.modules, "elevenlabs.client", types.SimpleNamespace(ElevenLabs=lambda **kw: None))
+    seen = []
+
+    def broken_encode(path, codec=None):
+        seen.append(path)
+        raise MemoryError("encoder blew up")
+
+    monkeypatch.setattr(encode, "encode_for_stt", broken_encode)
+    session = make_session(n_samples=0, transcript=())
+    resp = client.post(f"/api/transcribe/{session.id}",
+                       data={"audio": (io.BytesIO(b"\x1a" * 1000), "chunk.webm")})
+
+    assert resp.status_code == 500
+    assert seen and not os.path.exists(seen[0])
@@ -0,0 +1,67 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from models import db, Event, Session
+from database import event_store
+
+SCHEMA_SQL = os.path.join(os.path.dirname(event_store.__file__), "schema.sql")
+START_MS = 1_700_000_000_000
+
+
+@pytest.fixture
+def target(app):
+    return db.engine.url.database
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    path = str(tmp_path / "adpitch.db")
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_SQL) as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO sessions (session_id, start_time_ms) VALUES ('legacy-1', ?)", (START_MS,))
+    conn.executemany(
+        "INSERT INTO transcript_segments (session_id, timestamp_start_ms, timestamp_end_ms, speaker, text, raw_json) "
+        "VALUES ('legacy-1', ?, ?, ?, ?, ?)",
+        [
+            (START_MS, START_MS + 4000, "unknown", "Thanks for joining.", json.dumps({"speaker_label": "spk_0"})),
+            (START_MS + 5000, START_MS + 8000, "unknown", "Happy to be here.", json.dumps({"speaker_label": "spk_1"})),
+            (START_MS + 9000, START_MS + 9500, "customer", "   ", None),
+            (START_MS + 12000, START_MS + 15000, "customer", "What does it cost?", None),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _imported():
+    db.session.expire_all()
+    return Session.query.filter_by(title=event_store.IMPORT_TITLE_PREFIX + "legacy-1").one_or_none()
+
+
+def test_migrate_schema_sql(legacy_db, target):
+    stats = event_store.migrate(legacy_db, target)
+
+    assert stats == {"sessions": 1, "skipped_sessions": 0, "events": 3}
+    session = _imported()
+    assert session.client.name == event_store.IMPORT_CLIENT
+    events = Event.query.filter_by(session_id=session.id).order_by(Event.timestamp_ms).all()
+    assert [(e.timestamp_ms, e.speaker, e.text) for e in events] == [
+        (0, "seller", "Thanks for joining."),
+        (5000, "client", "Happy to be here."),
+        (12000, "client", "What does it cost?"),
+    ]
+
+
+def test_migrate_dry_run_and_rerun(legacy_db, target):
+    assert event_store.migrate(legacy_db, target, dry_run=True)["events"] == 3
+    session = _imported()
+    assert session is None or Event.query.filter_by(session_id=session.id).count() == 0
+
+    event_store.migrate(legacy_db, target)
+    assert event_store.migrate(legacy_db, target) == {"sessions": 0, "skipped_sessions": 1, "events": 0}
+    assert Event.query.filter_by(session_id=_imported().id).count() == 3
@@ -0,0 +1,40 @@
+import importlib
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.api_core")
+
+
+@pytest.fixture
+def gemini(monkeypatch, tmp_path):
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    module = importlib.import_module("insights_engine.gemini_analysis")
+    calls = []
+
+    def generate_content(prompt, generation_config=None, request_options=None):
+        calls.append(request_options)
+        return SimpleNamespace(text='{"summary_md": "ok"}')
+
+    monkeypatch.setattr(module, "_get_model", lambda: SimpleNamespace(generate_content=generate_content))
+    monkeypatch.setattr(module, "DB_PATH", str(tmp_path / "none.db"))
+    return module, calls
+
+
+def test_request_timeout_and_retry_follow_the_deadline(gemini):
+    module, calls = gemini
+
+    module._analyze("prompt a", bypass_cache=True, deadline=time.monotonic() + 5)
+
+    (options,) = calls
+    assert 0 < options["timeout"] <= 5
+    assert options["retry"].deadline <= 5   # not the SDK's 600 s default
+
+
+def test_call_queued_past_its_deadline_is_skipped(gemini):
+    module, calls = gemini
+
+    with pytest.raises(module.FutureTimeout):
+        module._analyze("prompt b", bypass_cache=True, deadline=time.monotonic() - 1)
+    assert calls == []
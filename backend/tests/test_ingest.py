@@ -0,0 +1,31 @@
+from models import Event
+
+
+def test_ndjson_non_object_line_is_rejected(client, make_session):
+    session = make_session(n_samples=0, transcript=())
+    body = '{"timestamp_ms": 1, "source": "presage"}\n\n[1, 2]\n'
+    resp = client.post(f"/api/sessions/{session.id}/events", data=body,
+                       content_type="application/x-ndjson")
+
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "line 3 is not a JSON object"
+    assert Event.query.filter_by(session_id=session.id).count() == 0
+
+
+def test_array_non_object_item_is_rejected(client, make_session):
+    session = make_session(n_samples=0, transcript=())
+    resp = client.post(f"/api/sessions/{session.id}/events", json=[{"timestamp_ms": 1}, "oops"])
+
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "item 1 is not a JSON object"
+    assert Event.query.filter_by(session_id=session.id).count() == 0
+
+
+def test_ndjson_ingest(client, make_session):
+    session = make_session(n_samples=0, transcript=())
+    body = "".join(f'{{"timestamp_ms": {i}, "source": "presage"}}\n' for i in range(5))
+    resp = client.post(f"/api/sessions/{session.id}/events", data=body,
+                       content_type="application/x-ndjson")
+
+    assert resp.status_code == 201
+    assert resp.get_json()["count"] == 5
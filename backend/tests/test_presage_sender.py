@@ -0,0 +1,44 @@
+import pytest
+
+from models import Event
+
+presage_capture = pytest.importorskip("presage_capture")
+
+
+def test_stop_flushes_whole_backlog(app, make_session):
+    session = make_session(n_samples=0, transcript=())
+    sender = presage_capture.EventSender(session.id, batch_size=10_000, flush_interval_s=60,
+                                         max_buffered=5000, app=app)
+    for i in range(1500):   # three MAX_BATCH batches
+        sender.submit({"timestamp_ms": i, "source": "presage", "emotion": "neutral", "valence": 0.0})
+    sender.start()
+    sender.stop(timeout=10)
+
+    assert sender.stats()["sent"] == 1500
+    assert Event.query.filter_by(session_id=session.id).count() == 1500
+
+
+def test_stop_gives_up_after_a_failed_send(app, make_session, monkeypatch):
+    session = make_session(n_samples=0, transcript=())
+    sender = presage_capture.EventSender(session.id, batch_size=10_000, flush_interval_s=60, app=app)
+    calls = []
+    monkeypatch.setattr(sender, "_send_db", lambda batch: calls.append(len(batch)) or False)
+    for i in range(1200):
+        sender.submit({"timestamp_ms": i})
+    sender.start()
+    sender.stop(timeout=10)
+
+    assert calls == [sender.MAX_BATCH]
+    assert sender.stats()["buffered"] == 1200
+
+
+def test_direct_db_send_notifies_live_summary(app, make_session, monkeypatch):
+    from blueprints import api
+
+    session = make_session(n_samples=0, transcript=())
+    notified = []
+    monkeypatch.setattr(api, "_notify_live_summary", lambda sid, ms: notified.append((sid, ms)))
+    sender = presage_capture.EventSender(session.id, app=app)
+
+    assert sender._send_db([{"timestamp_ms": 2400}, {"timestamp_ms": 4800}])
+    assert notified == [(session.id, 4800)]
@@ -0,0 +1,34 @@
+import pytest
+
+import app as app_module
+
+presage_capture = pytest.importorskip("presage_capture")
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    calls = {"transcription": [], "presage": []}
+    monkeypatch.setattr(app_module, "start_transcription",
+                        lambda sid, seconds: calls["transcription"].append(sid))
+    monkeypatch.setattr(presage_capture, "start_presage_for_session",
+                        lambda sid, **kw: calls["presage"].append(sid) or True)
+    return calls
+
+
+def test_browser_frames_skip_server_capture(client, make_session, launches):
+    session = make_session(ended=False)
+
+    resp = client.post("/api/record", json={"session_id": session.id, "frames_from_browser": True})
+
+    assert resp.status_code == 200
+    assert resp.get_json()["presage"] is False
+    assert launches == {"transcription": [session.id], "presage": []}
+
+
+def test_server_capture_starts_without_browser_frames(client, make_session, launches):
+    session = make_session(ended=False)
+
+    resp = client.post("/api/record", json={"session_id": session.id})
+
+    assert resp.get_json()["presage"] is True
+    assert launches == {"transcription": [session.id], "presage": [session.id]}
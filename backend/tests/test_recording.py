@@ -0,0 +1,80 @@
+import sqlite3
+import types
+import wave
+
+from recordings import audio
+
+
+class _FakeStream:
+    def read(self, n, exception_on_overflow=False):
+        return b"\x01\x00" * n
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _fake_pyaudio():
+    return types.SimpleNamespace(
+        paInt16=8,
+        PyAudio=lambda: types.SimpleNamespace(open=lambda **kw: _FakeStream(), terminate=lambda: None),
+    )
+
+
+def test_record_chunks_offsets_and_lengths(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio, "pyaudio", _fake_pyaudio())
+    got = []
+
+    n = audio.record_chunks(str(tmp_path), lambda path, offset_ms, index: got.append(
+        (index, offset_ms, wave.open(path).getnframes())
+    ), seconds=7.5, chunk_seconds=3, sample_rate=1000, chunk_size=256)
+
+    assert n == 3
+    assert got == [(0, 0, 3000), (1, 3000, 3000), (2, 6000, 1500)]
+
+
+def test_record_chunks_overlap_replays_previous_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio, "pyaudio", _fake_pyaudio())
+    got = []
+
+    n = audio.record_chunks(str(tmp_path), lambda path, offset_ms, index: got.append(
+        (index, offset_ms, wave.open(path).getnframes())
+    ), seconds=7.5, chunk_seconds=3, sample_rate=1000, chunk_size=256, overlap_seconds=1)
+
+    assert n == 3
+    assert got == [(0, 0, 3000), (1, 2000, 4000), (2, 5000, 2500)]
+
+
+def _app_schema_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE clients (id INTEGER PRIMARY KEY, name TEXT NOT NULL, company TEXT, email TEXT,
+                              notes TEXT, created_at DATETIME);
+        CREATE TABLE sessions (id INTEGER PRIMARY KEY, client_id INTEGER NOT NULL, title TEXT,
+                               started_at DATETIME, ended_at DATETIME, summary TEXT,
+                               overall_sentiment FLOAT, engagement_score FLOAT);
+        CREATE TABLE events (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, timestamp_ms INTEGER NOT NULL,
+                             source TEXT NOT NULL, emotion TEXT, valence FLOAT, speaker TEXT, text TEXT);
+    """)
+    conn.close()
+
+
+def test_given_roles_are_kept_and_labels_fall_back(tmp_path):
+    from database import event_store
+
+    db_path = str(tmp_path / "app.db")
+    _app_schema_db(db_path)
+    event_store.insert_transcript_segments(db_path, [
+        {"session_id": "demo", "speaker_label": "speaker_1", "speaker": "client", "text": "hi", "start_ms": 0},
+        {"session_id": "demo", "speaker_label": "speaker_0", "speaker": "seller", "text": "hello", "start_ms": 10},
+    ])
+    event_store.insert_transcript_segments(db_path, [
+        {"session_id": "demo", "speaker_label": "speaker_5", "text": "a", "start_ms": 20},
+        {"session_id": "demo", "speaker_label": "speaker_6", "text": "b", "start_ms": 30},
+    ])
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT timestamp_ms, speaker FROM events ORDER BY timestamp_ms").fetchall()
+    assert rows == [(0, "client"), (10, "seller"), (20, "seller"), (30, "client")]
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+import types
+from concurrent.futures import Future
+
+import pytest
+
+from models import db, SummaryWindow
+
+ai = pytest.importorskip("AI.ai")
+from AI import rolling_summary  # noqa: E402
+
+
+def _window(session_id, index, status, result=None):
+    w = SummaryWindow(session_id=session_id, window_index=index,
+                      start_ms=index * rolling_summary.WINDOW_MS,
+                      end_ms=(index + 1) * rolling_summary.WINDOW_MS,
+                      status=status, result_json=json.dumps(result) if result else None)
+    db.session.add(w)
+    db.session.commit()
+    return w
+
+
+def test_duplicate_window_insert_is_dropped(app, make_session, monkeypatch):
+    session = make_session(ended=False)
+    _window(session.id, 0, "done", {"summary": "first"})
+
+    class RacingWindow:
+        # The existence check misses, as when two runs race for the same window.
+        query = types.SimpleNamespace(filter_by=lambda **kw: types.SimpleNamespace(first=lambda: None))
+
+        def __new__(cls, **kwargs):
+            return SummaryWindow(**kwargs)
+
+    monkeypatch.setattr(rolling_summary, "SummaryWindow", RacingWindow)
+    monkeypatch.setattr(rolling_summary, "summarize_range",
+                        lambda *a, **kw: pytest.fail("duplicate window was summarized"))
+
+    rolling_summary._run_window(app, session.id, 0)
+
+    rows = SummaryWindow.query.filter_by(session_id=session.id).all()
+    assert [(w.window_index, w.status) for w in rows] == [(0, "done")]
+
+
+def _merge_with_fake_llm(session, monkeypatch):
+    ranges = []
+    monkeypatch.setattr(rolling_summary, "summarize_range",
+                        lambda sid, start, end=None, bypass_cache=False: ranges.append((start, end)))
+    monkeypatch.setattr(ai, "generate_json", lambda prompt, bypass_cache=False: {"overall_summary": "ok"})
+    assert rolling_summary.merge_windows(session) == {"overall_summary": "ok"}
+    return ranges
+
+
+def test_merge_waits_for_running_window(app, make_session, monkeypatch):
+    session = make_session()
+    sid = session.id
+    _window(sid, 0, "done", {"summary": "opening"})
+    window_id = _window(sid, 1, "running").id
+    future = Future()
+    future.set_running_or_notify_cancel()
+    rolling_summary._inflight[(sid, 1)] = future
+
+    def finish():
+        time.sleep(0.2)
+        with app.app_context():
+            w = db.session.get(SummaryWindow, window_id)
+            w.status, w.result_json = "done", json.dumps({"summary": "pricing talk"})
+            db.session.commit()
+        future.set_result(None)
+        rolling_summary._forget((sid, 1))
+
+    threading.Thread(target=finish).start()
+    ranges = _merge_with_fake_llm(session, monkeypatch)
+
+    assert ranges == [(2 * rolling_summary.WINDOW_MS, None)]   # only the tail
+    assert not rolling_summary._inflight
+
+
+def test_merge_summarizes_window_inline_after_timeout(make_session, monkeypatch):
+    session = make_session()
+    _window(session.id, 0, "done", {"summary": "opening"})
+    _window(session.id, 1, "running")
+    future = Future()
+    future.set_running_or_notify_cancel()
+    monkeypatch.setitem(rolling_summary._inflight, (session.id, 1), future)
+    monkeypatch.setattr(rolling_summary, "MERGE_WAIT_S", 0.05)
+
+    ranges = _merge_with_fake_llm(session, monkeypatch)
+
+    w = rolling_summary.WINDOW_MS
+    assert ranges == [(w, 2 * w), (2 * w, None)]
+
+
+def test_merge_cancels_queued_window(make_session, monkeypatch):
+    session = make_session()
+    queued = Future()
+    monkeypatch.setitem(rolling_summary._inflight, (session.id, 0), queued)
+
+    ranges = _merge_with_fake_llm(session, monkeypatch)
+
+    assert queued.cancelled()
+    assert ranges == [(0, rolling_summary.WINDOW_MS), (rolling_summary.WINDOW_MS, None)]
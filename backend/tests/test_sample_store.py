@@ -0,0 +1,66 @@
+from sqlalchemy import inspect
+
+import sample_store
+from models import db, Event, EmotionChunk
+
+
+FIELDS = ("id", "session_id", "timestamp_ms", "source", "emotion", "valence", "speaker", "text")
+
+
+def _snapshot(events):
+    return [{f: getattr(e, f) for f in FIELDS} for e in events]
+
+
+def test_pack_round_trip(make_session):
+    session = make_session(n_samples=50)
+    before = _snapshot(session.all_events())
+
+    assert sample_store.pack_session(session.id, chunk_size=16) == 50
+    assert EmotionChunk.query.filter_by(session_id=session.id).count() == 4
+    assert Event.query.filter_by(session_id=session.id, source="presage").count() == 0
+
+    db.session.expire_all()
+    assert _snapshot(session.all_events()) == before
+    assert _snapshot(sample_store.iter_merged_events(session.id)) == before
+    assert _snapshot(sample_store.merged_events(session.id, 24000, 72000)) == [
+        e for e in before if 24000 <= e["timestamp_ms"] < 72000
+    ]
+
+
+def test_all_events_does_not_load_chunks(make_session):
+    session = make_session()
+    db.session.expire_all()
+
+    assert len(session.all_events()) == 22
+    assert "emotion_chunks" in inspect(session).unloaded
+
+
+def test_valence_round_trips_exactly(make_session):
+    session = make_session(n_samples=3, transcript=())
+    Event.query.filter_by(session_id=session.id).update({"valence": 0.123456789})
+    db.session.commit()
+
+    sample_store.pack_session(session.id)
+    db.session.expire_all()
+    assert {e.valence for e in session.all_events()} == {0.123456789}
+
+
+def test_float32_chunks_still_decode(make_session):
+    session = make_session(n_samples=4, transcript=())
+    sample_store.pack_session(session.id)
+    chunk = EmotionChunk.query.filter_by(session_id=session.id).one()
+    chunk.valence_blob = sample_store._pack("f", [0.1, -0.5, float("nan"), 1.0])   # pre-float64 layout
+    db.session.commit()
+
+    assert [e.valence for e in sample_store.iter_chunk(chunk)] == [0.1, -0.5, None, 1.0]
+
+
+def test_packed_ids_are_not_reused(make_session):
+    session = make_session(n_samples=5, transcript=())   # the newest rows in the table
+    packed_ids = {e.id for e in session.all_events()}
+    sample_store.pack_session(session.id)
+
+    first, _ = Event.bulk_insert([{"session_id": session.id, "timestamp_ms": 1, "source": "elevenlabs",
+                                   "emotion": None, "valence": None, "speaker": "seller", "text": "hi"}])
+    db.session.commit()
+    assert first > max(packed_ids)
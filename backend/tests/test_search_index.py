@@ -0,0 +1,28 @@
+import search_index
+
+
+def test_search_finds_transcript_rows(client, make_session):
+    session = make_session(transcript=("we discussed pricing tiers", "sounds good"))
+
+    body = client.get("/api/search?q=pricing").get_json()
+
+    assert body["count"] == 1
+    hit = body["results"][0]
+    assert hit["session_id"] == session.id
+    assert "<mark>pricing</mark>" in hit["snippet"]
+
+
+def test_snippet_escapes_transcript_html(make_session):
+    make_session(transcript=('<img src=x onerror="alert(1)"> pricing & terms',))
+
+    [hit] = search_index.search("pricing")
+
+    assert "<img" not in hit["snippet"]
+    assert "&lt;img" in hit["snippet"]
+    assert "&amp;" in hit["snippet"]
+    assert "<mark>pricing</mark>" in hit["snippet"]
+
+
+def test_match_query_quotes_terms():
+    assert search_index.to_match_query('price "next step" follow*') == '"price" "next step" "follow"*'
+    assert search_index.to_match_query("AND OR") == ""
@@ -0,0 +1,59 @@
+from Transcriptions.stitch import ChunkStitcher
+
+CHUNK_MS, OVERLAP_MS = 30_000, 3_000
+
+
+def seg(label, start_s, end_s, text=None):
+    return {"session_id": "demo", "speaker_label": label, "start_ms": int(start_s * 1000),
+            "end_ms": int(end_s * 1000), "text": text or f"{label}@{start_s}"}
+
+
+def _speakers(rows):
+    return [(r["text"], r["speaker"]) for r in rows]
+
+
+def test_roles_follow_speakers_across_chunks_when_labels_swap():
+    st = ChunkStitcher(CHUNK_MS, OVERLAP_MS)
+    # Chunk 0: A (seller, first voice) then B, who is still talking at the cut
+    first = st.add(0, [seg("speaker_0", 0, 10, "A1"), seg("speaker_1", 10, 26, "B1"),
+                       seg("speaker_1", 28, 30, "B2-cut")])
+    # Chunk 1 starts at 27 s and diarizes B first, so its labels are swapped
+    second = st.add(1, [seg("speaker_0", 27.2, 33, "B2-full"), seg("speaker_1", 34, 45, "A2"),
+                        seg("speaker_0", 46, 52, "B3")])
+    rest = st.finish()
+
+    assert _speakers(first + second + rest) == [
+        ("A1", "seller"), ("B1", "client"),
+        ("B2-full", "client"), ("A2", "seller"), ("B3", "client"),
+    ]
+    assert st.fallbacks == 0
+
+
+def test_overlap_text_is_not_duplicated():
+    st = ChunkStitcher(CHUNK_MS, OVERLAP_MS)
+    rows = st.add(0, [seg("speaker_0", 0, 20, "A1"), seg("speaker_1", 27.5, 28.2, "B-short"),
+                      seg("speaker_0", 29, 29.8, "A-late")])
+    rows += st.add(1, [seg("speaker_1", 27.5, 28.2, "B-short"), seg("speaker_0", 29, 29.8, "A-late"),
+                       seg("speaker_1", 31, 40, "B2")])
+    rows += st.finish()
+
+    assert _speakers(rows) == [("A1", "seller"), ("B-short", "client"), ("A-late", "seller"), ("B2", "client")]
+
+
+def test_out_of_order_chunks_are_released_in_order():
+    st = ChunkStitcher(CHUNK_MS, OVERLAP_MS)
+    assert st.add(1, [seg("speaker_0", 28, 40, "B")]) == []
+    rows = st.add(0, [seg("speaker_0", 0, 20, "A"), seg("speaker_1", 27.5, 30, "B")]) + st.finish()
+    assert _speakers(rows) == [("A", "seller"), ("B", "client")]
+
+
+def test_failed_or_silent_overlap_falls_back_to_first_voice():
+    st = ChunkStitcher(CHUNK_MS, OVERLAP_MS)
+    rows = st.add(0, [seg("speaker_0", 0, 10, "A")])
+    rows += st.add(1, None)
+    rows += st.add(2, [seg("speaker_1", 60, 65, "X"), seg("speaker_0", 66, 70, "Y")])
+    rows += st.add(3, [seg("speaker_4", 95, 99, "Z")])   # nobody spoke in [87 s, 90 s)
+    rows += st.finish()
+
+    assert _speakers(rows) == [("A", "seller"), ("X", "seller"), ("Y", "client"), ("Z", "seller")]
+    assert st.fallbacks == 1
@@ -0,0 +1,142 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, SummaryJob
+
+ai = pytest.importorskip("AI.ai")
+from AI import summary_jobs  # noqa: E402
+
+SUMMARY = {"overall_summary": "Went well.", "emotion_analysis": "Calm.", "risks": ["price"]}
+
+
+def test_regenerating_keeps_notes_without_nesting(make_session):
+    session = make_session()
+    session.summary = "Call back Tuesday."
+    ai.apply_summary(session, SUMMARY)
+    first = session.summary
+    ai.apply_summary(session, SUMMARY)
+
+    assert session.summary == first
+    assert session.summary.count("**User Notes**") == 1
+    assert session.summary.count("**Overall Analysis**") == 1
+    assert "Call back Tuesday." in session.summary
+
+
+def test_render_without_notes_is_not_treated_as_notes(make_session):
+    session = make_session()
+    ai.apply_summary(session, SUMMARY)
+    ai.apply_summary(session, SUMMARY)
+    assert "**User Notes**" not in session.summary
+
+
+def test_run_job_marks_done(app, make_session, monkeypatch):
+    session = make_session()
+    monkeypatch.setattr(ai, "generate_summary", lambda sid, bypass_cache=False: SUMMARY)
+    job = SummaryJob(session_id=session.id)
+    db.session.add(job)
+    db.session.commit()
+
+    summary_jobs._run_job(app, job.id)
+
+    db.session.expire_all()
+    assert db.session.get(SummaryJob, job.id).status == "done"
+    assert "Went well." in session.summary
+
+
+def test_run_job_survives_session_deleted_mid_run(app, make_session, monkeypatch):
+    from cleanup import delete_sessions
+
+    session = make_session()
+    job = SummaryJob(session_id=session.id)
+    db.session.add(job)
+    db.session.commit()
+    sid, job_id = session.id, job.id
+
+    def generate_then_delete(session_id, bypass_cache=False):
+        delete_sessions([session_id])
+        return SUMMARY
+
+    monkeypatch.setattr(ai, "generate_summary", generate_then_delete)
+    summary_jobs._run_job(app, job_id)   # must not raise
+
+    db.session.expire_all()
+    assert db.session.get(SummaryJob, job_id) is None
+    assert summary_jobs.latest_job(sid) is None
+
+
+def test_resume_only_reclaims_stale_jobs(app, make_session, monkeypatch):
+    session = make_session()
+    old = datetime.utcnow() - timedelta(seconds=summary_jobs.STALE_JOB_S + 60)
+    fresh_running = SummaryJob(session_id=session.id, status="running", started_at=datetime.utcnow())
+    fresh_queued = SummaryJob(session_id=session.id, status="queued")
+    stale_running = SummaryJob(session_id=session.id, status="running", started_at=old, created_at=old)
+    db.session.add_all([fresh_running, fresh_queued, stale_running])
+    db.session.commit()
+
+    submitted = []
+    monkeypatch.setattr(summary_jobs._summary_executor, "submit", lambda fn, app, job_id: submitted.append(job_id))
+    assert summary_jobs.resume_pending_jobs(app) == 1
+
+    db.session.expire_all()
+    assert submitted == [stale_running.id]
+    assert db.session.get(SummaryJob, fresh_running.id).status == "running"
+
+
+@pytest.fixture
+def no_workers(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(summary_jobs._summary_executor, "submit", lambda fn, app, job_id: submitted.append(job_id))
+    monkeypatch.setattr(summary_jobs, "_ensure_heartbeat", lambda app: None)
+    return submitted
+
+
+def _job(session, worker, status="running", beat=None):
+    now = datetime.utcnow()
+    job = SummaryJob(session_id=session.id, status=status, started_at=now, worker=worker,
+                     heartbeat_at=beat or now)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_restarted_process_reclaims_its_job_on_poll(client, make_session, no_workers):
+    session = make_session()
+    previous_boot = summary_jobs.worker_id().rsplit(":", 1)[0] + ":deadbeef"
+    job = _job(session, previous_boot)
+
+    body = client.get(f"/api/sessions/{session.id}/summary/status").get_json()
+
+    assert no_workers == [job.id]
+    assert body["status"] == "queued"
+    assert body["job"]["id"] == job.id
+
+
+def test_job_of_dead_local_process_is_orphaned(make_session):
+    proc = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    job = _job(make_session(), f"{summary_jobs._HOST}:{proc.stdout.strip()}:abcd1234")
+    assert summary_jobs.is_orphaned(job)
+
+
+def test_live_owner_keeps_its_job(make_session, no_workers):
+    session = make_session()
+    job = _job(session, f"{summary_jobs._HOST}:{os.getppid()}:abcd1234")
+
+    assert summary_jobs.enqueue_summary(session.id)["id"] == job.id
+    assert no_workers == []
+    assert not summary_jobs.is_orphaned(job)
+    assert summary_jobs.is_orphaned(job, now=datetime.utcnow() + timedelta(seconds=4 * summary_jobs.HEARTBEAT_S))
+
+
+def test_enqueue_requeues_orphan_instead_of_waiting(make_session, no_workers):
+    session = make_session()
+    stale = datetime.utcnow() - timedelta(minutes=5)
+    job = _job(session, "other-host:123:abcd1234", beat=stale)
+
+    assert summary_jobs.enqueue_summary(session.id)["id"] == job.id
+    assert no_workers == [job.id]
+    db.session.expire_all()
+    assert db.session.get(SummaryJob, job.id).worker == summary_jobs.worker_id()
@@ -0,0 +1,81 @@
+import os
+
+import timeline_cache
+
+
+def _delta(before, key):
+    return timeline_cache.cache_stats()[key] - before[key]
+
+
+def test_finished_session_second_read_is_a_hit(client, make_session):
+    session = make_session()
+    before = timeline_cache.cache_stats()
+
+    first = client.get(f"/api/sessions/{session.id}?events=true")
+    second = client.get(f"/api/sessions/{session.id}?events=true")
+
+    assert first.status_code == second.status_code == 200
+    assert first.get_json() == second.get_json()
+    assert len(first.get_json()["events"]) == 22
+    assert _delta(before, "misses") == 1
+    assert _delta(before, "hits") == 1
+
+
+def test_insights_cached_and_archived_session_versioned(client, make_session):
+    session = make_session()
+    before = timeline_cache.cache_stats()
+    assert client.get(f"/api/sessions/{session.id}/insights").status_code == 200
+    body = client.get(f"/api/sessions/{session.id}/insights").get_json()
+    assert body["presage_samples"] == 20 and body["transcript_chunks"] == 2
+    assert (_delta(before, "misses"), _delta(before, "hits")) == (1, 1)
+
+    from archive import archive_session
+    archive_session(session.id)
+    before = timeline_cache.cache_stats()
+    assert client.get(f"/api/sessions/{session.id}/insights").get_json()["presage_samples"] == 20
+    assert _delta(before, "misses") == 1   # new data version after archiving
+
+
+def test_new_events_invalidate(client, make_session):
+    session = make_session()
+    client.get(f"/api/sessions/{session.id}?events=true")
+    resp = client.post(f"/api/sessions/{session.id}/events",
+                       json=[{"timestamp_ms": 99999, "source": "presage", "emotion": "happy", "valence": 0.5}])
+    assert resp.status_code == 201
+    before = timeline_cache.cache_stats()
+    events = client.get(f"/api/sessions/{session.id}?events=true").get_json()["events"]
+    assert len(events) == 23
+    assert _delta(before, "misses") == 1
+
+
+def test_live_session_bypasses_cache(client, make_session):
+    session = make_session(ended=False)
+    before = timeline_cache.cache_stats()
+    assert client.get(f"/api/sessions/{session.id}?events=true").status_code == 200
+    assert _delta(before, "bypassed") == 1
+
+
+def test_reseeded_ids_do_not_hit_old_disk_entries(client, make_session, tmp_path, monkeypatch):
+    from seed import _wipe
+
+    monkeypatch.setattr(timeline_cache, "DISK_DIR", str(tmp_path))
+    session = make_session()
+    old_version = timeline_cache.data_version(session.id)
+    client.get(f"/api/sessions/{session.id}?events=true")
+    assert os.path.exists(timeline_cache._disk_path(session.id, "events", old_version))
+
+    _wipe()
+    session = make_session(transcript=("a different call",))
+    assert not list(tmp_path.iterdir())
+    assert timeline_cache.data_version(session.id) != old_version
+    events = client.get(f"/api/sessions/{session.id}?events=true").get_json()["events"]
+    assert [e["text"] for e in events if e["source"] == "elevenlabs"] == ["a different call"]
+
+
+def test_memory_budget_counts_utf8_bytes():
+    before = timeline_cache.cache_stats()["bytes"]
+    timeline_cache._mem_put((-1, "test"), "v", "é" * 10)
+    try:
+        assert timeline_cache.cache_stats()["bytes"] - before == 20
+    finally:
+        timeline_cache.invalidate(-1)
@@ -0,0 +1,66 @@
+import pytest
+
+import sample_store
+import trends
+from models import db, Event, EmotionChunk, SessionArchive
+
+KEYS = ("avg_valence", "presage_samples", "transcript_chunks", "duration_ms", "emotion_mix")
+
+
+def _row(client_id):
+    (row,) = trends._compute(client_id)["sessions"]
+    return {k: row[k] for k in KEYS}
+
+
+def test_packed_and_archived_sessions_match_row_events(make_session):
+    archive = pytest.importorskip("archive")
+    session = make_session(n_samples=30, transcript=("one", "two", "three"))
+    before = _row(session.client_id)
+
+    sample_store.pack_session(session.id, chunk_size=8)
+    assert _row(session.client_id) == before
+
+    archive.archive_session(session.id)
+    db.session.expire_all()
+    assert _row(session.client_id) == before
+    assert before["transcript_chunks"] == 3
+
+
+def test_legacy_rows_get_aggregates_on_first_read(make_session):
+    archive = pytest.importorskip("archive")
+    packed, archived = make_session(n_samples=12), make_session(n_samples=9)
+    expected = (_row(packed.client_id), _row(archived.client_id))
+    sample_store.pack_session(packed.id, chunk_size=5)
+    archive.archive_session(archived.id)
+    EmotionChunk.query.update({"valence_sum": None, "valence_n": None, "emotion_counts": None})
+    SessionArchive.query.update({"valence_n": None, "transcript_n": None})
+    db.session.commit()
+
+    assert (_row(packed.client_id), _row(archived.client_id)) == expected
+    assert EmotionChunk.query.filter(EmotionChunk.valence_n.is_(None)).count() == 0
+    assert db.session.get(SessionArchive, archived.id).transcript_n == 2
+
+
+def test_live_events_do_not_change_fingerprint(make_session, monkeypatch):
+    monkeypatch.setattr(trends.time, "monotonic", lambda: 1000.0)
+    session = make_session(ended=False)
+    fingerprint = trends._fingerprint(session.client_id)
+
+    Event.bulk_insert([{"session_id": session.id, "timestamp_ms": 99_000, "source": "presage",
+                        "emotion": "happy", "valence": 1.0, "speaker": None, "text": None}])
+    db.session.commit()
+    assert trends._fingerprint(session.client_id) == fingerprint
+
+    monkeypatch.setattr(trends.time, "monotonic", lambda: 1000.0 + trends.LIVE_REFRESH_S)
+    assert trends._fingerprint(session.client_id) != fingerprint
+
+
+def test_many_offline_sessions_bind_no_per_session_params(make_session):
+    sessions = [make_session(n_samples=2) for _ in range(401)]
+    for session in sessions:   # 5 params per session used to exceed SQLite's 999 limit
+        session.client_id = sessions[0].client_id
+        sample_store.pack_session(session.id)
+
+    result = trends._compute(sessions[0].client_id)
+    assert result["session_count"] == 401
+    assert all(s["presage_samples"] == 2 for s in result["sessions"])
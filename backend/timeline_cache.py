@@ -0,0 +1,233 @@
+"""
+timeline_cache.py — Versioned cache for finished sessions' timelines and insights.
+
+A review page loads the full event timeline (GET /api/sessions/<id>?events=true)
+and the insights roll-up; both used to be rebuilt from rows, packed chunks
+and archives on every view, although a finished call's data never changes.
+
+Entries are the serialized JSON, keyed by (session id, kind) and stamped with
+a data version read in one cheap indexed query (last event id, packed chunk
+count / last chunk id, archive time, plus a random database id). A new event, packing or archiving changes
+the version, so a stale entry is never served, including for rows written by
+other processes (Transcriptions/main.py, presage direct-DB). Ingest and
+delete paths also call invalidate() to free the memory straight away.
+
+Row ids repeat when a database is wiped and reseeded, so the version also
+carries a database id kept in DB_ID_TABLE: created with a new database, and
+replaced by reset() (seed.py's wipe), so disk files from an earlier database
+never match.
+
+Tiers:
+  - memory: LRU bounded by TIMELINE_CACHE_MAX_MB of UTF-8 JSON
+  - disk:   optional, when TIMELINE_CACHE_DIR is set; one file per
+            session/kind/version, survives restarts and gunicorn workers
+Only sessions with ended_at set are cached; live sessions are built fresh.
+
+Hit ratio and memory use: cache_stats(), GET /api/timeline-cache/stats and
+/metrics.
+"""
+
+import os
+import glob
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import metrics
+from models import db
+
+MAX_BYTES = int(float(os.getenv("TIMELINE_CACHE_MAX_MB", "64")) * 1024 * 1024)
+DISK_DIR = os.getenv("TIMELINE_CACHE_DIR") or None
+MAX_ENTRY_BYTES = MAX_BYTES // 4   # bigger entries go to disk only
+DB_ID_TABLE = "timeline_cache_meta"
+
+_cache: "OrderedDict[Tuple[int, str], Tuple[str, str, int]]" = OrderedDict()   # key → (version, json, bytes)
+_lock = threading.Lock()
+_bytes = 0
+_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0, "invalidations": 0}
+
+
+def ensure_db_id():
+    """Create the database id row if missing. Runs at startup after db.create_all."""
+    db.session.execute(db.text(
+        f"CREATE TABLE IF NOT EXISTS {DB_ID_TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+    ))
+    db.session.execute(db.text(
+        f"INSERT OR IGNORE INTO {DB_ID_TABLE} (key, value) VALUES ('db_id', :v)"
+    ), {"v": uuid.uuid4().hex[:12]})
+    db.session.commit()
+
+
+def data_version(session_id: int) -> str:
+    """Changes whenever the session's events, packed chunks or archive change, or the DB is reset."""
+    row = db.session.execute(db.text(f"""
+        SELECT (SELECT MAX(id) FROM events WHERE session_id = :sid),
+               (SELECT COUNT(*) || '.' || IFNULL(MAX(id), 0) FROM emotion_chunks WHERE session_id = :sid),
+               (SELECT strftime('%s', archived_at) FROM session_archives WHERE session_id = :sid),
+               (SELECT value FROM {DB_ID_TABLE} WHERE key = 'db_id')
+    """), {"sid": session_id}).one()
+    return f"{row[3]}-e{row[0] or 0}-c{row[1]}-a{row[2] or 0}"
+
+
+# ── Disk tier ────────────────────────────────────────────────────────────────
+
+def _disk_path(session_id: int, kind: str, version: str) -> str:
+    return os.path.join(DISK_DIR, f"{session_id}.{kind}.{version}.json")
+
+
+def _disk_files(session_id: int, kind: str = "*"):
+    return glob.glob(os.path.join(DISK_DIR, f"{session_id}.{kind}.*.json"))
+
+
+def _disk_get(session_id: int, kind: str, version: str) -> Optional[str]:
+    try:
+        with open(_disk_path(session_id, kind, version), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _disk_put(session_id: int, kind: str, version: str, text: str):
+    path = _disk_path(session_id, kind, version)
+    try:
+        os.makedirs(DISK_DIR, exist_ok=True)
+        for old in _disk_files(session_id, kind):
+            if old != path:
+                os.unlink(old)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[timeline-cache] Disk write failed for session {session_id}: {e}")
+
+
+# ── Memory tier ──────────────────────────────────────────────────────────────
+
+def _mem_put(key: Tuple[int, str], version: str, text: str):
+    global _bytes
+    size = len(text.encode("utf-8"))
+    if size > MAX_ENTRY_BYTES:
+        return
+    with _lock:
+        old = _cache.pop(key, None)
+        if old:
+            _bytes -= old[2]
+        _cache[key] = (version, text, size)
+        _bytes += size
+        while _bytes > MAX_BYTES and _cache:
+            _, (_, _, evicted) = _cache.popitem(last=False)
+            _bytes -= evicted
+            _stats["evictions"] += 1
+
+
+def cached_json(session, kind: str, build: Callable[[], Any], dumps: Callable[[Any], str]) -> str:
+    """
+    JSON text for build()'s result for a finished session, from memory, disk
+    or a fresh build. `dumps` is the serializer (the app's JSON provider).
+    """
+    if session.ended_at is None:
+        with _lock:
+            _stats["bypassed"] += 1
+        return dumps(build())
+
+    key = (session.id, kind)
+    version = data_version(session.id)
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] == version:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return hit[1]
+
+    if DISK_DIR:
+        text = _disk_get(session.id, kind, version)
+        if text is not None:
+            with _lock:
+                _stats["disk_hits"] += 1
+            _mem_put(key, version, text)
+            return text
+
+    with _lock:
+        _stats["misses"] += 1
+    text = dumps(build())
+    _mem_put(key, version, text)
+    if DISK_DIR:
+        _disk_put(session.id, kind, version, text)
+    return text
+
+
+def invalidate(session_id: int):
+    """Drop every cached entry for a session (memory and disk)."""
+    global _bytes
+    with _lock:
+        for key in [k for k in _cache if k[0] == session_id]:
+            _bytes -= _cache.pop(key)[2]
+            _stats["invalidations"] += 1
+    if DISK_DIR:
+        for path in _disk_files(session_id):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def reset():
+    """
+    Forget everything: new database id, empty memory tier, empty disk tier.
+    For when the whole database is wiped (seed.py), since ids will repeat.
+    """
+    global _bytes
+    db.session.execute(db.text(
+        f"UPDATE {DB_ID_TABLE} SET value = :v WHERE key = 'db_id'"
+    ), {"v": uuid.uuid4().hex[:12]})
+    db.session.commit()
+    with _lock:
+        _cache.clear()
+        _bytes = 0
+    if DISK_DIR:
+        for path in glob.glob(os.path.join(DISK_DIR, "*.json")):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _lock:
+        served = _stats["hits"] + _stats["disk_hits"]
+        lookups = served + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(served / lookups, 4) if lookups else None,
+            "entries": len(_cache),
+            "bytes": _bytes,
+            "max_bytes": MAX_BYTES,
+            "disk_dir": DISK_DIR,
+        }
+
+
+def _metric_lines():
+    s = cache_stats()
+    p = metrics.PREFIX
+    return [
+        f"# HELP {p}_timeline_cache_lookups_total Timeline/insights cache lookups by result.",
+        f"# TYPE {p}_timeline_cache_lookups_total counter",
+        f'{p}_timeline_cache_lookups_total{{result="hit"}} {s["hits"]}',
+        f'{p}_timeline_cache_lookups_total{{result="disk_hit"}} {s["disk_hits"]}',
+        f'{p}_timeline_cache_lookups_total{{result="miss"}} {s["misses"]}',
+        f'{p}_timeline_cache_lookups_total{{result="bypassed"}} {s["bypassed"]}',
+        f"# HELP {p}_timeline_cache_evictions_total Entries dropped to stay under the memory budget.",
+        f"# TYPE {p}_timeline_cache_evictions_total counter",
+        f"{p}_timeline_cache_evictions_total {s['evictions']}",
+        f"# HELP {p}_timeline_cache_bytes JSON bytes held in memory.",
+        f"# TYPE {p}_timeline_cache_bytes gauge",
+        f"{p}_timeline_cache_bytes {s['bytes']}",
+        f"# HELP {p}_timeline_cache_entries Entries held in memory.",
+        f"# TYPE {p}_timeline_cache_entries gauge",
+        f"{p}_timeline_cache_entries {s['entries']}",
+    ]
+
+
+metrics.register_collector(_metric_lines)
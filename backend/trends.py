@@ -0,0 +1,237 @@
+"""
+trends.py — Cross-session trend analytics for one client.
+
+Per-session aggregates (mean client valence, sample / transcript counts,
+duration) and the trend columns on top of them (rolling valence over the
+last ROLLING_SESSIONS meetings, change vs. the previous meeting, meeting
+number) are computed in SQLite with window functions, so nothing but the
+per-session result rows leaves the database. Emotion mix per session comes
+from a second grouped query with a windowed share.
+
+Sessions whose samples were packed (sample_store.py) or archived
+(archive.py) are no longer fully in `events`; EmotionChunk and
+SessionArchive rows carry presage aggregates stored at pack / archive time,
+which the query sums alongside the row events. Rows packed or archived
+before those columns existed are filled in once, on first read.
+
+Results are cached per client and keyed by a fingerprint of the client's
+sessions (row + last event id + packed/archived state), which is cheap to
+read and changes whenever an ended session or its events change. Live
+sessions get events every few seconds, so while one is running the
+fingerprint carries a LIVE_REFRESH_S time bucket instead of its last event
+id: its trends are at most that stale, and other requests are cache hits.
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from models import db, EmotionChunk, SessionArchive
+
+ROLLING_SESSIONS = 3     # rolling valence averages over this many meetings
+CACHE_MAX_CLIENTS = 256
+LIVE_REFRESH_S = 30      # live sessions' trends are recomputed at most this often
+
+_cache: "OrderedDict[int, Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _fingerprint(client_id: int):
+    """Changes whenever an ended session or its events change; see LIVE_REFRESH_S for live ones."""
+    rows = tuple(db.session.execute(db.text("""
+        SELECT s.id, s.title, s.started_at, s.ended_at, s.overall_sentiment, s.engagement_score,
+               CASE WHEN s.ended_at IS NOT NULL
+                    THEN (SELECT MAX(e.id) FROM events e WHERE e.session_id = s.id) END,
+               (SELECT COUNT(*) FROM emotion_chunks c WHERE c.session_id = s.id),
+               (SELECT COUNT(*) FROM session_archives a WHERE a.session_id = s.id)
+        FROM sessions s
+        WHERE s.client_id = :cid
+        ORDER BY s.id
+    """), {"cid": client_id}).all())
+    if any(r[3] is None for r in rows):
+        return rows + (int(time.monotonic() // LIVE_REFRESH_S),)
+    return rows
+
+
+def _fill_missing_aggregates(client_id: int):
+    """Store aggregates on chunks / archive stubs written before those columns existed."""
+    from sample_store import iter_chunk, sample_aggregates
+
+    chunks = (
+        EmotionChunk.query.filter(EmotionChunk.valence_n.is_(None))
+        .join(EmotionChunk.session).filter_by(client_id=client_id)
+        .all()
+    )
+    for chunk in chunks:
+        agg = sample_aggregates(iter_chunk(chunk))
+        chunk.valence_sum, chunk.valence_n = agg["valence_sum"], agg["valence_n"]
+        chunk.emotion_counts = json.dumps(agg["emotions"])
+
+    stubs = (
+        SessionArchive.query.filter(SessionArchive.valence_n.is_(None))
+        .join(SessionArchive.session).filter_by(client_id=client_id)
+        .all()
+    )
+    if stubs:
+        from archive import archived_events
+        for stub in stubs:
+            agg = sample_aggregates(archived_events(stub))
+            stub.valence_sum, stub.valence_n = agg["valence_sum"], agg["valence_n"]
+            stub.emotion_counts = json.dumps(agg["emotions"])
+            stub.max_ms, stub.transcript_n = agg["max_ms"], agg["transcript_n"]
+
+    if chunks or stubs:
+        db.session.commit()
+        print(f"[trends] Stored aggregates for {len(chunks)} chunk(s) and {len(stubs)} archive(s) of client {client_id}")
+
+
+def _compute(client_id: int) -> Dict[str, Any]:
+    _fill_missing_aggregates(client_id)
+    params = {"cid": client_id, "window": ROLLING_SESSIONS - 1}
+
+    rows = db.session.execute(db.text("""
+        WITH chunk_agg AS (
+            SELECT c.session_id, SUM(c.valence_sum) AS valence_sum, SUM(c.valence_n) AS valence_n,
+                   MAX(c.end_ms) AS max_ms
+            FROM emotion_chunks c
+            JOIN sessions s ON s.id = c.session_id
+            WHERE s.client_id = :cid
+            GROUP BY c.session_id
+        ),
+        offline AS (
+            SELECT s.id AS session_id,
+                   COALESCE(c.valence_sum, 0) + COALESCE(a.valence_sum, 0) AS valence_sum,
+                   COALESCE(c.valence_n, 0) + COALESCE(a.valence_n, 0) AS valence_n,
+                   MAX(COALESCE(c.max_ms, 0), COALESCE(a.max_ms, 0)) AS max_ms,
+                   COALESCE(a.transcript_n, 0) AS transcript_n
+            FROM sessions s
+            LEFT JOIN chunk_agg c ON c.session_id = s.id
+            LEFT JOIN session_archives a ON a.session_id = s.id
+            WHERE s.client_id = :cid
+        ),
+        per_session AS (
+            SELECT s.id AS session_id, s.title, s.started_at, s.ended_at,
+                   s.overall_sentiment, s.engagement_score,
+                   (COALESCE(SUM(CASE WHEN e.source = 'presage' THEN e.valence END), 0) + o.valence_sum)
+                     / NULLIF(COUNT(CASE WHEN e.source = 'presage' THEN e.valence END) + o.valence_n, 0)
+                     AS avg_valence,
+                   COUNT(CASE WHEN e.source = 'presage' AND e.valence IS NOT NULL THEN 1 END)
+                     + o.valence_n AS presage_samples,
+                   COUNT(CASE WHEN e.source = 'elevenlabs' THEN 1 END) + o.transcript_n AS transcript_chunks,
+                   MAX(COALESCE(MAX(e.timestamp_ms), 0), o.max_ms) AS duration_ms
+            FROM sessions s
+            LEFT JOIN events e ON e.session_id = s.id
+            JOIN offline o ON o.session_id = s.id
+            WHERE s.client_id = :cid
+            GROUP BY s.id
+        )
+        SELECT *,
+               ROW_NUMBER() OVER w AS meeting_no,
+               AVG(avg_valence) OVER (w ROWS BETWEEN :window PRECEDING AND CURRENT ROW) AS rolling_valence,
+               avg_valence - LAG(avg_valence) OVER w AS valence_change,
+               engagement_score - LAG(engagement_score) OVER w AS engagement_change
+        FROM per_session
+        WINDOW w AS (ORDER BY started_at, session_id)
+        ORDER BY started_at, session_id
+    """), params).mappings().all()
+
+    mix_rows = db.session.execute(db.text("""
+        SELECT e.session_id, e.emotion, COUNT(*) AS n,
+               1.0 * COUNT(*) / SUM(COUNT(*)) OVER (PARTITION BY e.session_id) AS share
+        FROM events e
+        JOIN sessions s ON s.id = e.session_id
+        WHERE s.client_id = :cid AND e.source = 'presage'
+          AND e.emotion IS NOT NULL AND e.valence IS NOT NULL
+        GROUP BY e.session_id, e.emotion
+    """), {"cid": client_id}).mappings().all()
+
+    mix: Dict[int, Dict[str, Dict[str, float]]] = {}
+    for r in mix_rows:
+        mix.setdefault(r["session_id"], {})[r["emotion"]] = {"count": r["n"], "share": r["share"]}
+
+    offline_mix = db.session.execute(db.text("""
+        SELECT c.session_id, c.emotion_counts FROM emotion_chunks c
+        JOIN sessions s ON s.id = c.session_id
+        WHERE s.client_id = :cid AND c.valence_n > 0
+        UNION ALL
+        SELECT a.session_id, a.emotion_counts FROM session_archives a
+        JOIN sessions s ON s.id = a.session_id
+        WHERE s.client_id = :cid AND a.valence_n > 0
+    """), {"cid": client_id}).all()
+    offline_counts: Dict[int, Dict[str, int]] = {}
+    for sid, counts_json in offline_mix:
+        counts = offline_counts.setdefault(sid, {k: v["count"] for k, v in mix.get(sid, {}).items()})
+        for emotion, n in json.loads(counts_json or "{}").items():
+            counts[emotion] = counts.get(emotion, 0) + n
+    for sid, counts in offline_counts.items():
+        total = sum(counts.values()) or 1
+        mix[sid] = {k: {"count": n, "share": n / total} for k, n in counts.items()}
+
+    def r3(v):
+        return None if v is None else round(v, 3)
+
+    sessions: List[Dict[str, Any]] = []
+    for r in rows:
+        sessions.append({
+            "session_id": r["session_id"],
+            "meeting_no": r["meeting_no"],
+            "title": r["title"],
+            "started_at": r["started_at"],
+            "ended_at": r["ended_at"],
+            "duration_ms": r["duration_ms"],
+            "avg_valence": r3(r["avg_valence"]),
+            "rolling_valence": r3(r["rolling_valence"]),
+            "valence_change": r3(r["valence_change"]),
+            "overall_sentiment": r["overall_sentiment"],
+            "engagement_score": r["engagement_score"],
+            "engagement_change": r3(r["engagement_change"]),
+            "presage_samples": r["presage_samples"],
+            "transcript_chunks": r["transcript_chunks"],
+            "emotion_mix": {
+                k: {"count": v["count"], "share": r3(v["share"])}
+                for k, v in sorted(mix.get(r["session_id"], {}).items())
+            },
+        })
+
+    scored = [s["avg_valence"] for s in sessions if s["avg_valence"] is not None]
+    return {
+        "client_id": client_id,
+        "rolling_window": ROLLING_SESSIONS,
+        "session_count": len(sessions),
+        "overall_valence": r3(sum(scored) / len(scored)) if scored else None,
+        "sessions": sessions,
+    }
+
+
+def client_trends(client_id: int, limit: int = 0) -> Dict[str, Any]:
+    """Trend rows for a client's sessions, oldest first; `limit` keeps the most recent N."""
+    fingerprint = _fingerprint(client_id)
+    with _cache_lock:
+        hit = _cache.get(client_id)
+        if hit and hit[0] == fingerprint:
+            _cache.move_to_end(client_id)
+            _stats["hits"] += 1
+            result = hit[1]
+        else:
+            result = None
+            _stats["misses"] += 1
+
+    if result is None:
+        result = _compute(client_id)
+        with _cache_lock:
+            _cache[client_id] = (fingerprint, result)
+            _cache.move_to_end(client_id)
+            while len(_cache) > CACHE_MAX_CLIENTS:
+                _cache.popitem(last=False)
+
+    if limit and limit < len(result["sessions"]):
+        return {**result, "sessions": result["sessions"][-limit:]}
+    return result
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _cache_lock:
+        return {**_stats, "clients": len(_cache)}
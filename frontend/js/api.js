@@ -31,6 +31,7 @@
         getClients: () => request("GET", "/clients"),
         createClient: (data) => request("POST", "/clients", data),
         getClient: (id) => request("GET", `/clients/${id}`),
+        deleteClient: (id) => request("DELETE", `/clients/${id}`),
 
         // Sessions
         getSessions: () => request("GET", "/sessions"),
@@ -39,6 +40,8 @@
         endSession: (id, data) => request("PATCH", `/sessions/${id}/end`, data),
         deleteSession: (id) => request("DELETE", `/sessions/${id}`),
         generateSummary: (id) => request("POST", `/sessions/${id}/summary/generate`),
+        getSummaryStatus: (id) => request("GET", `/sessions/${id}/summary/status`),
+        getSummaryWindows: (id) => request("GET", `/sessions/${id}/summary/windows`),
         startRecording: (data) => request("POST", "/record", data),
 
         // Events (pipeline ingestion point)